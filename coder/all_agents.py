@@ -1,64 +1,147 @@
-from swarm import Agent
-import sys
+import os
+import time
+import logging
+import importlib
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from tools.workspace import Workspace
+
+# Workspace of callers that do not name one (evals, and run.py/the servers when given no path).
+DEFAULT_BASE_PATH = os.environ.get('CODEASSIST_BASE_PATH', os.curdir)
+
+
+class AgentSpec(NamedTuple):
+    factory: str  # 'module:Class', imported when the agent is first needed
+    name: str     # the agent's name, as stored as 'sender' in chat history
+
+
+# Agents by the alias clients use to pick one (the servers' "agent" field).
+AGENT_SPECS: Dict[str, AgentSpec] = {
+    'triage': AgentSpec('tools.triage_assistant:TriageAssistant', 'Triage Agent'),
+    'code': AgentSpec('tools.code_assistant:CodeAssistant', 'Coder'),
+    'git': AgentSpec('tools.git_assistant:GitAssistant', 'Git Assistant'),
+    'context': AgentSpec('tools.context_assistant:ContextAssistant', 'Context Assistant'),
+    'facets': AgentSpec('tools.facets_assistant:FacetsAssistant', 'Facets Assistant'),
+}
+
+# Aliases of the agents each agent can hand the conversation to.
+TRANSFERS: Dict[str, List[str]] = {
+    'triage': ['code', 'git', 'context'],
+    'git': ['context'],
+    'context': ['git'],
+}
+
+# Name and description of the tool that transfers to an agent.
+TRANSFER_TOOLS = {
+    'code': ('transfer_to_coding_assistant', "Transfer the conversation to the Coding Assistant agent."),
+    'git': ('transfer_to_git_assistant', "Transfer the conversation to the Git Assistant agent."),
+    'context': ('transfer_to_context_assistant', "Transfer the conversation to the Context Assistant agent."),
+    'triage': ('transfer_back_to_triage', "Transfer the conversation back to the Triage agent."),
+}
+
+
+def _load(factory: str):
+    module, name = factory.split(':')
+    return getattr(importlib.import_module(module), name)
+
+
+class AgentRegistry:
+    """The agents of one workspace by alias, each built the first time it is looked up.
+
+    Building an agent imports its module (and with it swarm and openai) and
+    reads its instructions, so importing this module, starting the CLI or a
+    server, or opening a thread that only talks to one agent does not pay for
+    the rest. Transfers return agents of the same registry, so a conversation
+    that moves between agents stays in its workspace; use one registry per
+    conversation.
+    """
+
+    def __init__(self, workspace: Workspace, specs: Dict[str, AgentSpec] = None,
+                 transfers: Dict[str, List[str]] = None):
+        self.workspace = workspace
+        self.specs = AGENT_SPECS if specs is None else specs
+        self.transfers = TRANSFERS if transfers is None else transfers
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, alias: str):
+        with self._lock:
+            agent = self._agents.get(alias)
+            if agent is None:
+                agent = self._agents[alias] = self._build(alias)
+            return agent
+
+    def _build(self, alias: str):
+        spec = self.specs[alias]
+        started = time.perf_counter()
+        agent = _load(spec.factory)(self.workspace)
+        agent.functions.extend(self._transfer(target) for target in self.transfers.get(alias, []))
+        logging.debug(f"Built {agent.name} for {self.workspace.root} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return agent
+
+    def _transfer(self, alias: str):
+        def transfer():
+            return self[alias]
+        transfer.__name__, transfer.__doc__ = TRANSFER_TOOLS[alias]
+        return transfer
+
+    def __contains__(self, alias: str) -> bool:
+        return alias in self.specs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def name(self, alias: str) -> str:
+        """Name of an agent, without building it."""
+        return self.specs[alias].name
+
+    def alias_of(self, name: str) -> Optional[str]:
+        """Alias of the agent with this name, or None."""
+        for alias, spec in self.specs.items():
+            if spec.name == name:
+                return alias
+        return None
+
+    def built(self) -> List[str]:
+        """Aliases of the agents built so far."""
+        with self._lock:
+            return list(self._agents)
+
+    def preload(self):
+        """Import the agents' modules without building them, e.g. in a background thread while waiting for input."""
+        for spec in self.specs.values():
+            _load(spec.factory)
+
+
+def create_agents(workspace: Workspace) -> AgentRegistry:
+    """The agents for one conversation on workspace."""
+    return AgentRegistry(workspace)
+
+
+_default_agents: Optional[AgentRegistry] = None
+_default_agents_lock = threading.Lock()
+
+
+def default_agents() -> AgentRegistry:
+    """Agents on DEFAULT_BASE_PATH, shared by callers that do not manage workspaces."""
+    global _default_agents
+    with _default_agents_lock:
+        if _default_agents is None:
+            _default_agents = create_agents(Workspace(DEFAULT_BASE_PATH))
+        return _default_agents
+
+
+_DEFAULT_AGENT_NAMES = {'triage_agent': 'triage', 'code_agent': 'code', 'git_agent': 'git',
+                        'context_agent': 'context', 'facets_agent': 'facets'}
+
 
-from tools.code_assistant import CodeAssistant
-from tools.facets_assistant import FacetsAssistant
-from tools.git_assistant import GitAssistant
-from tools.triage_assistant import TriageAssistant
-from tools.context_assistant import ContextAssistant
-
-git_agent = GitAssistant()
-code_agent = CodeAssistant()
-triage_agent = TriageAssistant()
-context_agent = ContextAssistant()
-facets_agent = FacetsAssistant()
-
-if len(sys.argv) < 2:
-    print("Error: Base path not provided. Please provide a base path as the first argument.")
-    sys.exit(1)
-
-base_path = sys.argv[1]  # The first argument after the script name
-
-
-def initialize_agents(path):
-    print("Base Path: " + path)
-    GitAssistant.base_path = path
-    CodeAssistant.base_path = path
-    TriageAssistant.base_path = path
-    FacetsAssistant.base_path = path
-
-
-initialize_agents(base_path)
-
-
-# Triage Agen
-
-
-def transfer_to_coding_assistant():
-    """Transfer the conversation to the Coding Assistant agent."""
-    return code_agent
-
-
-def transfer_to_git_assistant():
-    """Transfer the conversation to the Coding Assistant agent."""
-    return git_agent
-
-
-def transfer_to_context_assistant():
-    """Transfer the conversation to the Coding Assistant agent."""
-    return context_agent
-
-
-def transfer_back_to_triage():
-    """Transfer the conversation back to the Triage agent."""
-    return triage_agent
-
-
-# Extend triage_agent functions
-triage_agent.functions = [
-    transfer_to_coding_assistant,
-    transfer_to_git_assistant,
-    transfer_to_context_assistant
-]
-git_agent.functions.extend([transfer_to_context_assistant])
-context_agent.functions.extend([transfer_to_git_assistant])
+def __getattr__(name):
+    # from all_agents import code_agent: the default workspace's agent, built on first access.
+    alias = _DEFAULT_AGENT_NAMES.get(name)
+    if alias is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return default_agents()[alias]
@@ -0,0 +1,209 @@
+import os
+import time
+import argparse
+import uuid
+import asyncio
+import logging
+
+from aiohttp import web
+from pymongo import AsyncMongoClient
+from pymongo.errors import PyMongoError
+
+import chat_history
+from chat_history import THREAD_PROJECTION, THREAD_SORT, TurnEvents, resume_agent, sse, to_document, to_message
+from all_agents import DEFAULT_BASE_PATH, create_agents
+from history_manager import HistoryManager
+from session_cache import DEFAULT_MAX_SESSIONS, IDLE_TTL_S, Session, SessionCache
+from tools.workspace import Workspace, workspace_root
+
+# Environment variable for MongoDB connection string
+mongo_connection_string = os.environ.get('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
+
+DEFAULT_AGENT = 'triage'
+
+COLLECTION = web.AppKey('collection', object)
+SESSIONS = web.AppKey('sessions', SessionCache)
+TOTALS = web.AppKey('totals', chat_history.ThreadTotals)
+EVICTOR = web.AppKey('evictor', asyncio.Task)
+SERVER = web.AppKey('server', object)
+
+
+class ChatServer:
+    """The chat API on one event loop: many conversations per process instead of one per worker thread.
+
+    Model calls go through AsyncSwarm and MongoDB through the async driver,
+    so a turn that is waiting on either holds no thread. Each thread's
+    agent and compacted history stay in a SessionCache between messages,
+    so only the first message after a restart or eviction reads the thread
+    from MongoDB. Each session has its own set of agents, bound to the
+    workspace the thread was started on. The cache assumes a thread is served by one process at a
+    time (sticky routing); another process writing to the same thread is
+    not seen until the session is evicted.
+    """
+
+    def __init__(self, collection, swarm=None, threads=None, base_path: str = DEFAULT_BASE_PATH):
+        self.collection = collection
+        self.swarm = swarm
+        # Threads started on a named workspace; threads without a record use the server's own (base_path)
+        self.threads = threads
+        self.base_path = base_path
+
+    def get_swarm(self) -> 'AsyncSwarm':
+        # Created on first use, so the app can be built without model credentials or loading swarm and openai.
+        if self.swarm is None:
+            from async_swarm import AsyncSwarm
+            self.swarm = AsyncSwarm()
+        return self.swarm
+
+    async def load_session(self, thread_id: str) -> Session:
+        thread = await self.threads.find_one({'_id': thread_id}, {'workspace': 1})
+        agents = create_agents(Workspace(workspace_root(thread.get('workspace') if thread else None, self.base_path)))
+        documents = await self.collection.find({'thread_id': thread_id}, THREAD_PROJECTION).sort(THREAD_SORT).to_list()
+        messages = [to_message(document) for document in documents]
+        history = HistoryManager()
+        history.extend(messages)
+        logging.info(f"Loaded thread {thread_id} from MongoDB: {len(messages)} messages")
+        return Session(thread_id, resume_agent(messages, agents, DEFAULT_AGENT), history, agents)
+
+    async def start_chat(self, request: web.Request) -> web.Response:
+        # Start a new chat session, optionally on a named workspace, and return a thread_id
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        workspace = data.get('workspace')
+        try:
+            workspace_root(workspace, self.base_path)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        thread_id = str(uuid.uuid4())
+        if workspace:
+            await self.threads.insert_one({'_id': thread_id, 'workspace': workspace})
+        return web.json_response({'thread_id': thread_id})
+
+    async def continue_chat(self, request: web.Request) -> web.StreamResponse:
+        # Run the agent on the thread and stream its reply as Server-Sent Events
+        started = time.perf_counter()
+        thread_id = request.match_info['thread_id']
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        message = data.get('message')
+
+        if not message:
+            return web.json_response({'error': 'Message cannot be empty'}, status=400)
+
+        try:
+            session = await request.app[SESSIONS].get(thread_id)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+
+        agent_alias = data.get('agent')
+        if agent_alias and agent_alias not in session.agents:
+            return web.json_response(
+                {'error': f"Unknown agent '{agent_alias}'; expected one of {', '.join(session.agents)}"}, status=400)
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+                                               'X-Accel-Buffering': 'no'})
+        await response.prepare(request)
+        async with session.lock:
+            if agent_alias:
+                session.agent = session.agents[agent_alias]
+            turn = TurnEvents(thread_id, session.agent.name, started)
+            user_message = {'role': 'user', 'content': message}
+            session.history.append(user_message)
+            try:
+                await response.write(turn.start().encode())
+                async for chunk in self.get_swarm().run_and_stream_async(agent=session.agent,
+                                                                         messages=session.history.window()):
+                    for event in turn.feed(chunk):
+                        await response.write(event.encode())
+            except ConnectionResetError:
+                logging.info(f"Client of thread {thread_id} disconnected during the turn")
+            except Exception as e:
+                logging.error(f"Agent turn for thread {thread_id} failed: {e}")
+                try:
+                    await response.write(sse('error', {'error': str(e)}).encode())
+                except ConnectionResetError:
+                    pass
+            finally:
+                if turn.response is not None:
+                    session.history.extend(turn.response.messages)
+                    session.agent = turn.response.agent
+                messages = turn.messages(user_message)
+                await self.collection.insert_many([to_document(thread_id, message) for message in messages])
+                request.app[TOTALS].added(thread_id, len(messages))
+                session.touch()
+            if turn.response is not None:
+                try:
+                    await response.write(turn.done().encode())
+                    await response.write_eof()
+                except ConnectionResetError:
+                    pass
+        return response
+
+    async def get_chat_history(self, request: web.Request) -> web.Response:
+        # Get chat history, newest first, paged by cursor (before/after)
+        thread_id = request.match_info['thread_id']
+        try:
+            params = chat_history.history_params(request.query)
+            if params['page'] is not None:
+                raise ValueError('The async server pages by cursor only; pass before= or after= instead of page=')
+            query = chat_history.page_query(thread_id, params['before'], params['after'], params['limit'],
+                                            params['fields'])
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+
+        documents = await self.collection.find(**query).to_list()
+        result = chat_history.page_result(documents, params['limit'], params['before'], params['after'])
+        if params['include_total']:
+            result['pagination']['total_messages'] = await request.app[TOTALS].get_async(self.collection, thread_id)
+        return web.json_response(result)
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        stats = {'sessions': request.app[SESSIONS].stats()}
+        if self.swarm is not None:
+            stats['tool_calls'] = self.swarm.tool_executor.stats()
+        return web.json_response(stats)
+
+
+async def _startup(app: web.Application):
+    try:
+        await chat_history.ensure_indexes_async(app[COLLECTION])
+    except PyMongoError as e:
+        logging.error(f"Could not create chat history indexes: {e}")
+    app[EVICTOR] = asyncio.create_task(app[SESSIONS].run_evictor())
+
+
+async def _cleanup(app: web.Application):
+    app[EVICTOR].cancel()
+
+
+def create_app(collection=None, swarm=None, max_sessions: int = DEFAULT_MAX_SESSIONS,
+               idle_ttl_s: float = IDLE_TTL_S, threads=None, base_path: str = DEFAULT_BASE_PATH) -> web.Application:
+    if collection is None:
+        collection = AsyncMongoClient(mongo_connection_string).chat_database.messages
+    if threads is None:
+        threads = collection.database.threads
+    server = ChatServer(collection, swarm, threads, base_path)
+    app = web.Application()
+    app[COLLECTION] = collection
+    app[SESSIONS] = SessionCache(server.load_session, max_sessions, idle_ttl_s)
+    app[TOTALS] = chat_history.ThreadTotals()
+    app[SERVER] = server
+    app.router.add_post('/agent/start_chat', server.start_chat)
+    app.router.add_post('/agent/continue_chat/{thread_id}', server.continue_chat)
+    app.router.add_get('/agent/chat_history/{thread_id}', server.get_chat_history)
+    app.router.add_get('/agent/stats', server.get_stats)
+    app.on_startup.append(_startup)
+    app.on_cleanup.append(_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the agents over HTTP on one event loop.")
+    parser.add_argument('base_path', nargs='?', default=DEFAULT_BASE_PATH, help="Workspace of threads not started on a named one.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(create_app(base_path=args.base_path), host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
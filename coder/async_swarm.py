@@ -0,0 +1,96 @@
+import copy
+import json
+import asyncio
+from collections import defaultdict
+from typing import AsyncIterator, List
+
+from openai import AsyncOpenAI
+from swarm.core import __CTX_VARS_NAME__
+from swarm.types import Agent, ChatCompletionMessageToolCall, Function, Response
+from swarm.util import function_to_json, merge_chunk
+
+from parallel_swarm import ParallelSwarm
+from tools.tool_executor import DEFAULT_WORKERS
+
+
+class AsyncSwarm(ParallelSwarm):
+    """Swarm's streaming run loop on an async model client.
+
+    While the model is generating, the coroutine only waits on the network,
+    so one event loop can carry many conversations at once. Tool calls stay
+    synchronous (files, git, shell) and run through ParallelSwarm's tool
+    executor in a worker thread, off the event loop. Chunks and the final
+    {'response': Response} have the same shape as Swarm.run(stream=True).
+    """
+
+    def __init__(self, client=None, workers: int = DEFAULT_WORKERS):
+        super().__init__(client or AsyncOpenAI(), workers)
+
+    def _completion_params(self, agent: Agent, history: List[dict], context_variables: dict, model_override) -> dict:
+        context_variables = defaultdict(str, context_variables)
+        instructions = agent.instructions(context_variables) if callable(agent.instructions) else agent.instructions
+        messages = [{"role": "system", "content": instructions}] + history
+        tools = [function_to_json(f) for f in agent.functions]
+        # hide context_variables from model
+        for tool in tools:
+            params = tool["function"]["parameters"]
+            params["properties"].pop(__CTX_VARS_NAME__, None)
+            if __CTX_VARS_NAME__ in params["required"]:
+                params["required"].remove(__CTX_VARS_NAME__)
+        params = {"model": model_override or agent.model, "messages": messages, "tools": tools or None,
+                  "tool_choice": agent.tool_choice, "stream": True}
+        if tools:
+            params["parallel_tool_calls"] = agent.parallel_tool_calls
+        return params
+
+    async def run_and_stream_async(self, agent: Agent, messages: List[dict], context_variables: dict = None,
+                                   model_override: str = None, debug: bool = False, max_turns: float = float("inf"),
+                                   execute_tools: bool = True) -> AsyncIterator[dict]:
+        active_agent = agent
+        context_variables = copy.deepcopy(context_variables or {})
+        history = copy.deepcopy(messages)
+        init_len = len(messages)
+
+        while len(history) - init_len < max_turns:
+            message = {
+                "content": "",
+                "sender": active_agent.name,
+                "role": "assistant",
+                "function_call": None,
+                "tool_calls": defaultdict(lambda: {"function": {"arguments": "", "name": ""}, "id": "", "type": ""}),
+            }
+            completion = await self.client.chat.completions.create(
+                **self._completion_params(active_agent, history, context_variables, model_override))
+
+            yield {"delim": "start"}
+            async for chunk in completion:
+                delta = json.loads(chunk.choices[0].delta.model_dump_json())
+                if delta["role"] == "assistant":
+                    delta["sender"] = active_agent.name
+                yield delta
+                delta.pop("role", None)
+                delta.pop("sender", None)
+                merge_chunk(message, delta)
+            yield {"delim": "end"}
+
+            message["tool_calls"] = list(message.get("tool_calls", {}).values()) or None
+            history.append(message)
+
+            if not message["tool_calls"] or not execute_tools:
+                break
+
+            tool_calls = [
+                ChatCompletionMessageToolCall(
+                    id=tool_call["id"], type=tool_call["type"],
+                    function=Function(arguments=tool_call["function"]["arguments"], name=tool_call["function"]["name"]))
+                for tool_call in message["tool_calls"]
+            ]
+            partial_response = await asyncio.to_thread(
+                self.handle_tool_calls, tool_calls, active_agent.functions, context_variables, debug)
+            history.extend(partial_response.messages)
+            context_variables.update(partial_response.context_variables)
+            if partial_response.agent:
+                active_agent = partial_response.agent
+
+        yield {"response": Response(messages=history[init_len:], agent=active_agent,
+                                    context_variables=context_variables)}
@@ -0,0 +1,278 @@
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+# Fields a client may ask for; _id and timestamp always come back, they make up the cursor.
+FIELDS = ('thread_id', 'type', 'message', 'sender', 'payload')
+DEFAULT_FIELDS = ('thread_id', 'type', 'message', 'sender')
+# Cached thread totals are recounted after this many seconds.
+TOTAL_TTL_S = 30.0
+
+INDEXES = [
+    # Serves the thread history in both directions and the keyset conditions on (timestamp, _id).
+    ([('thread_id', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)], 'thread_timestamp_id'),
+]
+
+
+class CursorError(ValueError):
+    pass
+
+
+def ensure_indexes(collection):
+    """Create the indexes chat history queries rely on; creating an existing index is a no-op."""
+    for keys, name in INDEXES:
+        collection.create_index(keys, name=name)
+    logging.info(f"Indexes ensured on {collection.name}: {', '.join(name for _, name in INDEXES)}")
+
+
+async def ensure_indexes_async(collection):
+    """ensure_indexes() for an async collection."""
+    for keys, name in INDEXES:
+        await collection.create_index(keys, name=name)
+    logging.info(f"Indexes ensured on {collection.name}: {', '.join(name for _, name in INDEXES)}")
+
+
+def to_document(thread_id: str, message: dict) -> dict:
+    """Store a Swarm message under its thread, keeping the readable fields the chat history returns."""
+    message_type = {'user': 'user', 'tool': 'tool'}.get(message.get('role'), 'agent')
+    return {
+        'thread_id': thread_id,
+        'message': message.get('content') or '',
+        'type': message_type,
+        'sender': message.get('sender'),
+        'payload': message,
+        'timestamp': datetime.utcnow(),
+    }
+
+
+def to_message(document: dict) -> dict:
+    """The Swarm message for a stored document; documents written before payloads were kept hold only text."""
+    if document.get('payload'):
+        return document['payload']
+    role = 'user' if document.get('type') == 'user' else 'assistant'
+    return {'role': role, 'content': document.get('message', '')}
+
+
+# What load_thread needs of each stored message, oldest first.
+THREAD_PROJECTION = {'payload': 1, 'type': 1, 'message': 1}
+THREAD_SORT = [('timestamp', ASCENDING), ('_id', ASCENDING)]
+
+
+def load_thread(collection, thread_id: str) -> List[dict]:
+    """Every message of a thread as Swarm messages, oldest first."""
+    cursor = collection.find({'thread_id': thread_id}, THREAD_PROJECTION).sort(THREAD_SORT)
+    return [to_message(document) for document in cursor]
+
+
+def resume_agent(history: List[dict], agents, default: str):
+    """The agent that spoke last in the thread, so a conversation handed off to another agent stays with it.
+
+    agents is an AgentRegistry and default an alias; only the agent returned is built.
+    """
+    for message in reversed(history):
+        alias = agents.alias_of(message.get('sender'))
+        if alias is not None:
+            return agents[alias]
+    return agents[default]
+
+
+def sse(event: str, data) -> str:
+    """One Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class TurnEvents:
+    """Turns the chunks of a streamed Swarm run into SSE events and times the first token."""
+
+    def __init__(self, thread_id: str, agent_name: str, started: float):
+        self.thread_id = thread_id
+        self.sender = agent_name
+        self.started = started
+        self.first_token_ms: Optional[float] = None
+        self.response = None
+
+    def start(self) -> str:
+        return sse('start', {'thread_id': self.thread_id, 'agent': self.sender})
+
+    def feed(self, chunk: dict) -> List[str]:
+        events = []
+        if 'sender' in chunk:
+            self.sender = chunk['sender']
+        if chunk.get('content'):
+            if self.first_token_ms is None:
+                self.first_token_ms = round((time.perf_counter() - self.started) * 1000, 1)
+                logging.info(f"Thread {self.thread_id}: first token after {self.first_token_ms} ms")
+            events.append(sse('token', {'sender': self.sender, 'content': chunk['content']}))
+        for tool_call in chunk.get('tool_calls') or []:
+            name = tool_call['function']['name']
+            if name:
+                events.append(sse('tool_call', {'sender': self.sender, 'name': name}))
+        if chunk.get('delim') == 'end':
+            events.append(sse('message_end', {'sender': self.sender}))
+        if 'response' in chunk:
+            self.response = chunk['response']
+        return events
+
+    def messages(self, user_message: dict) -> List[dict]:
+        """What the turn adds to the thread: the user message and, if the run finished, the agent's messages."""
+        return [user_message] + (self.response.messages if self.response else [])
+
+    def done(self) -> str:
+        elapsed_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        logging.info(f"Thread {self.thread_id}: turn took {elapsed_ms} ms, {len(self.response.messages)} messages")
+        return sse('done', {'agent': self.response.agent.name, 'messages': len(self.response.messages),
+                            'first_token_ms': self.first_token_ms, 'elapsed_ms': elapsed_ms})
+
+
+def encode_cursor(document: dict) -> str:
+    """Opaque cursor for a message: its timestamp in milliseconds and its id."""
+    timestamp = document['timestamp'].replace(tzinfo=timezone.utc)
+    return f"{int(timestamp.timestamp() * 1000)}-{document['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        millis, object_id = cursor.split('-', 1)
+        timestamp = datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc).replace(tzinfo=None)
+        return timestamp, ObjectId(object_id)
+    except (ValueError, InvalidId, OverflowError):
+        raise CursorError(f"Invalid cursor: {cursor}")
+
+
+def projection(fields: Optional[str] = None) -> Dict[str, int]:
+    """Mongo projection for a comma-separated field list (default: everything but the raw payload)."""
+    names = [name.strip() for name in fields.split(',') if name.strip()] if fields else list(DEFAULT_FIELDS)
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; expected some of {', '.join(FIELDS)}")
+    return {'_id': 1, 'timestamp': 1, **{name: 1 for name in names}}
+
+
+def serialize(document: dict) -> dict:
+    """A stored message as plain JSON: ObjectIds become strings and timestamps ISO 8601 in UTC."""
+    result = {}
+    for key, value in document.items():
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.replace(tzinfo=None).isoformat(timespec='milliseconds') + 'Z'
+        result['id' if key == '_id' else key] = value
+    return result
+
+
+def history_params(args: Mapping[str, str]) -> dict:
+    """Parse chat_history query arguments; raises ValueError with a message for the client."""
+    try:
+        limit = int(args.get('limit', args.get('page_size', DEFAULT_PAGE_SIZE)))
+        page = int(args['page']) if 'page' in args else None
+    except ValueError:
+        raise ValueError('Page, page_size and limit must be integers')
+    return {'limit': max(1, min(limit, MAX_PAGE_SIZE)), 'page': page, 'fields': args.get('fields'),
+            'before': args.get('before'), 'after': args.get('after'),
+            'include_total': args.get('include_total', '').lower() in ('1', 'true', 'yes')}
+
+
+def page_query(thread_id: str, before: Optional[str] = None, after: Optional[str] = None,
+               limit: int = DEFAULT_PAGE_SIZE, fields: Optional[str] = None) -> dict:
+    """find() arguments for one page; shared by the blocking and the async server."""
+    if before and after:
+        raise CursorError("Pass either before or after, not both")
+    query = {'thread_id': thread_id}
+    cursor = before or after
+    if cursor:
+        timestamp, object_id = decode_cursor(cursor)
+        op = '$lt' if before else '$gt'
+        query['$or'] = [{'timestamp': {op: timestamp}}, {'timestamp': timestamp, '_id': {op: object_id}}]
+    direction = ASCENDING if after else DESCENDING
+    # One extra document tells whether there is another page.
+    return {'filter': query, 'projection': projection(fields), 'sort': [('timestamp', direction), ('_id', direction)],
+            'limit': max(1, min(limit, MAX_PAGE_SIZE)) + 1}
+
+
+def page_result(documents: List[dict], limit: int, before: Optional[str] = None, after: Optional[str] = None) -> dict:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    if after:
+        documents.reverse()
+    # Older messages remain if this page was cut short going back, or if it was reached going forward.
+    has_older = has_more if not after else bool(documents)
+    has_newer = has_more if after else bool(before)
+    return {
+        'chat_history': [serialize(document) for document in documents],
+        'pagination': {
+            'limit': limit,
+            'next_cursor': encode_cursor(documents[-1]) if documents and has_older else None,
+            'prev_cursor': encode_cursor(documents[0]) if documents and has_newer else None,
+        },
+    }
+
+
+def page_messages(collection, thread_id: str, before: Optional[str] = None, after: Optional[str] = None,
+                  limit: int = DEFAULT_PAGE_SIZE, fields: Optional[str] = None) -> dict:
+    """One page of a thread, newest first, located by cursor instead of by skipping.
+
+    Without a cursor this is the newest page. before= continues with older
+    messages and after= with newer ones; either way the query walks the
+    (thread_id, timestamp, _id) index from the cursor, so a deep page costs
+    the same as the first one.
+    """
+    documents = list(collection.find(**page_query(thread_id, before, after, limit, fields)))
+    return page_result(documents, limit, before, after)
+
+
+def page_by_number(collection, thread_id: str, page: int, page_size: int, fields: Optional[str] = None) -> List[dict]:
+    """Offset paging for clients that still send page=; deep pages get slower, use cursors instead."""
+    documents = (collection.find({'thread_id': thread_id}, projection(fields))
+                 .sort([('timestamp', DESCENDING), ('_id', DESCENDING)])
+                 .skip((page - 1) * page_size).limit(page_size))
+    return [serialize(document) for document in documents]
+
+
+class ThreadTotals:
+    """Approximate message counts per thread: counted at most every ttl_s seconds, bumped on inserts in between."""
+
+    def __init__(self, ttl_s: float = TOTAL_TTL_S):
+        self.ttl_s = ttl_s
+        self._counts: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, thread_id: str) -> Optional[int]:
+        with self._lock:
+            cached = self._counts.get(thread_id)
+            if cached and time.monotonic() - cached[1] < self.ttl_s:
+                return cached[0]
+        return None
+
+    def _store(self, thread_id: str, count: int) -> int:
+        with self._lock:
+            self._counts[thread_id] = (count, time.monotonic())
+        return count
+
+    def get(self, collection, thread_id: str) -> int:
+        cached = self._cached(thread_id)
+        if cached is not None:
+            return cached
+        return self._store(thread_id, collection.count_documents({'thread_id': thread_id}))
+
+    async def get_async(self, collection, thread_id: str) -> int:
+        """get() for an async collection."""
+        cached = self._cached(thread_id)
+        if cached is not None:
+            return cached
+        return self._store(thread_id, await collection.count_documents({'thread_id': thread_id}))
+
+    def added(self, thread_id: str, count: int = 1):
+        with self._lock:
+            cached = self._counts.get(thread_id)
+            if cached:
+                self._counts[thread_id] = (cached[0] + count, cached[1])
@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+from evals_util import CONVERSATIONAL_EVAL_SYSTEM_PROMPT, evaluate_with_llm_bool
+
+DEFAULT_WORKERS = 8
+DEFAULT_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eval_cases.yml')
+PERCENTILES = (50, 90, 95, 99)
+
+
+class EvalCase:
+    def __init__(self, id: str, agent: str, query: Optional[str] = None, expect_tool: Optional[str] = None,
+                 messages: Optional[List[dict]] = None):
+        if (query is None) == (messages is None):
+            raise ValueError(f"Eval case {id} needs either query and expect_tool or messages")
+        if query is not None and not expect_tool:
+            raise ValueError(f"Eval case {id} has a query but no expect_tool")
+        self.id = id
+        self.agent = agent
+        self.query = query
+        self.expect_tool = expect_tool
+        self.messages = messages
+
+    @property
+    def kind(self) -> str:
+        return 'tool' if self.query is not None else 'conversation'
+
+
+def load_cases(path: str) -> List[EvalCase]:
+    """Read eval cases from a YAML or JSON list."""
+    with open(path) as file:
+        data = json.load(file) if path.endswith('.json') else yaml.safe_load(file)
+    cases = [EvalCase(**case) for case in data or []]
+    ids = [case.id for case in cases]
+    duplicates = sorted({case_id for case_id in ids if ids.count(case_id) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate eval case ids: {', '.join(duplicates)}")
+    return cases
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class UsageMeter:
+    """Adds up token usage of completion calls per thread, so concurrent cases each get their own count."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self, client):
+        completions = client.chat.completions
+        create = completions.create
+
+        def metered_create(**kwargs):
+            response = create(**kwargs)
+            usage = getattr(response, 'usage', None)
+            counts = getattr(self._local, 'counts', None)
+            if usage is not None and counts is not None:
+                counts['prompt_tokens'] += usage.prompt_tokens
+                counts['completion_tokens'] += usage.completion_tokens
+                counts['model_calls'] += 1
+            return response
+
+        completions.create = metered_create
+        return client
+
+    def start(self):
+        self._local.counts = {'prompt_tokens': 0, 'completion_tokens': 0, 'model_calls': 0}
+
+    def stop(self) -> Dict[str, int]:
+        counts, self._local.counts = self._local.counts, None
+        return counts
+
+
+class EvalRunner:
+    """Runs eval cases concurrently, at most workers at a time, and reports pass rates, latency and tokens.
+
+    Tool cases run the agent on the query without executing tools and pass
+    if the first tool it calls is the expected one. Conversation cases pass
+    if the judge model rates the conversation successful.
+    """
+
+    def __init__(self, agents: Dict[str, object], swarm=None, judge_client=None, meter: Optional[UsageMeter] = None,
+                 workers: int = DEFAULT_WORKERS):
+        self.agents = agents
+        self.swarm = swarm
+        self.judge_client = judge_client
+        self.meter = meter or UsageMeter()
+        self.workers = workers
+
+    def check(self, case: EvalCase) -> tuple:
+        """Run one case and return (passed, what happened)."""
+        if case.kind == 'conversation':
+            conversation = f"CONVERSATION: {json.dumps(case.messages)}"
+            verdict = evaluate_with_llm_bool(CONVERSATIONAL_EVAL_SYSTEM_PROMPT, conversation, client=self.judge_client)
+            return verdict.value, verdict.reason
+        response = self.swarm.run(agent=self.agents[case.agent], messages=[{'role': 'user', 'content': case.query}],
+                                  execute_tools=False)
+        tool_calls = response.messages[-1].get('tool_calls') or []
+        actual = tool_calls[0]['function']['name'] if tool_calls else None
+        return actual == case.expect_tool, actual
+
+    def run_case(self, case: EvalCase) -> dict:
+        result = {'id': case.id, 'agent': case.agent, 'kind': case.kind, 'expected': case.expect_tool}
+        self.meter.start()
+        started = time.perf_counter()
+        try:
+            if case.agent not in self.agents:
+                raise ValueError(f"Unknown agent {case.agent!r}")
+            result['passed'], result['actual'] = self.check(case)
+            result['error'] = None
+        except Exception as e:
+            logging.error(f"Eval case {case.id} failed to run: {e}")
+            result.update(passed=False, actual=None, error=f"{type(e).__name__}: {e}")
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        result.update(self.meter.stop())
+        result['tokens'] = result['prompt_tokens'] + result['completion_tokens']
+        return result
+
+    def run(self, cases: List[EvalCase], progress: Optional[Callable[[dict], None]] = None) -> dict:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='eval') as pool:
+            futures = [pool.submit(self.run_case, case) for case in cases]
+            results = []
+            for future in futures:
+                results.append(future.result())
+                if progress:
+                    progress(results[-1])
+        return summarize(results, time.perf_counter() - started, self.workers)
+
+
+def _rates(results: List[dict], key: Callable[[dict], Optional[str]]) -> Dict[str, dict]:
+    groups = defaultdict(list)
+    for result in results:
+        group = key(result)
+        if group:
+            groups[group].append(result['passed'])
+    return {group: {'cases': len(passed), 'passed': sum(passed), 'pass_rate': round(sum(passed) / len(passed), 3)}
+            for group, passed in sorted(groups.items())}
+
+
+def summarize(results: List[dict], wall_s: float, workers: int) -> dict:
+    """The machine-readable report: totals, pass rates per agent and per expected tool, latency and tokens."""
+    latencies = [result['latency_ms'] for result in results]
+    tokens = [result['tokens'] for result in results]
+    passed = sum(result['passed'] for result in results)
+    return {
+        'finished_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'workers': workers,
+        'wall_s': round(wall_s, 2),
+        'cases_per_s': round(len(results) / wall_s, 2) if wall_s else None,
+        'totals': {'cases': len(results), 'passed': passed, 'errors': sum(bool(r['error']) for r in results),
+                   'pass_rate': round(passed / len(results), 3) if results else None},
+        'by_agent': _rates(results, lambda result: result['agent']),
+        'by_tool': _rates(results, lambda result: result['expected']),
+        'latency_ms': {**{f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+                       'max': max(latencies, default=None)},
+        'tokens': {'total': sum(tokens), 'per_case_mean': round(sum(tokens) / len(tokens), 1) if tokens else None,
+                   'per_case_p95': percentile(tokens, 95)},
+        'cases': results,
+    }
+
+
+def _stub_responder(messages, tools):
+    """Call the first offered tool with placeholder arguments, so every case exercises a full round trip."""
+    if not tools:
+        return "Stub reply."
+    function = tools[0]['function']
+    properties = function.get('parameters', {}).get('properties', {})
+    placeholders = {'boolean': True, 'integer': 0, 'number': 0, 'object': {}, 'array': []}
+    arguments = {name: placeholders.get(schema.get('type'), '') for name, schema in properties.items()}
+    return {'role': 'assistant', 'content': None, 'tool_calls': [
+        {'id': 'call_stub', 'type': 'function', 'function': {'name': function['name'], 'arguments': json.dumps(arguments)}}]}
+
+
+def _model_client(stub: bool, stub_latency_s: float):
+    from model_cache import openai_client
+
+    if not stub:
+        return openai_client()
+    from openai import OpenAI
+    from model_stub import StubOpenAIClient
+
+    # A real OpenAI client object, so instructor accepts it, answering through the stub.
+    client = OpenAI(api_key='stub')
+    client.chat.completions.create = StubOpenAIClient(_stub_responder, latency_s=stub_latency_s).chat.completions.create
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run agent evals concurrently and report pass rates, latency and tokens.")
+    parser.add_argument('base_path', help="Workspace the agents work in.")
+    parser.add_argument('cases', nargs='?', default=DEFAULT_CASES, help="YAML or JSON list of eval cases.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--output', help="Write the JSON report here.")
+    parser.add_argument('--stub', action='store_true', help="Use the offline stub model (measures the runner, not the agents).")
+    parser.add_argument('--stub-latency', type=float, default=0.2, help="Seconds the stub model takes per call.")
+    args = parser.parse_args(argv)
+
+    import instructor
+    from all_agents import create_agents
+    from parallel_swarm import ParallelSwarm
+    from tools.workspace import Workspace
+
+    registry = create_agents(Workspace(args.base_path))
+    agents = {alias: registry[alias] for alias in ('triage', 'code', 'git', 'context')}
+    meter = UsageMeter()
+    client = meter.install(_model_client(args.stub, args.stub_latency))
+    runner = EvalRunner(agents, ParallelSwarm(client=client), instructor.from_openai(client), meter, args.workers)
+
+    def progress(result):
+        status = 'ERROR' if result['error'] else 'PASS' if result['passed'] else 'FAIL'
+        print(f"{status:5} {result['id']} ({result['latency_ms']:.0f} ms, {result['tokens']} tokens)", file=sys.stderr)
+
+    report = runner.run(load_cases(args.cases), progress)
+    report['cases_file'] = args.cases
+    report['stub'] = args.stub
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    totals, latency = report['totals'], report['latency_ms']
+    print(f"{totals['passed']}/{totals['cases']} passed in {report['wall_s']} s ({report['cases_per_s']} cases/s), "
+          f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, {report['tokens']['total']} tokens", file=sys.stderr)
+    if not args.output:
+        print(output)
+    return 0 if totals['passed'] == totals['cases'] else 1
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    sys.exit(main())
@@ -1,70 +1,82 @@
-# from swarm import Swarm
-# from agents import triage_agent, sales_agent, refunds_agent
-# from evals_util import evaluate_with_llm_bool, BoolEvalResult
-# import pytest
-# import json
+# Agent routing and tool-selection evals. Model responses go through the
+# model cache (model_cache.py): record them once with network access, then
+# run offline and deterministically with CODEASSIST_MODEL_CACHE=replay.
 #
-# client = Swarm()
-#
-# CONVERSATIONAL_EVAL_SYSTEM_PROMPT = """
-# You will be provided with a conversation between a user and an agent, as well as a main goal for the conversation.
-# Your goal is to evaluate, based on the conversation, if the agent achieves the main goal or not.
-#
-# To assess whether the agent manages to achieve the main goal, consider the instructions present in the main goal, as well as the way the user responds:
-# is the answer satisfactory for the user or not, could the agent have done better considering the main goal?
-# It is possible that the user is not satisfied with the answer, but the agent still achieves the main goal because it is following the instructions provided as part of the main goal.
-# """
-#
-#
-# def conversation_was_successful(messages) -> bool:
-#     conversation = f"CONVERSATION: {json.dumps(messages)}"
-#     result: BoolEvalResult = evaluate_with_llm_bool(
-#         CONVERSATIONAL_EVAL_SYSTEM_PROMPT, conversation
-#     )
-#     return result.value
-#
-#
-# def run_and_get_tool_calls(agent, query):
-#     message = {"role": "user", "content": query}
-#     response = client.run(
-#         agent=agent,
-#         messages=[message],
-#         execute_tools=False,
-#     )
-#     return response.messages[-1].get("tool_calls")
-#
-#
-# @pytest.mark.parametrize(
-#     "query,function_name",
-#     [
-#         ("I want to make a refund!", "transfer_to_refunds"),
-#         ("I want to talk to sales.", "transfer_to_sales"),
-#     ],
-# )
-# def test_triage_agent_calls_correct_function(query, function_name):
-#     tool_calls = run_and_get_tool_calls(triage_agent, query)
-#
-#     assert len(tool_calls) == 1
-#     assert tool_calls[0]["function"]["name"] == function_name
-#
-#
-# @pytest.mark.parametrize(
-#     "messages",
-#     [
-#         [
-#             {"role": "user", "content": "Who is the lead singer of U2"},
-#             {"role": "assistant", "content": "Bono is the lead singer of U2."},
-#         ],
-#         [
-#             {"role": "user", "content": "Hello!"},
-#             {"role": "assistant", "content": "Hi there! How can I assist you today?"},
-#             {"role": "user", "content": "I want to make a refund."},
-#             {"role": "tool", "tool_name": "transfer_to_refunds"},
-#             {"role": "user", "content": "Thank you!"},
-#             {"role": "assistant", "content": "You're welcome! Have a great day!"},
-#         ],
-#     ],
-# )
-# def test_conversation_is_successful(messages):
-#     result = conversation_was_successful(messages)
-#     assert result == True
+#   CODEASSIST_MODEL_CACHE=record pytest evals.py
+#   CODEASSIST_MODEL_CACHE=replay pytest evals.py
+from parallel_swarm import ParallelSwarm
+from all_agents import triage_agent, code_agent, git_agent
+from evals_util import CONVERSATIONAL_EVAL_SYSTEM_PROMPT, evaluate_with_llm_bool, BoolEvalResult
+from model_cache import openai_client
+import pytest
+import json
+
+client = ParallelSwarm(client=openai_client())
+
+
+def conversation_was_successful(messages) -> bool:
+    conversation = f"CONVERSATION: {json.dumps(messages)}"
+    result: BoolEvalResult = evaluate_with_llm_bool(
+        CONVERSATIONAL_EVAL_SYSTEM_PROMPT, conversation
+    )
+    return result.value
+
+
+def run_and_get_tool_calls(agent, query):
+    message = {"role": "user", "content": query}
+    response = client.run(
+        agent=agent,
+        messages=[message],
+        execute_tools=False,
+    )
+    return response.messages[-1].get("tool_calls")
+
+
+@pytest.mark.parametrize(
+    "query,function_name",
+    [
+        ("Fix the failing test in tests/test_gitignore.py", "transfer_to_coding_assistant"),
+        ("Commit my changes with a sensible message", "transfer_to_git_assistant"),
+        ("Update the context entry for run.py", "transfer_to_context_assistant"),
+    ],
+)
+def test_triage_agent_calls_correct_function(query, function_name):
+    tool_calls = run_and_get_tool_calls(triage_agent, query)
+
+    assert len(tool_calls) == 1
+    assert tool_calls[0]["function"]["name"] == function_name
+
+
+@pytest.mark.parametrize(
+    "agent,query,function_name",
+    [
+        (code_agent, "Show me the contents of run.py", "read_file"),
+        (code_agent, "Where is the string 'HistoryManager' used?", "find_string_in_files"),
+        (git_agent, "What files have I changed?", "git_status"),
+    ],
+)
+def test_agent_selects_tool(agent, query, function_name):
+    tool_calls = run_and_get_tool_calls(agent, query)
+
+    assert tool_calls
+    assert tool_calls[0]["function"]["name"] == function_name
+
+
+@pytest.mark.parametrize(
+    "messages",
+    [
+        [
+            {"role": "user", "content": "Which file starts the command line interface?"},
+            {"role": "assistant", "content": "run.py starts the CLI; it asks you to pick an agent and then runs the chat loop."},
+        ],
+        [
+            {"role": "user", "content": "Commit my changes."},
+            {"role": "tool", "tool_name": "transfer_to_git_assistant"},
+            {"role": "tool", "tool_name": "git_commit", "content": "[master 1a2b3c4] Fix typo in README"},
+            {"role": "assistant", "content": "Committed your changes as 1a2b3c4."},
+        ],
+    ],
+)
+def test_conversation_is_successful(messages):
+    result = conversation_was_successful(messages)
+    assert result == True
@@ -1,9 +1,27 @@
-from openai import OpenAI
 import instructor
 from pydantic import BaseModel
 from typing import Optional
 
-__client = instructor.from_openai(OpenAI())
+from model_cache import openai_client
+
+__client = None
+
+CONVERSATIONAL_EVAL_SYSTEM_PROMPT = """
+You will be provided with a conversation between a user and an agent, as well as a main goal for the conversation.
+Your goal is to evaluate, based on the conversation, if the agent achieves the main goal or not.
+
+To assess whether the agent manages to achieve the main goal, consider the instructions present in the main goal, as well as the way the user responds:
+is the answer satisfactory for the user or not, could the agent have done better considering the main goal?
+It is possible that the user is not satisfied with the answer, but the agent still achieves the main goal because it is following the instructions provided as part of the main goal.
+"""
+
+
+def _client():
+    # The cache goes on the OpenAI client before instructor wraps it, so judgements are recorded and replayed too.
+    global __client
+    if __client is None:
+        __client = instructor.from_openai(openai_client())
+    return __client
 
 
 class BoolEvalResult(BaseModel):
@@ -11,13 +29,15 @@ class BoolEvalResult(BaseModel):
     reason: Optional[str]
 
 
-def evaluate_with_llm_bool(instruction, data) -> BoolEvalResult:
-    eval_result, _ = __client.chat.completions.create_with_completion(
+def evaluate_with_llm_bool(instruction, data, client=None) -> BoolEvalResult:
+    """Ask the judge model for a yes/no verdict; client is an instructor client to use instead of the default."""
+    eval_result, _ = (client or _client()).chat.completions.create_with_completion(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": instruction},
             {"role": "user", "content": data},
         ],
         response_model=BoolEvalResult,
+        temperature=0,
     )
     return eval_result
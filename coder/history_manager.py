@@ -0,0 +1,281 @@
+import os
+import json
+import difflib
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tools.token_count import count_tokens
+
+# Token budget for the history sent with each request (the agent's instructions come on top).
+DEFAULT_BUDGET_TOKENS = int(os.environ.get('CODEASSIST_HISTORY_TOKENS', 60000))
+# Tool outputs in this many most recent turns are never replaced by stubs.
+KEEP_RECENT_TURNS = 2
+# Tool outputs shorter than this are not worth replacing.
+MIN_STUB_TOKENS = 100
+# The rolling summary is trimmed (oldest lines first) to stay under this size.
+MAX_SUMMARY_TOKENS = 2000
+SNIPPET_CHARS = 200
+# Tool outputs shorter than this are never replaced by references or diffs.
+MIN_DEDUP_TOKENS = 50
+# A changed output is sent as a diff only if the diff is at most this fraction of the full output.
+MAX_DIFF_RATIO = 0.5
+
+# Bookkeeping keys kept on messages in the history and stripped before sending.
+PRIVATE_KEYS = ('stubbed', 'content_hash', 'source_key', 'base_hash')
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def _snippet(text: Optional[str]) -> str:
+    text = ' '.join((text or '').split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS] + '...'
+
+
+def extractive_summarizer(summary: str, messages: List[dict]) -> str:
+    """Fold messages into the summary without a model call: one line per user request and per reply."""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        if message['role'] == 'user':
+            lines.append(f"- User: {_snippet(message.get('content'))}")
+        elif message['role'] == 'assistant':
+            tools = [call['function']['name'] for call in message.get('tool_calls') or []]
+            if tools:
+                lines.append(f"- {message.get('sender') or 'Assistant'} called {', '.join(tools)}")
+            if message.get('content'):
+                lines.append(f"- {message.get('sender') or 'Assistant'}: {_snippet(message['content'])}")
+    while len(lines) > 1 and count_tokens('\n'.join(lines)) > MAX_SUMMARY_TOKENS:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def llm_summarizer(client, model: str = 'gpt-4o-mini') -> Callable[[str, List[dict]], str]:
+    """A summarizer that asks the model to merge the dropped turns into the running summary."""
+    def summarize(summary: str, messages: List[dict]) -> str:
+        transcript = "\n".join(f"{m['role']}: {_snippet(m.get('content')) or '(tool calls)'}" for m in messages)
+        response = client.chat.completions.create(model=model, messages=[
+            {'role': 'system', 'content': "Merge the conversation excerpt into the running summary. Keep decisions, "
+                                          "file names, open tasks and user preferences. Reply with the new summary "
+                                          f"only, under {MAX_SUMMARY_TOKENS // 2} words."},
+            {'role': 'user', 'content': f"Running summary:\n{summary or '(empty)'}\n\nExcerpt:\n{transcript}"}])
+        return response.choices[0].message.content.strip()
+    return summarize
+
+
+class HistoryManager:
+    """Conversation history for the REPL, kept within a token budget.
+
+    When the history grows past the budget, tool outputs from older turns are
+    replaced by stubs naming the call that produced them, so the model can
+    run it again if it still needs the output. If that is not enough, whole
+    turns from the start are folded into a rolling summary. Whole turns are
+    dropped so every tool result keeps its tool call. The latest turn is
+    always kept as is.
+
+    Tool outputs are also stored by content hash. An output identical to
+    one still shown earlier in the history is sent as a short reference to
+    it. An output of the same call (tool and arguments) that changed since
+    its last full copy is sent as a diff against that copy. The earlier
+    messages are left untouched, so the prefix of the request stays the same
+    and the provider's prompt cache keeps hitting. If compaction removes a
+    full copy, the references and diffs based on it get their full text back.
+    """
+
+    def __init__(self, budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+                 summarizer: Callable[[str, List[dict]], str] = extractive_summarizer, dedup: bool = True):
+        self.budget_tokens = budget_tokens
+        self.summarizer = summarizer
+        self.dedup = dedup
+        self.messages: List[dict] = []
+        self._tokens: List[int] = []
+        self.summary = ''
+        # Content-addressed tool outputs: sha256 -> text, each distinct output stored once.
+        self.outputs: Dict[str, str] = {}
+        self._stats = {'stubbed': 0, 'folded_turns': 0, 'tokens_saved': 0,
+                       'dedup_refs': 0, 'dedup_diffs': 0, 'dedup_tokens_saved': 0}
+
+    @staticmethod
+    def message_tokens(message: dict) -> int:
+        tokens = count_tokens(message.get('content') or '')
+        for call in message.get('tool_calls') or []:
+            tokens += count_tokens(call['function']['name']) + count_tokens(call['function']['arguments'] or '')
+        # Role, names and separators.
+        return tokens + 4
+
+    def append(self, message: dict):
+        if self.dedup and message.get('role') == 'tool':
+            message = self._dedup(message)
+        self.messages.append(message)
+        self._tokens.append(self.message_tokens(message))
+
+    # Deduplication
+
+    def _describe_call(self, message: dict) -> Tuple[str, Optional[str]]:
+        """Readable call ('read_file(file_name_with_path='a.py')') and a canonical key for the tool message's call."""
+        function = self._tool_calls().get(message.get('tool_call_id'), {})
+        name = function.get('name') or message.get('tool_name') or 'tool'
+        try:
+            arguments = json.loads(function.get('arguments') or '{}')
+        except (TypeError, ValueError):
+            return f"{name}({function.get('arguments')})", None
+        if not isinstance(arguments, dict):
+            return f"{name}({arguments!r})", None
+        call = f"{name}({', '.join(f'{key}={value!r}' for key, value in arguments.items())})"
+        return call, name + json.dumps(arguments, sort_keys=True)
+
+    def _full_copy(self, predicate) -> Optional[dict]:
+        """The latest message still showing its whole tool output that matches predicate."""
+        for message in reversed(self.messages):
+            if (message.get('role') == 'tool' and message.get('content_hash') and not message.get('base_hash')
+                    and not message.get('stubbed') and predicate(message)):
+                return message
+        return None
+
+    def _dedup(self, message: dict) -> dict:
+        content = message.get('content') or ''
+        if not isinstance(content, str):
+            return message
+        call, key = self._describe_call(message)
+        digest = hashlib.sha256(content.encode('utf-8', errors='replace')).hexdigest()
+        self.outputs[digest] = content
+        message = {**message, 'content_hash': digest, 'source_key': key}
+        full_tokens = count_tokens(content)
+        if full_tokens < MIN_DEDUP_TOKENS:
+            return message
+
+        same = self._full_copy(lambda m: m['content_hash'] == digest)
+        if same is not None:
+            replacement = f"[Same output as the earlier {call} result above (ref {digest[:12]}).]"
+            self._stats['dedup_refs'] += 1
+            self._stats['dedup_tokens_saved'] += full_tokens - count_tokens(replacement)
+            return {**message, 'content': replacement, 'base_hash': digest}
+
+        previous = self._full_copy(lambda m: key is not None and m.get('source_key') == key)
+        if previous is not None:
+            old = self.outputs[previous['content_hash']]
+            diff = ''.join(difflib.unified_diff(old.splitlines(keepends=True), content.splitlines(keepends=True),
+                                                'earlier', 'now', n=2))
+            if diff and len(diff) <= MAX_DIFF_RATIO * len(content):
+                replacement = (f"[{call} output changed since the earlier call above "
+                               f"(ref {previous['content_hash'][:12]}). Unified diff against it:]\n{diff}")
+                self._stats['dedup_diffs'] += 1
+                self._stats['dedup_tokens_saved'] += full_tokens - count_tokens(replacement)
+                return {**message, 'content': replacement, 'base_hash': previous['content_hash']}
+        return message
+
+    def _restore_dependents(self, removed_hashes: set):
+        """Give messages whose reference or diff base is no longer shown their full output back."""
+        if not removed_hashes:
+            return
+        for i, message in enumerate(self.messages):
+            base = message.get('base_hash')
+            if base not in removed_hashes or message.get('stubbed'):
+                continue
+            if base == message['content_hash'] and any(
+                    m.get('content_hash') == base and not m.get('base_hash') and not m.get('stubbed')
+                    for m in self.messages[:i]):
+                # An identical output restored earlier in this pass is now the one it refers to.
+                continue
+            restored = {key: value for key, value in message.items() if key != 'base_hash'}
+            restored['content'] = self.outputs[message['content_hash']]
+            self.messages[i] = restored
+            self._tokens[i] = self.message_tokens(restored)
+
+    def _collect_outputs(self):
+        """Drop stored outputs no message in the history refers to any more."""
+        used = {message.get('content_hash') for message in self.messages} | \
+               {message.get('base_hash') for message in self.messages}
+        for digest in list(self.outputs):
+            if digest not in used:
+                del self.outputs[digest]
+
+    def extend(self, messages: List[dict]):
+        for message in messages:
+            self.append(message)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self._tokens) + (count_tokens(self.summary) + 4 if self.summary else 0)
+
+    def _turn_starts(self) -> List[int]:
+        return [i for i, message in enumerate(self.messages) if message['role'] == 'user']
+
+    def _tool_calls(self) -> Dict[str, dict]:
+        calls = {}
+        for message in self.messages:
+            for call in message.get('tool_calls') or []:
+                calls[call['id']] = call['function']
+        return calls
+
+    def _stub_old_tool_outputs(self, end: int):
+        """Replace tool outputs before index end with stubs, oldest first, until the history fits."""
+        removed = set()
+        for i in range(end):
+            if self.total_tokens <= self.budget_tokens:
+                break
+            message = self.messages[i]
+            if message['role'] != 'tool' or message.get('stubbed') or self._tokens[i] < MIN_STUB_TOKENS:
+                continue
+            call, _ = self._describe_call(message)
+            saved = self._tokens[i]
+            self.messages[i] = {**message, 'stubbed': True, 'content':
+                                f"[Output of {call} removed to save context ({saved} tokens). "
+                                f"Call the tool again if you need it.]"}
+            self._tokens[i] = self.message_tokens(self.messages[i])
+            if message.get('content_hash') and not message.get('base_hash'):
+                removed.add(message['content_hash'])
+            self._stats['stubbed'] += 1
+            self._stats['tokens_saved'] += saved - self._tokens[i]
+        self._restore_dependents(removed)
+
+    def _fold_old_turns(self):
+        """Move whole turns from the start into the summary until the history fits."""
+        starts = self._turn_starts()
+        drop = 0
+        for start in starts[1:]:
+            if self.total_tokens - sum(self._tokens[:start]) <= self.budget_tokens:
+                drop = start
+                break
+            drop = start
+        if not drop:
+            return
+        before = self.total_tokens
+        self.summary = self.summarizer(self.summary, self.messages[:drop])
+        folded = len([i for i in starts if i < drop])
+        removed = {m['content_hash'] for m in self.messages[:drop]
+                   if m.get('content_hash') and not m.get('base_hash') and not m.get('stubbed')}
+        del self.messages[:drop]
+        del self._tokens[:drop]
+        self._restore_dependents(removed)
+        self._stats['folded_turns'] += folded
+        self._stats['tokens_saved'] += max(before - self.total_tokens, 0)
+
+    def compact(self):
+        """Bring the history within budget, if it is not already."""
+        if self.total_tokens <= self.budget_tokens:
+            return
+        before = self.total_tokens
+        starts = self._turn_starts()
+        protected = starts[-KEEP_RECENT_TURNS] if len(starts) >= KEEP_RECENT_TURNS else 0
+        self._stub_old_tool_outputs(protected)
+        if self.total_tokens > self.budget_tokens:
+            self._fold_old_turns()
+        self._collect_outputs()
+        if self.total_tokens > self.budget_tokens:
+            logging.warning(f"History is {self.total_tokens} tokens after compaction, over the budget of "
+                            f"{self.budget_tokens}; the latest turn alone is too large to shrink.")
+        logging.debug(f"History compacted from {before} to {self.total_tokens} tokens: {self._stats}")
+
+    def window(self) -> List[dict]:
+        """Messages to send with the next request: the rolling summary, if any, then the history."""
+        self.compact()
+        messages = [{key: value for key, value in message.items() if key not in PRIVATE_KEYS}
+                    for message in self.messages]
+        if self.summary:
+            messages.insert(0, {'role': 'system', 'content': SUMMARY_PREFIX + self.summary})
+        return messages
+
+    def stats(self) -> dict:
+        return {**self._stats, 'messages': len(self.messages), 'tokens': self.total_tokens,
+                'budget_tokens': self.budget_tokens, 'stored_outputs': len(self.outputs),
+                'stored_bytes': sum(len(text) for text in self.outputs.values())}
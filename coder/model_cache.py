@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from tools.atomic_io import atomic_write_text
+
+CACHE_DIR = os.environ.get('CODEASSIST_MODEL_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '.codeassist', 'model_cache'))
+# auto: replay hits, call the model on a miss and record it.
+# record: always call the model and overwrite the recording.
+# replay: never call the model; a miss is an error (offline CI).
+# off: no caching at all.
+MODES = ('auto', 'record', 'replay', 'off')
+DEFAULT_MODE = os.environ.get('CODEASSIST_MODEL_CACHE', 'auto')
+# Least recently used recordings are evicted once the cache grows past this.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Arguments that do not change the response and are left out of the key.
+IGNORED_ARGS = ('timeout', 'extra_headers', 'extra_query', 'extra_body', 'stream_options')
+
+
+class CacheMiss(Exception):
+    pass
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(exclude_none=True)
+    raise TypeError(f"Cannot use {type(value).__name__} in a cache key")
+
+
+def cache_key(model: str, messages: List[dict], tools: Optional[list] = None, **kwargs) -> str:
+    """sha256 of the request in canonical JSON (sorted keys, no whitespace), so equal requests share a key."""
+    request = {'model': model, 'messages': messages, 'tools': tools or None}
+    request.update((key, value) for key, value in kwargs.items() if key not in IGNORED_ARGS and value is not None)
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_jsonable)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ModelCache:
+    """On-disk record/replay cache for chat completion responses.
+
+    Each response is stored as JSON under its cache_key, a plain completion
+    as the completion and a streamed one as its list of chunks; replays
+    return real openai response objects. Hits refresh the file's mtime and,
+    once the cache outgrows max_bytes, the least recently used recordings
+    are removed. The cache's size is kept as a running total, so the
+    directory is only walked on the first recording and when the total
+    crosses max_bytes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, mode: str = DEFAULT_MODE, max_bytes: int = DEFAULT_MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"Unknown model cache mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'recorded': 0, 'evicted': 0}
+        # Bytes on disk as of the last walk plus what was recorded since; None until the first walk.
+        self._size: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def load(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def store(self, key: str, entry: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        atomic_write_text(path, data, fsync=False)
+        with self._lock:
+            self._stats['recorded'] += 1
+            if self._size is not None:
+                self._size += len(data.encode()) - replaced
+            full = self._size is None or self._size > self.max_bytes
+        if full:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used recordings until the cache fits in max_bytes."""
+        files = []
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats['evicted'] += 1
+        with self._lock:
+            self._size = total
+
+    def create(self, create, **kwargs):
+        """Serve a chat.completions.create(**kwargs) call from the cache, calling create() on a miss."""
+        if self.mode == 'off':
+            return create(**kwargs)
+        key = cache_key(**kwargs)
+        entry = self.load(key) if self.mode != 'record' else None
+        if entry is not None:
+            with self._lock:
+                self._stats['hits'] += 1
+            logging.debug(f"Model cache hit {key[:12]} for {kwargs.get('model')}")
+            if 'chunks' in entry:
+                return (ChatCompletionChunk.model_validate(chunk) for chunk in entry['chunks'])
+            return ChatCompletion.model_validate(entry['completion'])
+        with self._lock:
+            self._stats['misses'] += 1
+        if self.mode == 'replay':
+            raise CacheMiss(f"No recorded response for {kwargs.get('model')} request {key[:12]} in {self.directory}")
+        started = time.perf_counter()
+        response = create(**kwargs)
+        if kwargs.get('stream'):
+            return self._record_stream(key, response)
+        logging.debug(f"Model cache recorded {key[:12]} in {time.perf_counter() - started:.2f} s")
+        self.store(key, {'completion': response.model_dump()})
+        return response
+
+    def _record_stream(self, key: str, response) -> Iterator[ChatCompletionChunk]:
+        chunks = []
+        for chunk in response:
+            chunks.append(chunk.model_dump())
+            yield chunk
+        # Only complete streams are recorded; a consumer that stopped early leaves no entry.
+        self.store(key, {'chunks': chunks})
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+def install(client, cache: Optional[ModelCache] = None):
+    """Route client.chat.completions.create through the cache and return the client.
+
+    Works for openai.OpenAI, StubOpenAIClient and the client inside a Swarm
+    (swarm.client). For instructor, install the cache on the OpenAI client
+    before passing it to instructor.from_openai, which captures create.
+    """
+    cache = cache or ModelCache()
+    completions = client.chat.completions
+    create = completions.create
+    completions.create = lambda **kwargs: cache.create(create, **kwargs)
+    client.model_cache = cache
+    return client
+
+
+def openai_client(cache: Optional[ModelCache] = None):
+    """An OpenAI client behind the model cache. In replay mode no API key is needed."""
+    from openai import OpenAI
+
+    cache = cache or ModelCache()
+    api_key = os.environ.get('OPENAI_API_KEY') or ('replay-only' if cache.mode == 'replay' else None)
+    return install(OpenAI(api_key=api_key), cache)
@@ -0,0 +1,120 @@
+import time
+import uuid
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Callable, List, Optional, Union
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+
+def default_responder(messages: List[dict], tools: Optional[list] = None) -> str:
+    """Deterministic reply built from the last user message: its first non-empty line and its length."""
+    content = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+    lines = content.splitlines()
+    first = next((line.strip() for line in lines if line.strip()), '')
+    return f"Stub summary: {first[:80]} ({len(lines)} lines)."
+
+
+class _Completions:
+    def __init__(self, client: 'StubOpenAIClient'):
+        self._client = client
+
+    def create(self, model: str, messages: List[dict], stream: bool = False, tools: Optional[list] = None, **kwargs):
+        client = self._client
+        if client.latency_s:
+            time.sleep(client.latency_s)
+        result = client._respond(model, messages, stream, tools, kwargs)
+        return client._paced(result) if stream else result
+
+
+class _AsyncCompletions:
+    def __init__(self, client: 'AsyncStubOpenAIClient'):
+        self._client = client
+
+    async def create(self, model: str, messages: List[dict], stream: bool = False, tools: Optional[list] = None,
+                     **kwargs):
+        client = self._client
+        if client.latency_s:
+            await asyncio.sleep(client.latency_s)
+        result = client._respond(model, messages, stream, tools, kwargs)
+        return client._paced_async(result) if stream else result
+
+
+class StubOpenAIClient:
+    """Offline stand-in for openai.OpenAI() covering chat.completions.create.
+
+    Replies come from responder(messages, tools), which returns the reply
+    text or a full assistant message dict (e.g. with tool_calls). Results are
+    real openai response types, so code written against the client (swarm
+    included) runs unchanged. Every request is recorded in calls. latency_s
+    delays each response and chunk_delay_s each streamed chunk, to simulate
+    a slow model.
+    """
+
+    def __init__(self, responder: Callable[[List[dict], Optional[list]], Union[str, dict]] = default_responder,
+                 latency_s: float = 0.0, chunk_delay_s: float = 0.0):
+        self.responder = responder
+        self.latency_s = latency_s
+        self.chunk_delay_s = chunk_delay_s
+        self.calls: List[dict] = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _respond(self, model: str, messages: List[dict], stream: bool, tools: Optional[list], kwargs: dict):
+        """Record the request and build the completion, or the list of chunks when streaming."""
+        with self._lock:
+            self.calls.append({'model': model, 'messages': messages, 'tools': tools, 'stream': stream, **kwargs})
+        reply = self.responder(messages, tools)
+        message = {'role': 'assistant', 'content': reply} if isinstance(reply, str) else dict(reply)
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        if stream:
+            return self._chunks(completion_id, created, model, message)
+        prompt_tokens = sum(len(str(m.get('content') or '')) // 4 for m in messages)
+        completion_tokens = len(message.get('content') or '') // 4
+        return ChatCompletion.model_validate({
+            'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': model,
+            'choices': [{'index': 0, 'finish_reason': 'tool_calls' if message.get('tool_calls') else 'stop',
+                         'message': message}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        })
+
+    @staticmethod
+    def _chunks(completion_id: str, created: int, model: str, message: dict) -> List[ChatCompletionChunk]:
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> ChatCompletionChunk:
+            return ChatCompletionChunk.model_validate({
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            })
+
+        chunks = [chunk({'role': 'assistant', 'content': ''})]
+        words = (message.get('content') or '').split(' ')
+        for i, word in enumerate(words):
+            if word or i:
+                chunks.append(chunk({'content': word if i == 0 else ' ' + word}))
+        for index, tool_call in enumerate(message.get('tool_calls') or []):
+            chunks.append(chunk({'tool_calls': [{'index': index, **tool_call}]}))
+        chunks.append(chunk({}, 'tool_calls' if message.get('tool_calls') else 'stop'))
+        return chunks
+
+    def _paced(self, chunks: List[ChatCompletionChunk]):
+        for i, chunk in enumerate(chunks):
+            if i and self.chunk_delay_s:
+                time.sleep(self.chunk_delay_s)
+            yield chunk
+
+    async def _paced_async(self, chunks: List[ChatCompletionChunk]):
+        for i, chunk in enumerate(chunks):
+            if i and self.chunk_delay_s:
+                await asyncio.sleep(self.chunk_delay_s)
+            yield chunk
+
+
+class AsyncStubOpenAIClient(StubOpenAIClient):
+    """The stub as an openai.AsyncOpenAI() stand-in: create is a coroutine and streams are async iterators."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(self))
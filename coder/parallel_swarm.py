@@ -0,0 +1,60 @@
+import json
+from typing import List
+
+from swarm import Swarm
+from swarm.core import __CTX_VARS_NAME__
+from swarm.types import AgentFunction, ChatCompletionMessageToolCall, Response
+from swarm.util import debug_print
+
+from tools.tool_executor import DEFAULT_WORKERS, ToolExecutor
+
+
+class ParallelSwarm(Swarm):
+    """Swarm that runs the tool calls of one model turn concurrently.
+
+    The agents set parallel_tool_calls, so the model often asks for several
+    reads or searches at once; Swarm would run them one after another. Here
+    they go through a ToolExecutor, which keeps writes to the same path (and
+    shell commands) in order and returns the tool messages in the order of
+    the calls, exactly as Swarm would.
+    """
+
+    def __init__(self, client=None, workers: int = DEFAULT_WORKERS):
+        super().__init__(client)
+        self.tool_executor = ToolExecutor(workers)
+
+    def handle_tool_calls(self, tool_calls: List[ChatCompletionMessageToolCall], functions: List[AgentFunction],
+                          context_variables: dict, debug: bool) -> Response:
+        function_map = {f.__name__: f for f in functions}
+        partial_response = Response(messages=[], agent=None, context_variables={})
+
+        calls = []
+        for tool_call in tool_calls:
+            name = tool_call.function.name
+            if name not in function_map:
+                debug_print(debug, f"Tool {name} not found in function map.")
+                continue
+            args = json.loads(tool_call.function.arguments)
+            debug_print(debug, f"Processing tool call: {name} with arguments {args}")
+            func = function_map[name]
+            if __CTX_VARS_NAME__ in func.__code__.co_varnames:
+                args[__CTX_VARS_NAME__] = context_variables
+            calls.append((name, func, args))
+        results = iter(self.tool_executor.run(calls))
+
+        for tool_call in tool_calls:
+            name = tool_call.function.name
+            if name not in function_map:
+                partial_response.messages.append({"role": "tool", "tool_call_id": tool_call.id, "tool_name": name,
+                                                  "content": f"Error: Tool {name} not found."})
+                continue
+            call_result = next(results)
+            if call_result.error is not None:
+                raise call_result.error
+            result = self.handle_function_result(call_result.value, debug)
+            partial_response.messages.append({"role": "tool", "tool_call_id": tool_call.id, "tool_name": name,
+                                              "content": result.value})
+            partial_response.context_variables.update(result.context_variables)
+            if result.agent:
+                partial_response.agent = result.agent
+        return partial_response
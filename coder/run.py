@@ -1,15 +1,22 @@
-from swarm.repl import run_demo_loop
-from all_agents import triage_agent
-from all_agents import facets_agent
-from all_agents import code_agent
-from all_agents import git_agent  # Import Git agent
-from swarm import Swarm
+import time
+
+STARTED = time.perf_counter()
+
+# Only light modules are imported here; swarm, openai and the agents load on first use (see all_agents.AgentRegistry).
+from all_agents import DEFAULT_BASE_PATH, create_agents
+from tools.content_cache import log_cache_stats
+from tools.workspace import Workspace
+from history_manager import HistoryManager
+import os
 import json
 import logging
-import time
 import sys
+import argparse
+import threading
 
 log_file = 'app.log'  # Specify your log file path
+PARAMETERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parameters.json')
+model_override = None
 
 def setup_logging():
     # File handler
@@ -32,21 +39,44 @@ def setup_logging():
     return logger  # Return the logger
 
 def load_parameters():
-    with open('parameters.json') as f:
+    with open(PARAMETERS_FILE) as f:
         parameters = json.load(f)
     return parameters.get('model', 'gpt-4o-mini')
 
-# Setup logging
-logger = setup_logging()  # Store the logger instance
 
-# Log the model being used
-model_override = load_parameters()
-logger.info(f'Model being used: {model_override}')
+def elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+class WaitingIndicator:
+    """Prints dots while the model has not answered yet; stop() clears them at the first token and times it."""
+
+    def __init__(self, interval_s: float = 0.5):
+        self.started = time.perf_counter()
+        self.first_token_ms = None
+        self._stopped = threading.Event()
+        print("\033[96mWaiting for response...\033[0m", end="", flush=True)
+        self._thread = threading.Thread(target=self._tick, args=(interval_s,), daemon=True)
+        self._thread.start()
+
+    def _tick(self, interval_s: float):
+        while not self._stopped.wait(interval_s):
+            print(".", end="", flush=True)
+
+    def stop(self):
+        if self.first_token_ms is not None:
+            return
+        self.first_token_ms = elapsed_ms(self.started)
+        self._stopped.set()
+        self._thread.join()
+        print("\r\033[K", end="", flush=True)  # Erase the indicator line
 
-# Print the model being used
-print(f'\033[92mModel being used: {model_override}\033[0m')
+    def finish(self):
+        self.stop()
+        logging.info(f"Turn timing: first_token_ms={self.first_token_ms} total_ms={elapsed_ms(self.started)}")
 
-def process_and_print_streaming_response(response):
+
+def process_and_print_streaming_response(response, indicator: WaitingIndicator):
     content = ""
     last_sender = ""
 
@@ -55,6 +85,7 @@ def process_and_print_streaming_response(response):
             last_sender = chunk["sender"]
 
         if "content" in chunk and chunk["content"] is not None:
+            indicator.stop()
             if not content and last_sender:
                 print(f"\n\033[94m{last_sender}:\033[0m", end=" ", flush=True)
                 last_sender = ""
@@ -67,6 +98,7 @@ def process_and_print_streaming_response(response):
                 name = f["name"]
                 if not name:
                     continue
+                indicator.stop()
                 print(f"\033[94m{last_sender}: \033[95m{name}\033[0m()")
 
         if "delim" in chunk and chunk["delim"] == "end" and content:
@@ -101,12 +133,14 @@ def pretty_print_messages(messages) -> None:
 
 
 def run_demo_loop(
-        starting_agent, context_variables=None, stream=True, debug=False
+        starting_agent, agent_aliases, context_variables=None, stream=True, debug=False
 ) -> None:
-    client = Swarm()
+    from parallel_swarm import ParallelSwarm
+
+    client = ParallelSwarm()
     print("\033[92mStarting Swarm CLI 🐝\033[0m")
 
-    messages = []
+    history = HistoryManager()
     agent = starting_agent
 
     while True:
@@ -137,17 +171,12 @@ def run_demo_loop(
             else:
                 print("\033[91mInvalid alias! Please try again.\033[0m")
 
-        messages.append({"role": "user", "content": user_input})
-
-        print("\033[96mWaiting for response...\033[0m", end="", flush=True)
-        for _ in range(3):  # Simple loading indicator
-            print(".", end="", flush=True)
-            time.sleep(0.5)
-        print()  # New line after loading indicator
+        history.append({"role": "user", "content": user_input})
 
+        indicator = WaitingIndicator()
         response = client.run(
             agent=agent,
-            messages=messages,
+            messages=history.window(),
             context_variables=context_variables or {},
             stream=stream,
             model_override=model_override,
@@ -155,36 +184,70 @@ def run_demo_loop(
         )
 
         if stream:
-            response = process_and_print_streaming_response(response)
+            response = process_and_print_streaming_response(response, indicator)
+            indicator.finish()
         else:
+            indicator.finish()
             pretty_print_messages(response.messages)
 
-        messages.extend(response.messages)
+        history.extend(response.messages)
         agent = response.agent  # Update to the new agent after response
+        log_cache_stats()
+        logging.debug(f"History: {history.stats()}")
+        logging.debug(f"Tool calls: {client.tool_executor.stats()}")
+
+
+def measure_startup(agents) -> dict:
+    """Startup cost in milliseconds: until the agent menu, importing the agent modules, then building each agent."""
+    timings = {'startup_ms': elapsed_ms(STARTED)}
+    started = time.perf_counter()
+    agents.preload()
+    timings['import_agents_ms'] = elapsed_ms(started)
+    timings['build_ms'] = {}
+    for alias in agents:
+        started = time.perf_counter()
+        agents[alias]
+        timings['build_ms'][alias] = elapsed_ms(started)
+    return timings
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat with the coding agents on a workspace.")
+    parser.add_argument('base_path', nargs='?', default=DEFAULT_BASE_PATH, help="Workspace the agents work in.")
+    parser.add_argument('--timings', action='store_true', help="Print startup timings as JSON and exit.")
+    args = parser.parse_args()
+
+    # Setup logging
+    logger = setup_logging()  # Store the logger instance
+    agent_aliases = create_agents(Workspace(args.base_path))
+    if args.timings:
+        print(json.dumps(measure_startup(agent_aliases), indent=2))
+        sys.exit(0)
+
+    # Log the model being used
+    model_override = load_parameters()
+    logger.info(f'Model being used: {model_override}')
+
+    # Print the model being used
+    print(f'\033[92mModel being used: {model_override}\033[0m')
+    print("Base Path: " + agent_aliases.workspace.root)
+
     # Prompt user to select an agent
     agents = {
-        "1": code_agent,
-        "2": triage_agent,
-        "3": facets_agent,
-        "4": git_agent  # Added Git agent to the options
-    }
-
-    agent_aliases = {
-        'code': code_agent,
-        'triage': triage_agent,
-        'facets': facets_agent,
-        'git': git_agent
+        "1": 'code',
+        "2": 'triage',
+        "3": 'facets',
+        "4": 'git'  # Added Git agent to the options
     }
 
     print("\033[1m\033[92mWelcome to the Swarm CLI!\033[0m\n")
+    logger.info(f"Startup: {elapsed_ms(STARTED)} ms to the agent menu")
+    # Import swarm, openai and the agent modules while the user picks an agent
+    threading.Thread(target=agent_aliases.preload, daemon=True).start()
     while True:
         print("\033[1mSelect an agent to interact with:\033[0m")
-        for key in agents.keys():
-          alias = [k for k, v in agent_aliases.items() if v == agents[key]]
-          print(f"\033[93m{key}:\033[0m {agents[key].name} (/{', '.join(alias)})" if alias else f"\033[93m{key}:\033[0m {agents[key].name}")
+        for key, alias in agents.items():
+            print(f"\033[93m{key}:\033[0m {agent_aliases.name(alias)} (/{alias})")
         print("\033[90m0: Exit\033[0m")
 
         selected_agent = input("Enter the number of the agent you want to use or type an alias: ")
@@ -192,8 +255,8 @@ if __name__ == "__main__":
             print("\033[92mExiting the agent selection.\033[0m")
             break
         elif selected_agent in agents:
-            run_demo_loop(agents[selected_agent])
+            run_demo_loop(agent_aliases[agents[selected_agent]], agent_aliases)
         elif selected_agent in agent_aliases:
-            run_demo_loop(agent_aliases[selected_agent])
+            run_demo_loop(agent_aliases[selected_agent], agent_aliases)
         else:
             print("\033[91mInvalid selection! Please try again.\033[0m")
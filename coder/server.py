@@ -1,8 +1,17 @@
-from flask import Flask, request, jsonify
-from pymongo import MongoClient, DESCENDING
+from flask import Flask, Response, request, jsonify
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 import uuid
 import os
-from datetime import datetime
+import argparse
+import time
+import logging
+
+import chat_history
+from chat_history import TurnEvents, load_thread, resume_agent, sse, to_document
+from all_agents import DEFAULT_BASE_PATH, create_agents
+from history_manager import HistoryManager
+from tools.workspace import Workspace, workspace_root
 
 app = Flask(__name__)
 
@@ -13,64 +22,134 @@ mongo_connection_string = os.environ.get('MONGO_CONNECTION_STRING', 'mongodb://l
 client = MongoClient(mongo_connection_string)
 db = client.chat_database
 messages_collection = db.messages
+# Threads started on a named workspace; threads without a record use the server's own (base_path)
+threads_collection = db.threads
+# The server's workspace: the path given on the command line, else CODEASSIST_BASE_PATH or the working directory
+base_path = DEFAULT_BASE_PATH
+thread_totals = chat_history.ThreadTotals()
+indexes_ready = False
+
+DEFAULT_AGENT = 'triage'
+
+# Created on first use, so the app can be imported without model credentials or loading swarm and openai.
+swarm_client = None
+
+
+def get_swarm():
+    global swarm_client
+    if swarm_client is None:
+        from parallel_swarm import ParallelSwarm
+        swarm_client = ParallelSwarm()
+    return swarm_client
+
+
+def thread_agents(thread_id):
+    """A fresh set of agents for one turn, bound to the workspace the thread was started on."""
+    thread = threads_collection.find_one({'_id': thread_id}, {'workspace': 1})
+    return create_agents(Workspace(workspace_root(thread.get('workspace') if thread else None, base_path)))
+
+
+def stream_agent_turn(thread_id, agent, history, user_message, started):
+    """Run one agent turn and yield it as SSE events; the messages are written to MongoDB once, at the end."""
+    turn = TurnEvents(thread_id, agent.name, started)
+    yield turn.start()
+    try:
+        window = HistoryManager()
+        window.extend(history)
+        window.append(user_message)
+        for chunk in get_swarm().run(agent=agent, messages=window.window(), stream=True):
+            yield from turn.feed(chunk)
+    except Exception as e:
+        logging.error(f"Agent turn for thread {thread_id} failed: {e}")
+        yield sse('error', {'error': str(e)})
+    finally:
+        messages = turn.messages(user_message)
+        messages_collection.insert_many([to_document(thread_id, message) for message in messages])
+        thread_totals.added(thread_id, len(messages))
+    if turn.response is not None:
+        yield turn.done()
+
+@app.before_request
+def prepare_indexes():
+    # Created on the first request rather than at import, so importing the app never waits on MongoDB
+    global indexes_ready
+    if not indexes_ready:
+        try:
+            chat_history.ensure_indexes(messages_collection)
+            indexes_ready = True
+        except PyMongoError as e:
+            logging.error(f"Could not create chat history indexes: {e}")
 
 @app.route('/agent/start_chat', methods=['POST'])
 def start_chat():
-    # Start a new chat session and return a thread_id
+    # Start a new chat session, optionally on a named workspace, and return a thread_id
+    data = request.get_json(silent=True) or {}
+    workspace = data.get('workspace')
+    try:
+        workspace_root(workspace, base_path)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     thread_id = str(uuid.uuid4())
+    if workspace:
+        threads_collection.insert_one({'_id': thread_id, 'workspace': workspace})
     return jsonify({'thread_id': thread_id})
 
 @app.route('/agent/continue_chat/<thread_id>', methods=['POST'])
 def continue_chat(thread_id):
-    # Continue an existing chat
+    # Run the agent on the thread and stream its reply as Server-Sent Events
+    started = time.perf_counter()
     data = request.json
     message = data.get('message')
 
     if not message:
         return jsonify({'error': 'Message cannot be empty'}), 400
 
-    # Store the message from the user
-    user_message = {
-        'thread_id': thread_id,
-        'message': message,
-        'type': 'user',
-        'timestamp': datetime.utcnow()
-    }
-    messages_collection.insert_one(user_message)
-
-    # Create a stub response
-    response_message = "This is a stub for agent interaction."
-    agent_message = {
-        'thread_id': thread_id,
-        'message': response_message,
-        'type': 'agent',
-        'timestamp': datetime.utcnow()
-    }
-    messages_collection.insert_one(agent_message)
-
-    return jsonify({'response': response_message})
+    try:
+        agents = thread_agents(thread_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    agent_alias = data.get('agent')
+    if agent_alias and agent_alias not in agents:
+        return jsonify({'error': f"Unknown agent '{agent_alias}'; expected one of {', '.join(agents)}"}), 400
+
+    history = load_thread(messages_collection, thread_id)
+    agent = agents[agent_alias] if agent_alias else resume_agent(history, agents, DEFAULT_AGENT)
+    user_message = {'role': 'user', 'content': message}
+
+    def stream():
+        # The agents only live for this turn; stop the shell they may have started with them.
+        try:
+            yield from stream_agent_turn(thread_id, agent, history, user_message, started)
+        finally:
+            agents.workspace.close()
+
+    return Response(stream(),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/agent/chat_history/<thread_id>', methods=['GET'])
 def get_chat_history(thread_id):
-    # Get chat history with pagination
+    # Get chat history, newest first, paged by cursor (before/after) or, for older clients, by page number
     try:
-        page = int(request.args.get('page', 1))
-        page_size = int(request.args.get('page_size', 10))
-    except ValueError:
-        return jsonify({'error': 'Page and page_size must be integers'}), 400
-
-    total_messages = messages_collection.count_documents({'thread_id': thread_id})
-    messages_cursor = messages_collection.find({'thread_id': thread_id}).sort('timestamp', DESCENDING).skip((page - 1) * page_size).limit(page_size)
-    paginated_messages = list(messages_cursor)
-
-    return jsonify({
-        'chat_history': paginated_messages,
-        'pagination': {
-            'page': page,
-            'page_size': page_size,
-            'total_messages': total_messages
-        }
-    })
+        params = chat_history.history_params(request.args)
+        if params['page'] is not None:
+            result = {'chat_history': chat_history.page_by_number(messages_collection, thread_id, max(params['page'], 1),
+                                                                  params['limit'], params['fields']),
+                      'pagination': {'page': params['page'], 'page_size': params['limit']}}
+        else:
+            result = chat_history.page_messages(messages_collection, thread_id, before=params['before'],
+                                                after=params['after'], limit=params['limit'], fields=params['fields'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if params['include_total']:
+        result['pagination']['total_messages'] = thread_totals.get(messages_collection, thread_id)
+    return jsonify(result)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001)
+    parser = argparse.ArgumentParser(description="Serve the agents over HTTP.")
+    parser.add_argument('base_path', nargs='?', default=DEFAULT_BASE_PATH, help="Workspace of threads not started on a named one.")
+    base_path = parser.parse_args().base_path
+    prepare_indexes()
+    app.run(host='0.0.0.0', port=5001, threaded=True)
@@ -0,0 +1,121 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from history_manager import HistoryManager
+
+DEFAULT_MAX_SESSIONS = 1000
+# Sessions nobody wrote to for this long are dropped; the next message reloads them from MongoDB.
+IDLE_TTL_S = 30 * 60
+EVICT_INTERVAL_S = 60
+
+
+class Session:
+    """A hot conversation: the agent handling it, its compacted history and the thread's agent set by alias.
+
+    lock serializes turns on the thread, so two messages sent at once are
+    answered one after the other against the same history.
+    """
+
+    def __init__(self, thread_id: str, agent, history: HistoryManager, agents: Optional[dict] = None):
+        self.thread_id = thread_id
+        self.agent = agent
+        self.history = history
+        self.agents = agents or {}
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def close(self):
+        """Stop what the session's workspace keeps running between turns (its shell)."""
+        workspace = getattr(self.agents, 'workspace', None)
+        if workspace is not None:
+            workspace.close()
+
+
+class SessionCache:
+    """In-memory LRU of sessions keyed by thread id, with idle eviction.
+
+    A miss calls loader(thread_id), which rebuilds the session from storage;
+    concurrent misses for one thread share a single load. Past max_sessions
+    the least recently used idle session is dropped. Sessions in the middle
+    of a turn are never evicted, so a turn's messages always land in the
+    session that is cached. A dropped session is closed, which stops its
+    shell.
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable[Session]], max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 idle_ttl_s: float = IDLE_TTL_S):
+        self.loader = loader
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self._sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._stats = {'hits': 0, 'misses': 0, 'evicted_lru': 0, 'evicted_idle': 0}
+
+    async def get(self, thread_id: str) -> Session:
+        session = self._sessions.get(thread_id)
+        if session is not None:
+            self._sessions.move_to_end(thread_id)
+            session.touch()
+            self._stats['hits'] += 1
+            return session
+        loading = self._loading.get(thread_id)
+        if loading is not None:
+            return await asyncio.shield(loading)
+        self._stats['misses'] += 1
+        loading = self._loading[thread_id] = asyncio.get_running_loop().create_future()
+        try:
+            session = await self.loader(thread_id)
+        except BaseException as e:
+            loading.set_exception(e)
+            # Nobody else may be waiting; retrieve the exception so it is not reported as unhandled.
+            loading.exception()
+            raise
+        finally:
+            del self._loading[thread_id]
+        self._sessions[thread_id] = session
+        loading.set_result(session)
+        self._evict_lru()
+        return session
+
+    def drop(self, thread_id: str):
+        session = self._sessions.pop(thread_id, None)
+        if session is not None:
+            session.close()
+
+    def _evict_lru(self):
+        for thread_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if not self._sessions[thread_id].lock.locked():
+                self._sessions.pop(thread_id).close()
+                self._stats['evicted_lru'] += 1
+
+    def evict_idle(self) -> int:
+        """Drop sessions idle for longer than idle_ttl_s; returns how many were dropped."""
+        cutoff = time.monotonic() - self.idle_ttl_s
+        idle = [thread_id for thread_id, session in self._sessions.items()
+                if session.last_used < cutoff and not session.lock.locked()]
+        for thread_id in idle:
+            self._sessions.pop(thread_id).close()
+        self._stats['evicted_idle'] += len(idle)
+        return len(idle)
+
+    async def run_evictor(self, interval_s: float = EVICT_INTERVAL_S):
+        """Background task: evict idle sessions every interval_s seconds."""
+        while True:
+            await asyncio.sleep(interval_s)
+            evicted = self.evict_idle()
+            if evicted:
+                logging.info(f"Evicted {evicted} idle sessions, {len(self._sessions)} cached")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'sessions': len(self._sessions)}
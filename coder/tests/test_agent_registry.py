@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import subprocess
+from all_agents import AgentRegistry, AgentSpec
+from chat_history import resume_agent
+from tools.prompts import load_prompt
+from tools.workspace import Workspace
+
+built = []
+
+class FakeTriage:
+    def __init__(self, workspace):
+        built.append(self)
+        self.name = "Fake Triage"
+        self.workspace = workspace
+        self.functions = []
+
+class FakeCoder(FakeTriage):
+    def __init__(self, workspace):
+        super().__init__(workspace)
+        self.name = "Fake Coder"
+
+SPECS = {'triage': AgentSpec(f"{__name__}:FakeTriage", "Fake Triage"),
+         'code': AgentSpec(f"{__name__}:FakeCoder", "Fake Coder")}
+
+class TestAgentRegistry(unittest.TestCase):
+    def setUp(self):
+        built.clear()
+        self.agents = AgentRegistry(Workspace(), SPECS, {'triage': ['code'], 'code': ['triage']})
+
+    def test_agents_are_built_on_first_lookup_only(self):
+        """Test aliases and names are known up front, and each agent is built once, when first looked up."""
+        self.assertEqual(list(self.agents), ['triage', 'code'])
+        self.assertEqual(self.agents.name('code'), "Fake Coder")
+        self.assertEqual(built, [])
+        coder = self.agents['code']
+        self.assertIs(self.agents['code'], coder)
+        self.assertEqual(self.agents.built(), ['code'])
+        self.assertIs(coder.workspace, self.agents.workspace)
+
+    def test_transfers_stay_in_the_registry(self):
+        """Test transfer tools keep their names and hand over to the agent of the same registry."""
+        triage = self.agents['triage']
+        transfer = triage.functions[0]
+        self.assertEqual(transfer.__name__, 'transfer_to_coding_assistant')
+        self.assertIs(transfer(), self.agents['code'])
+        other = AgentRegistry(Workspace(), SPECS, {'triage': ['code']})
+        self.assertIsNot(other['triage'].functions[0](), transfer())
+
+    def test_resume_builds_only_the_resumed_agent(self):
+        """Test a thread resumes with the agent that spoke last, or the default, without building the others."""
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'sender': 'Fake Coder', 'content': 'hello'}]
+        self.assertEqual(resume_agent(history, self.agents, 'triage').name, "Fake Coder")
+        self.assertEqual(self.agents.built(), ['code'])
+        self.assertEqual(resume_agent(history[:1], self.agents, 'triage').name, "Fake Triage")
+
+    def test_import_stays_light(self):
+        """Test importing all_agents loads neither swarm nor openai, and prompts load from any directory."""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, all_agents; print(sorted(m for m in ('swarm', 'openai', 'yaml') if m in sys.modules))"
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+        cwd = os.getcwd()
+        try:
+            os.chdir(os.path.dirname(root))
+            self.assertIn("Git", load_prompt('git_assistant.md'))
+        finally:
+            os.chdir(cwd)
+
+if __name__ == '__main__':
+    unittest.main()
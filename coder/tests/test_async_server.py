@@ -0,0 +1,127 @@
+import unittest
+import json
+import time
+import asyncio
+import mongomock
+from aiohttp.test_utils import TestClient, TestServer
+import async_server
+from async_swarm import AsyncSwarm
+from model_stub import AsyncStubOpenAIClient
+
+REPLY = " ".join(f"word{i}" for i in range(10))
+
+class AsyncCursor:
+    """Async face of a mongomock cursor, as returned by pymongo's AsyncCollection.find()."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+class AsyncCollection:
+    """Async face of a mongomock collection, covering the calls async_server makes."""
+
+    def __init__(self, name="messages"):
+        self.collection = mongomock.MongoClient().chat_database[name]
+        self.name = self.collection.name
+        self.finds = 0
+
+    def find(self, *args, **kwargs):
+        self.finds += 1
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    async def insert_one(self, document):
+        return self.collection.insert_one(document)
+
+    async def insert_many(self, documents):
+        return self.collection.insert_many(documents)
+
+    async def count_documents(self, query):
+        return self.collection.count_documents(query)
+
+    async def create_index(self, keys, **kwargs):
+        return self.collection.create_index(keys, **kwargs)
+
+def parse_events(body):
+    return [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+            for block in body.strip().split("\n\n")]
+
+class TestAsyncServer(unittest.TestCase):
+    def run_with_client(self, scenario, **stub_options):
+        async def main():
+            self.collection = AsyncCollection()
+            self.model = AsyncStubOpenAIClient(lambda messages, tools: REPLY, **stub_options)
+            app = async_server.create_app(self.collection, AsyncSwarm(client=self.model),
+                                          threads=AsyncCollection("threads"))
+            async with TestClient(TestServer(app)) as client:
+                return await scenario(client)
+        return asyncio.run(main())
+
+    async def chat(self, client, thread_id, message, **extra):
+        response = await client.post(f"/agent/continue_chat/{thread_id}", json={"message": message, **extra})
+        return parse_events(await response.text())
+
+    def test_turn_streams_and_is_stored(self):
+        """Test a turn streams tokens, ends with done and stores the user and agent messages."""
+        async def scenario(client):
+            return await self.chat(client, "t1", "hello", agent="code")
+        events = self.run_with_client(scenario)
+        self.assertEqual(events[0][0], "start")
+        self.assertEqual("".join(data["content"] for event, data in events if event == "token"), REPLY)
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(self.collection.collection.count_documents({"thread_id": "t1"}), 2)
+
+    def test_session_is_cached_between_messages(self):
+        """Test only the first message of a thread reads it from MongoDB, and later turns see the history."""
+        async def scenario(client):
+            await self.chat(client, "t2", "first question", agent="code")
+            await self.chat(client, "t2", "second question")
+            stats = await (await client.get("/agent/stats")).json()
+            return stats
+        stats = self.run_with_client(scenario)
+        self.assertEqual(self.collection.finds, 1)
+        self.assertEqual(stats["sessions"]["hits"], 1)
+        contents = [m.get("content") for m in self.model.calls[-1]["messages"]]
+        self.assertIn("first question", contents)
+        self.assertIn(REPLY, contents)
+
+    def test_threads_are_served_concurrently(self):
+        """Test turns of different threads overlap on one event loop instead of queueing."""
+        async def scenario(client):
+            started = time.perf_counter()
+            await asyncio.gather(*(self.chat(client, f"c{i}", "hi", agent="code") for i in range(10)))
+            return time.perf_counter() - started
+        elapsed = self.run_with_client(scenario, latency_s=0.3)
+        self.assertLess(elapsed, 1.5)
+
+    def test_chat_history_pages_by_cursor(self):
+        """Test history comes back newest first with a cursor to older messages, and page= is refused."""
+        async def scenario(client):
+            await self.chat(client, "t3", "one", agent="code")
+            await self.chat(client, "t3", "two")
+            page = await (await client.get("/agent/chat_history/t3?limit=3&include_total=true")).json()
+            older = await (await client.get(f"/agent/chat_history/t3?limit=3&before={page['pagination']['next_cursor']}")).json()
+            refused = await client.get("/agent/chat_history/t3?page=2")
+            return page, older, refused.status
+        page, older, status = self.run_with_client(scenario)
+        self.assertEqual([m["message"] for m in page["chat_history"]], [REPLY, "two", REPLY])
+        self.assertEqual(page["pagination"]["total_messages"], 4)
+        self.assertEqual([m["message"] for m in older["chat_history"]], ["one"])
+        self.assertEqual(status, 400)
+
+    def test_unknown_workspace_is_refused(self):
+        """Test a chat cannot be started on a workspace the server does not serve."""
+        async def scenario(client):
+            return (await client.post("/agent/start_chat", json={"workspace": "../elsewhere"})).status
+        self.assertEqual(self.run_with_client(scenario), 400)
+
+if __name__ == '__main__':
+    unittest.main()
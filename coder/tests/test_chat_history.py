@@ -0,0 +1,76 @@
+import unittest
+from datetime import datetime, timedelta
+import mongomock
+import chat_history
+from chat_history import CursorError, ThreadTotals, ensure_indexes, page_messages
+
+class TestChatHistory(unittest.TestCase):
+    def setUp(self):
+        self.collection = mongomock.MongoClient().chat_database.messages
+        start = datetime(2024, 1, 1)
+        # Pairs of messages share a timestamp, so the _id has to break ties.
+        self.collection.insert_many([
+            {"thread_id": "t", "type": "user", "message": f"m{i}", "payload": {"role": "user"},
+             "timestamp": start + timedelta(seconds=i // 2)} for i in range(25)])
+        self.collection.insert_one({"thread_id": "other", "type": "user", "message": "x", "timestamp": start})
+
+    def walk_back(self, limit=4):
+        pages, cursor = [], None
+        while True:
+            page = page_messages(self.collection, "t", before=cursor, limit=limit)
+            pages.append([m["message"] for m in page["chat_history"]])
+            cursor = page["pagination"]["next_cursor"]
+            if not cursor:
+                return pages
+
+    def test_indexes_are_created(self):
+        """Test the compound thread/timestamp/id index exists after startup."""
+        ensure_indexes(self.collection)
+        ensure_indexes(self.collection)
+        self.assertIn("thread_timestamp_id", self.collection.index_information())
+
+    def test_before_cursor_walks_all_messages_newest_first(self):
+        """Test following next_cursor visits every message once, newest first, even across equal timestamps."""
+        pages = self.walk_back()
+        messages = [message for page in pages for message in page]
+        self.assertEqual(messages, [f"m{i}" for i in range(24, -1, -1)])
+        self.assertEqual(len(pages), 7)
+
+    def test_after_cursor_returns_newer_messages(self):
+        """Test after= returns the messages newer than the cursor, still newest first."""
+        self.assertIsNone(page_messages(self.collection, "t", limit=30)["pagination"]["next_cursor"])
+        cursor = chat_history.encode_cursor(self.collection.find_one({"message": "m0"}))
+        page = page_messages(self.collection, "t", after=cursor, limit=3)
+        self.assertEqual([m["message"] for m in page["chat_history"]], ["m3", "m2", "m1"])
+        self.assertIsNotNone(page["pagination"]["prev_cursor"])
+        self.assertIsNotNone(page["pagination"]["next_cursor"])
+
+    def test_documents_are_projected_and_serializable(self):
+        """Test ObjectIds and datetimes become strings and the payload is left out unless asked for."""
+        message = page_messages(self.collection, "t", limit=1)["chat_history"][0]
+        self.assertEqual(set(message), {"id", "timestamp", "thread_id", "type", "message"})
+        self.assertIsInstance(message["id"], str)
+        self.assertEqual(message["timestamp"], "2024-01-01T00:00:12.000Z")
+        message = page_messages(self.collection, "t", limit=1, fields="message,payload")["chat_history"][0]
+        self.assertEqual(set(message), {"id", "timestamp", "message", "payload"})
+        with self.assertRaises(ValueError):
+            page_messages(self.collection, "t", fields="password")
+
+    def test_invalid_cursors_are_rejected(self):
+        """Test malformed cursors and both directions at once are errors."""
+        with self.assertRaises(CursorError):
+            page_messages(self.collection, "t", before="nonsense")
+        with self.assertRaises(CursorError):
+            page_messages(self.collection, "t", before="1-x", after="1-y")
+
+    def test_totals_are_cached_and_bumped(self):
+        """Test the total is counted once per ttl and kept roughly current on inserts."""
+        totals = ThreadTotals(ttl_s=60)
+        self.assertEqual(totals.get(self.collection, "t"), 25)
+        self.collection.insert_one({"thread_id": "t", "message": "new", "timestamp": datetime(2024, 1, 2)})
+        self.assertEqual(totals.get(self.collection, "t"), 25)
+        totals.added("t", 1)
+        self.assertEqual(totals.get(self.collection, "t"), 26)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import os
+import tempfile
 from tools.code_assistant import CodeAssistant
+from tools.workspace import Workspace
 
 class TestCodeAssistant(unittest.TestCase):
     def setUp(self):
@@ -28,8 +30,31 @@ class TestCodeAssistant(unittest.TestCase):
         
         expected_content = "Line 1\nLine 2 Updated\nLine 3\nLine 4\n"
         
-        self.assertEqual(result, "Success!")
+        self.assertEqual(result, "Success!\ntest_file.txt: hunk 1 applied at line 1")
         self.assertEqual(updated_content, expected_content)
 
+    def test_agents_work_in_their_own_workspace(self):
+        """Test agents bound to different workspaces write under their own root and cannot reach the other."""
+        with tempfile.TemporaryDirectory() as repo_a, tempfile.TemporaryDirectory() as repo_b:
+            agent_a = CodeAssistant(Workspace(repo_a))
+            agent_b = CodeAssistant(Workspace(repo_b))
+            self.assertEqual(agent_a.write_file("notes.txt", "a"), "Success!")
+            self.assertEqual(agent_b.write_file("notes.txt", "b"), "Success!")
+            self.assertEqual(agent_a.read_file("notes.txt"), "a")
+            self.assertEqual(agent_b.read_file("notes.txt"), "b")
+            self.assertIn("outside the workspace", agent_a.read_file(os.path.join(repo_b, "notes.txt")))
+            self.assertIn("outside the workspace", agent_a.write_file("../escape.txt", "x"))
+
+    def test_files_created_by_a_shell_command_are_found_right_away(self):
+        """Test find_file sees files a shell command just created, without waiting for the index watcher."""
+        with tempfile.TemporaryDirectory() as repo:
+            open(os.path.join(repo, 'a.py'), 'w').close()
+            agent = CodeAssistant(Workspace(repo))
+            found = lambda: sorted(os.path.relpath(path, repo) for path in agent.find_file('*.py'))
+            self.assertEqual(found(), ['a.py'])
+            agent.run_shell_command("touch b.py && mkdir d && touch d/c.py")
+            self.assertEqual(found(), ['a.py', 'b.py', os.path.join('d', 'c.py')])
+            agent._workspace.close()
+
 if __name__ == '__main__':
     unittest.main()
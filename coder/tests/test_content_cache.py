@@ -0,0 +1,42 @@
+import unittest
+import os
+import tempfile
+from tools.content_cache import ContentCache
+
+class TestContentCache(unittest.TestCase):
+    def setUp(self):
+        """Create two files and a small cache."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name in ['a.txt', 'b.txt']:
+            path = os.path.join(self.tmp.name, name)
+            with open(path, 'w') as f:
+                f.write(name * 10)
+            self.paths.append(path)
+        self.cache = ContentCache(max_bytes=100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hits_and_external_changes(self):
+        """Test that unchanged files are served from memory and changed ones re-read."""
+        self.cache.read_text(self.paths[0])
+        self.assertEqual(self.cache.read_text(self.paths[0]), 'a.txt' * 10)
+        with open(self.paths[0], 'w') as f:
+            f.write('changed')
+        os.utime(self.paths[0], ns=(1, 1))
+        self.assertEqual(self.cache.read_text(self.paths[0]), 'changed')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes']), (1, 2, 7))
+
+    def test_lru_eviction_and_invalidate(self):
+        """Test that the byte budget evicts the least recently used entry."""
+        self.cache.configure(60)
+        self.cache.read_text(self.paths[0])
+        self.cache.read_text(self.paths[1])
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.cache.invalidate(self.paths[1])
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import os
+import tempfile
+from tools.content_search import search_files
+
+class TestContentSearch(unittest.TestCase):
+    def setUp(self):
+        """Create text and binary files to search."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.text_path = os.path.join(self.tmp.name, 'app.py')
+        with open(self.text_path, 'w') as f:
+            f.write("import os\nname = 'it''s'\nprint(name)\nprint(os.sep)\n")
+        self.binary_path = os.path.join(self.tmp.name, 'blob.bin')
+        with open(self.binary_path, 'wb') as f:
+            f.write(b"print\0\0\0")
+        self.paths = [self.text_path, self.binary_path]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_literal_search_reports_lines(self):
+        """Test literal search with quotes, line numbers and binary skipping."""
+        result = search_files(self.paths, "'it''s'")
+        self.assertEqual([(m.line, m.snippet) for m in result.matches], [(2, "name = 'it''s'")])
+        result = search_files(self.paths, 'print')
+        self.assertEqual([m.line for m in result.matches], [3, 4])
+        self.assertEqual(result.stats['binary_skipped'], 1)
+
+    def test_regex_search_and_limit(self):
+        """Test regex mode, context lines and early stop at the result limit."""
+        result = search_files(self.paths, r'print\(\w+\)', use_regex=True, context_lines=1)
+        self.assertEqual(len(result.matches), 1)
+        self.assertEqual(result.matches[0].snippet, "name = 'it''s'\nprint(name)\nprint(os.sep)")
+        result = search_files(self.paths, 'n', max_results=2)
+        self.assertEqual(len(result.matches), 2)
+        self.assertTrue(result.stats['truncated'])
+
+if __name__ == '__main__':
+    unittest.main()
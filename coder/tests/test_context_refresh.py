@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+import yaml
+from model_stub import StubOpenAIClient
+from tools.context_refresh import ContextRefresher
+
+class TestContextRefresh(unittest.TestCase):
+    def setUp(self):
+        """Create a workspace (not a git repository) with two files and a stale context entry."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.write('a.py', "import os\n")
+        self.write('b.py', "import sys\n")
+        with open(os.path.join(self.tmp.name, 'context.yml'), 'w') as f:
+            yaml.safe_dump({'gone.log': 'A deleted log.', '../elsewhere.py': 'Outside the workspace.'}, f)
+        self.client = StubOpenAIClient()
+        self.refresher = ContextRefresher(self.tmp.name, self.client, workers=2)
+
+    def tearDown(self):
+        self.refresher.store.close()
+        self.tmp.cleanup()
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmp.name, name), 'w') as f:
+            f.write(content)
+
+    def test_only_new_and_changed_files_are_summarized(self):
+        """Test a second refresh skips unchanged files and stale entries are dropped."""
+        stats = self.refresher.refresh(['a.py', 'b.py', 'gone.log', '../elsewhere.py'])
+        self.assertEqual((stats['summarized'], stats['unchanged'], stats['deleted']), (2, 0, 2))
+        self.assertEqual(self.refresher.store.all(), {'a.py': 'Stub summary: File: a.py (3 lines).',
+                                                      'b.py': 'Stub summary: File: b.py (3 lines).'})
+        self.write('b.py', "import sys\nimport re\n")
+        stats = self.refresher.refresh()
+        self.assertEqual((stats['summarized'], stats['unchanged'], stats['deleted']), (1, 1, 0))
+        self.assertEqual(len(self.client.calls), 3)
+        self.assertIn("import re", self.client.calls[-1]['messages'][1]['content'])
+
+    def test_imported_entries_and_unnamed_files_are_left_alone(self):
+        """Test entries imported from context.yml count as current, and files without an entry need naming."""
+        with open(os.path.join(self.tmp.name, 'context.yml'), 'w') as f:
+            yaml.safe_dump({'a.py': 'Module a.'}, f)
+        os.utime(os.path.join(self.tmp.name, 'context.yml'), ns=(1, 1))
+        stats = self.refresher.refresh()
+        self.assertEqual((stats['summarized'], stats['unchanged']), (0, 1))
+        self.assertEqual(self.client.calls, [])
+        self.write('a.py', "import os\nimport re\n")
+        self.assertEqual(self.refresher.refresh()['summarized'], 1)
+        self.assertNotIn('b.py', self.refresher.store.all())
+
+    def test_summaries_per_call_are_capped(self):
+        """Test a refresh summarizes at most max_files files and leaves the rest for the next call."""
+        for i in range(5):
+            self.write(f"m{i}.py", f"x = {i}\n")
+        paths = [f"m{i}.py" for i in range(5)]
+        stats = self.refresher.refresh(paths, max_files=3)
+        self.assertEqual((stats['summarized'], stats['remaining']), (3, 2))
+        stats = self.refresher.refresh(paths, max_files=3)
+        self.assertEqual((stats['summarized'], stats['unchanged'], stats['remaining']), (2, 3, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import os
+import tempfile
+import threading
+import yaml
+from tools.context_store import ContextStore
+
+class TestContextStore(unittest.TestCase):
+    def setUp(self):
+        """Create a workspace with an existing context.yml."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.yaml_path = os.path.join(self.tmp.name, 'context.yml')
+        with open(self.yaml_path, 'w') as f:
+            yaml.safe_dump({'a.py': 'Module a.', 'b.py': 'Module b.'}, f)
+        self.store = ContextStore(self.tmp.name)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def read_yaml(self):
+        with open(self.yaml_path) as f:
+            return yaml.safe_load(f)
+
+    def test_imports_updates_and_exports(self):
+        """Test entries are imported, updated without touching the file, then exported."""
+        self.assertEqual(self.store.get('a.py'), 'Module a.')
+        self.store.upsert('c.py', 'Module c.')
+        self.store.delete(['b.py'])
+        self.assertEqual(self.read_yaml(), {'a.py': 'Module a.', 'b.py': 'Module b.'})
+        self.assertEqual(self.store.all(), {'a.py': 'Module a.', 'c.py': 'Module c.'})
+        self.store.export()
+        self.assertEqual(self.read_yaml(), {'a.py': 'Module a.', 'c.py': 'Module c.'})
+        self.assertEqual(self.store.pending_changes(), 0)
+
+    def test_external_edit_is_merged_with_pending_changes(self):
+        """Test a changed context.yml is re-imported while unexported local changes are kept."""
+        self.store.upsert('a.py', 'Local change.')
+        with open(self.yaml_path, 'w') as f:
+            yaml.safe_dump({'a.py': 'Remote change.', 'd.py': 'Module d.'}, f)
+        os.utime(self.yaml_path, ns=(1, 1))
+        self.assertEqual(self.store.all(), {'a.py': 'Local change.', 'd.py': 'Module d.'})
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Test upserts from several threads all end up in the store."""
+        def worker(number):
+            for i in range(20):
+                self.store.upsert(f"t{number}_{i}.py", f"File {i}.")
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.store.all()), 82)
+        self.store.export()
+        self.assertEqual(len(self.read_yaml()), 82)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from tools.edit_blocks import apply_edit_blocks
+from tools.write_batch import workspace_lock
+
+class TestEditBlocks(unittest.TestCase):
+    def setUp(self):
+        """Create a file to edit."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = "def a():\n    return 1\n\n\ndef b():\n    return 1\n"
+        with open(self.path('mod.py'), 'w') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_applies_blocks_across_files(self):
+        """Test sequential blocks on one file plus creating a new file."""
+        blocks = ("mod.py\n<<<<<<< SEARCH\ndef b():\n    return 1\n=======\ndef b():\n    return 2\n>>>>>>> REPLACE\n"
+                  "<<<<<<< SEARCH\ndef a():\n=======\ndef a_renamed():\n>>>>>>> REPLACE\n"
+                  "new.py\n<<<<<<< SEARCH\n=======\nX = 1\n>>>>>>> REPLACE\n")
+        success, report, stats = apply_edit_blocks(blocks, self.path)
+        self.assertTrue(success, report)
+        self.assertEqual(self.read('mod.py'), "def a_renamed():\n    return 1\n\n\ndef b():\n    return 2\n")
+        self.assertEqual(self.read('new.py'), "X = 1\n")
+        self.assertEqual(stats[self.path('mod.py')]['edits'], 2)
+
+    def test_ambiguous_search_changes_nothing(self):
+        """Test that a SEARCH matching more than once is rejected and no file is written."""
+        blocks = ("new.py\n<<<<<<< SEARCH\n=======\nX = 1\n>>>>>>> REPLACE\n"
+                  "mod.py\n<<<<<<< SEARCH\n    return 1\n=======\n    return 3\n>>>>>>> REPLACE\n")
+        success, report, _ = apply_edit_blocks(blocks, self.path)
+        self.assertFalse(success)
+        self.assertIn("occurs 2 times", report[1])
+        self.assertEqual(self.read('mod.py'), self.content)
+        self.assertFalse(os.path.exists(self.path('new.py')))
+
+    def test_concurrent_write_is_not_overwritten(self):
+        """Test an edit waits for a writer holding the workspace lock and applies to the file it left behind."""
+        blocks = "mod.py\n<<<<<<< SEARCH\ndef b():\n    return 1\n=======\ndef b():\n    return 2\n>>>>>>> REPLACE\n"
+        results = []
+        with workspace_lock(self.tmp.name):
+            editor = threading.Thread(target=lambda: results.append(apply_edit_blocks(blocks, self.path, root=self.tmp.name)))
+            editor.start()
+            time.sleep(0.2)
+            self.assertTrue(editor.is_alive())
+            with open(self.path('mod.py'), 'w') as f:
+                f.write(self.content.replace("def a():", "def a_other():"))
+        editor.join()
+        self.assertTrue(results[0][0], results[0][1])
+        self.assertEqual(self.read('mod.py'), "def a_other():\n    return 1\n\n\ndef b():\n    return 2\n")
+
+if __name__ == '__main__':
+    unittest.main()
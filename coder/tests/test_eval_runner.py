@@ -0,0 +1,86 @@
+import unittest
+import os
+import json
+import time
+import tempfile
+from types import SimpleNamespace
+import instructor
+from openai import OpenAI
+from eval_runner import EvalRunner, UsageMeter, load_cases, percentile, _stub_responder
+from model_stub import StubOpenAIClient
+
+class ToolPickingSwarm:
+    """Stands in for Swarm.run(execute_tools=False): one model call offering the agent's tools."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def run(self, agent, messages, execute_tools):
+        tools = [{"type": "function", "function": {"name": name, "parameters": {"properties": {}}}} for name in agent]
+        completion = self.client.chat.completions.create(model="m", messages=messages, tools=tools)
+        message = completion.choices[0].message
+        return SimpleNamespace(messages=[{"role": "assistant", "tool_calls": [call.model_dump() for call in message.tool_calls or []]}])
+
+class TestEvalRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_cases(self, cases):
+        path = os.path.join(self.tmp.name, "cases.json")
+        with open(path, "w") as file:
+            json.dump(cases, file)
+        return path
+
+    def test_percentile_uses_nearest_rank(self):
+        """Test percentiles pick the nearest-rank value."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_load_cases_rejects_incomplete_and_duplicate_cases(self):
+        """Test cases need a query and expected tool or messages, and unique ids."""
+        with self.assertRaises(ValueError):
+            load_cases(self.write_cases([{"id": "a", "agent": "code", "query": "q"}]))
+        with self.assertRaises(ValueError):
+            load_cases(self.write_cases([{"id": "a", "agent": "code", "messages": []}] * 2))
+        cases = load_cases(self.write_cases([{"id": "a", "agent": "code", "query": "q", "expect_tool": "read_file"}]))
+        self.assertEqual(cases[0].kind, "tool")
+
+    def test_cases_run_concurrently_with_pass_rates_and_tokens(self):
+        """Test cases overlap, and the report groups pass rates and counts tokens per case."""
+        meter = UsageMeter()
+        client = meter.install(StubOpenAIClient(_stub_responder, latency_s=0.1))
+        agents = {"triage": ["transfer_to_git_assistant"], "code": ["read_file", "find_file"]}
+        runner = EvalRunner(agents, ToolPickingSwarm(client), meter=meter, workers=8)
+        cases = load_cases(self.write_cases(
+            [{"id": f"t{i}", "agent": "triage", "query": "commit", "expect_tool": "transfer_to_git_assistant"} for i in range(4)] +
+            [{"id": f"c{i}", "agent": "code", "query": "find it", "expect_tool": "find_file"} for i in range(4)] +
+            [{"id": "x", "agent": "missing", "query": "q", "expect_tool": "read_file"}]))
+        started = time.perf_counter()
+        report = runner.run(cases)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual([case["id"] for case in report["cases"]], [case.id for case in cases])
+        self.assertEqual(report["by_agent"]["triage"]["pass_rate"], 1.0)
+        self.assertEqual(report["by_agent"]["code"]["pass_rate"], 0.0)
+        self.assertEqual(report["by_tool"]["find_file"]["cases"], 4)
+        self.assertEqual(report["totals"]["errors"], 1)
+        self.assertTrue(all(case["model_calls"] == 1 for case in report["cases"][:8]))
+        self.assertGreater(report["tokens"]["total"], 0)
+        self.assertGreaterEqual(report["latency_ms"]["p95"], report["latency_ms"]["p50"])
+
+    def test_conversation_cases_use_the_judge(self):
+        """Test conversation cases pass on the judge's verdict."""
+        openai = OpenAI(api_key="test")
+        openai.chat.completions.create = StubOpenAIClient(_stub_responder).chat.completions.create
+        runner = EvalRunner({"code": []}, judge_client=instructor.from_openai(openai))
+        cases = load_cases(self.write_cases([{"id": "conv", "agent": "code", "messages": [{"role": "user", "content": "hi"}]}]))
+        report = runner.run(cases)
+        self.assertEqual(report["totals"]["passed"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
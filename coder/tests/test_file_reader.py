@@ -0,0 +1,50 @@
+import unittest
+import os
+import tempfile
+from tools import file_reader
+from tools.file_reader import read_lines, read_bytes, outline, summarize_large_file
+
+class TestFileReader(unittest.TestCase):
+    def setUp(self):
+        """Create a file with more lines than one line-index stride."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'big.py')
+        with open(self.path, 'w') as f:
+            f.write("class Big:\n")
+            for i in range(2, 2501):
+                f.write(f"    def method_{i}(self): pass\n" if i % 1000 == 0 else f"line {i}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_line_and_byte_ranges(self):
+        """Test ranged reads, including ones that start past a checkpoint."""
+        content, line_count = read_lines(self.path, 1999, 2001)
+        self.assertEqual(line_count, 2500)
+        self.assertEqual(content, "line 1999\n    def method_2000(self): pass\nline 2001\n")
+        self.assertEqual(read_lines(self.path, 2500, 3000)[0], "line 2500\n")
+        self.assertEqual(read_bytes(self.path, 0, 5), "class")
+
+    def test_outline_of_large_file(self):
+        """Test that large files are summarized with an outline."""
+        self.assertEqual(outline(self.path), ["1: class Big:", "1000: def method_1000(self): pass",
+                                              "2000: def method_2000(self): pass"])
+        summary = summarize_large_file(self.path)
+        self.assertIn(f"showing lines 1-{file_reader.FIRST_PAGE_LINES}", summary)
+        self.assertTrue(summary.rstrip().endswith("2000: def method_2000(self): pass"))
+
+    def test_ranges_are_capped(self):
+        """Test an open-ended range of a file larger than the cap is cut at a line and says where to continue."""
+        content, _ = read_lines(self.path, 1, None, max_bytes=100)
+        self.assertTrue(content.startswith("class Big:\nline 2\n"))
+        self.assertLessEqual(len(content.split("[Cut off")[0]), 100)
+        next_line = int(content.rsplit("start_line=", 1)[1].rstrip(".]"))
+        self.assertEqual(read_lines(self.path, next_line, next_line)[0], f"line {next_line}\n")
+        self.assertIn("Continue with start_byte=8.]", read_lines(self.path, 1, 1, max_bytes=8)[0])
+        content = read_bytes(self.path, 10, None, max_bytes=50)
+        self.assertIn("showing bytes 10-60", content)
+        self.assertTrue(content.endswith("Continue with start_byte=60.]"))
+        self.assertEqual(read_bytes(self.path, 0, 5, max_bytes=50), "class")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import os
+import subprocess
+import tempfile
+from tools.git_backend import GitBackend
+
+class TestGitBackend(unittest.TestCase):
+    def setUp(self):
+        """Create a repository with one commit."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "Test")
+        with open(os.path.join(self.tmp.name, 'a.txt'), 'w') as f:
+            f.write("one\n")
+        self.git("add", "a.txt")
+        self.git("commit", "-q", "-m", "initial")
+        self.backend = GitBackend(self.tmp.name)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp.cleanup()
+
+    def git(self, *args):
+        subprocess.run(["git", *args], cwd=self.tmp.name, check=True, capture_output=True)
+
+    def test_status_is_cached_until_index_changes(self):
+        """Test repeated status calls hit the cache and staging a file invalidates it."""
+        first = self.backend.status("--porcelain")
+        self.assertEqual(first.stdout, "")
+        self.assertIs(self.backend.status("--porcelain"), first)
+        with open(os.path.join(self.tmp.name, 'b.txt'), 'w') as f:
+            f.write("two\n")
+        self.backend.invalidate()
+        self.assertEqual(self.backend.status("--porcelain").stdout, "?? b.txt\n")
+        self.git("add", "b.txt")
+        self.assertEqual(self.backend.status("--porcelain").stdout, "A  b.txt\n")
+        self.assertEqual(self.backend.stats()['status_hits'], 1)
+
+    def test_read_object_reuses_one_process(self):
+        """Test objects are read through the persistent cat-file process."""
+        self.assertEqual(self.backend.read_object("HEAD:a.txt"), ("blob", b"one\n"))
+        process = self.backend._cat_file
+        self.assertIsNone(self.backend.read_object("HEAD:missing.txt"))
+        self.assertEqual(self.backend.read_object("HEAD:a.txt")[1], b"one\n")
+        self.assertIs(self.backend._cat_file, process)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import subprocess
+import tempfile
+from tools.git_backend import GitBackend
+from tools.git_pager import diff_summary, file_diff_page, log_page
+
+class TestGitPager(unittest.TestCase):
+    def setUp(self):
+        """Create a repository with three commits and staged changes to a source file, a lockfile and a binary."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "Test")
+        self.write('app.py', "".join(f"line {i}\n" for i in range(100)))
+        for number in range(3):
+            self.write('notes.txt', f"note {number}\n")
+            self.git("add", ".")
+            self.git("commit", "-q", "-m", f"commit {number}")
+        self.write('app.py', "".join(f"line {i}{' changed' if i % 20 == 0 else ''}\n" for i in range(100)))
+        self.write('poetry.lock', "pkg = 1\n" * 50)
+        with open(os.path.join(self.tmp.name, 'logo.png'), 'wb') as f:
+            f.write(b"\x89PNG\0\0data")
+        self.git("add", ".")
+        self.backend = GitBackend(self.tmp.name)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp.cleanup()
+
+    def git(self, *args):
+        subprocess.run(["git", *args], cwd=self.tmp.name, check=True, capture_output=True)
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmp.name, name), 'w') as f:
+            f.write(content)
+
+    def test_summary_lists_files_and_flags_lockfiles(self):
+        """Test the summary counts lines per file and marks lockfiles and binaries."""
+        summary = diff_summary(self.backend, ["--cached"])
+        self.assertTrue(summary.startswith("3 files changed, 55 insertions(+), 5 deletions(-)"))
+        self.assertIn("  app.py  +5 -5", summary)
+        self.assertIn("  poetry.lock  +50 -0  [lockfile, summarized]", summary)
+        self.assertIn("  logo.png  binary", summary)
+        self.assertIn("hunks not shown", file_diff_page(self.backend, ["--cached"], "poetry.lock"))
+
+    def test_file_diff_pages_through_hunks(self):
+        """Test a file's hunks are split across pages that together hold every change."""
+        first = file_diff_page(self.backend, ["--cached"], "app.py", page=1, page_chars=300)
+        self.assertIn("page 1 of ", first)
+        total = int(first.split("page 1 of ")[1].split(";")[0])
+        self.assertGreater(total, 1)
+        pages = [first] + [file_diff_page(self.backend, ["--cached"], "app.py", page=p, page_chars=300)
+                           for p in range(2, total + 1)]
+        self.assertEqual(sum(page.count("changed\n") for page in pages), 5)
+        self.assertIn("does not exist", file_diff_page(self.backend, ["--cached"], "app.py", page=total + 1,
+                                                       page_chars=300))
+
+    def test_log_pages(self):
+        """Test log pages return n commits each and report whether more follow."""
+        text, more = log_page(self.backend, n=2)
+        self.assertTrue(more)
+        self.assertEqual([line.strip() for line in text.splitlines()[1::2]], ["commit 2", "commit 1"])
+        text, more = log_page(self.backend, n=2, page=2)
+        self.assertFalse(more)
+        self.assertEqual(text.splitlines()[1].strip(), "commit 0")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import tempfile
+from tools.gitignore import GitIgnoreMatcher
+
+class TestGitIgnoreMatcher(unittest.TestCase):
+    def setUp(self):
+        """Create a tree with root and nested .gitignore files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        files = {
+            '.gitignore': "*.log\n!keep.log\nnode_modules/\n/build\ndocs/**/*.tmp\n",
+            'src/.gitignore': "generated.py\n!important.log\n",
+            'src/app.py': '', 'src/generated.py': '', 'src/important.log': '', 'src/debug.log': '',
+            'keep.log': '', 'app.log': '', 'build/out.js': '', 'lib/build/out.js': '',
+            'node_modules/pkg/index.js': '', 'docs/a/b/x.tmp': '', 'docs/x.md': '',
+        }
+        for path, content in files.items():
+            full = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, 'w') as f:
+                f.write(content)
+        self.matcher = GitIgnoreMatcher(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ignored(self, path):
+        return self.matcher.is_ignored(os.path.join(self.root, path))
+
+    def test_gitignore_semantics(self):
+        """Test negation, anchoring, directory-only rules, ** and nested files."""
+        self.assertTrue(self.ignored('app.log'))
+        self.assertFalse(self.ignored('keep.log'))
+        self.assertTrue(self.ignored('node_modules/pkg/index.js'))
+        self.assertTrue(self.ignored('build/out.js'))
+        self.assertFalse(self.ignored('lib/build/out.js'))
+        self.assertTrue(self.ignored('docs/a/b/x.tmp'))
+        self.assertTrue(self.ignored('src/generated.py'))
+        self.assertTrue(self.ignored('src/debug.log'))
+        self.assertFalse(self.ignored('src/important.log'))
+        self.assertFalse(self.ignored('src/app.py'))
+
+    def test_walk_prunes_ignored_directories(self):
+        """Test that walk never enters ignored directories."""
+        visited = [os.path.relpath(root, self.root) for root, _, _ in self.matcher.walk(self.root)]
+        self.assertNotIn('node_modules', visited)
+        self.assertNotIn('build', visited)
+        files = sorted(os.path.relpath(os.path.join(root, f), self.root)
+                       for root, _, names in self.matcher.walk(self.root) for f in names)
+        self.assertEqual(files, ['.gitignore', 'docs/x.md', 'keep.log', 'lib/build/out.js',
+                                 'src/.gitignore', 'src/app.py', 'src/important.log'])
+
+if __name__ == '__main__':
+    unittest.main()
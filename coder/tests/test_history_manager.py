@@ -0,0 +1,91 @@
+import unittest
+import json
+from history_manager import HistoryManager
+
+def turn(number, output_words=400, output=None, path=None):
+    """One user turn in which the assistant reads a file and answers."""
+    call_id = f"call_{number}"
+    return [
+        {"role": "user", "content": f"question {number}"},
+        {"role": "assistant", "sender": "Coder", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function",
+             "function": {"name": "read_file", "arguments": json.dumps({"file_name_with_path": path or f"f{number}.py"})}}]},
+        {"role": "tool", "tool_call_id": call_id, "tool_name": "read_file", "content": output if output is not None else f"turn {number}\n" + "word " * output_words},
+        {"role": "assistant", "sender": "Coder", "content": f"answer {number}"},
+    ]
+
+class TestHistoryManager(unittest.TestCase):
+    def test_under_budget_history_is_unchanged(self):
+        """Test nothing is compacted while the history fits."""
+        history = HistoryManager(budget_tokens=100000)
+        history.extend(turn(1))
+        self.assertEqual(history.window(), turn(1))
+
+    def test_old_tool_outputs_become_stubs(self):
+        """Test older tool outputs are replaced by stubs naming the call, recent ones are kept."""
+        history = HistoryManager(budget_tokens=1200)
+        for number in range(1, 4):
+            history.extend(turn(number))
+        window = history.window()
+        self.assertLessEqual(history.total_tokens, 1200)
+        self.assertEqual(window[2]["content"][:60],
+                         "[Output of read_file(file_name_with_path='f1.py') removed to")
+        self.assertEqual(window[-2]["content"], "turn 3\n" + "word " * 400)
+        self.assertNotIn("stubbed", window[2])
+
+    def test_old_turns_fold_into_summary_keeping_tool_pairs(self):
+        """Test whole turns move into the summary and every tool result still follows its call."""
+        history = HistoryManager(budget_tokens=700)
+        for number in range(1, 6):
+            history.extend(turn(number))
+        window = history.window()
+        self.assertEqual(window[0]["role"], "system")
+        self.assertIn("- User: question 1", window[0]["content"])
+        self.assertEqual(window[1], {"role": "user", "content": window[1]["content"]})
+        call_ids = set()
+        for message in window:
+            for call in message.get("tool_calls") or []:
+                call_ids.add(call["id"])
+            if message["role"] == "tool":
+                self.assertIn(message["tool_call_id"], call_ids)
+        self.assertEqual(window[-1]["content"], "answer 5")
+        self.assertGreater(history.stats()["folded_turns"], 0)
+
+    def test_repeated_output_becomes_reference(self):
+        """Test re-reading an unchanged file sends a reference instead of a second copy."""
+        history = HistoryManager(budget_tokens=100000)
+        content = "".join(f"line {i}\n" for i in range(200))
+        history.extend(turn(1, output=content, path="a.py"))
+        history.extend(turn(2, output=content, path="a.py"))
+        window = history.window()
+        self.assertEqual(window[2]["content"], content)
+        self.assertTrue(window[6]["content"].startswith(
+            "[Same output as the earlier read_file(file_name_with_path='a.py') result above"))
+        self.assertNotIn("content_hash", window[6])
+        self.assertEqual(history.stats()["stored_outputs"], 1)
+
+    def test_changed_output_becomes_diff(self):
+        """Test re-reading a slightly changed file sends a diff against the earlier copy."""
+        history = HistoryManager(budget_tokens=100000)
+        before = "".join(f"line {i}\n" for i in range(200))
+        after = before.replace("line 100\n", "line one hundred\n")
+        history.extend(turn(1, output=before, path="a.py"))
+        history.extend(turn(2, output=after, path="a.py"))
+        content = history.window()[6]["content"]
+        self.assertIn("Unified diff against it", content)
+        self.assertIn("-line 100\n+line one hundred\n", content)
+        self.assertEqual(history.stats()["dedup_diffs"], 1)
+
+    def test_reference_is_restored_when_base_is_compacted(self):
+        """Test a reference gets the full output back once the copy it points to is folded away."""
+        content = "".join(f"line {i}\n" for i in range(300))
+        history = HistoryManager(budget_tokens=100000)
+        history.extend(turn(1, output=content, path="a.py"))
+        history.extend(turn(2, output="other " * 300))
+        history.extend(turn(3, output=content, path="a.py"))
+        history.budget_tokens = history.total_tokens - 10
+        window = history.window()
+        self.assertIn(content, [message["content"] for message in window])
+
+if __name__ == '__main__':
+    unittest.main()
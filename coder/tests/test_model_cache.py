@@ -0,0 +1,90 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+import instructor
+from openai import OpenAI
+from pydantic import BaseModel
+from model_cache import CacheMiss, ModelCache, cache_key, install
+from model_stub import StubOpenAIClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+class Verdict(BaseModel):
+    value: bool
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cached_stub(self, mode="auto", **kwargs):
+        return install(StubOpenAIClient(**kwargs), ModelCache(self.tmp.name, mode=mode))
+
+    def test_cache_key_is_canonical(self):
+        """Test the key ignores dict ordering and transport options but not the request itself."""
+        a = cache_key(model="m", messages=[{"role": "user", "content": "x"}], temperature=0)
+        b = cache_key(messages=[{"content": "x", "role": "user"}], temperature=0, model="m", timeout=5)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, cache_key(model="m", messages=[{"role": "user", "content": "y"}], temperature=0))
+
+    def test_replay_returns_recorded_response_without_calling_model(self):
+        """Test a recorded completion is replayed offline as a real completion object."""
+        recorder = self.cached_stub()
+        recorded = recorder.chat.completions.create(model="m", messages=MESSAGES)
+        replayer = self.cached_stub(mode="replay")
+        replayed = replayer.chat.completions.create(model="m", messages=MESSAGES)
+        self.assertEqual(replayed.choices[0].message.content, recorded.choices[0].message.content)
+        self.assertEqual(replayer.calls, [])
+        self.assertEqual(replayer.model_cache.stats()["hits"], 1)
+        with self.assertRaises(CacheMiss):
+            replayer.chat.completions.create(model="m", messages=[{"role": "user", "content": "new"}])
+
+    def test_streams_are_recorded_and_replayed(self):
+        """Test a streamed response replays as the same chunks."""
+        recorder = self.cached_stub()
+        recorded = [c.choices[0].delta.content for c in recorder.chat.completions.create(model="m", messages=MESSAGES, stream=True)]
+        replayer = self.cached_stub(mode="replay")
+        replayed = [c.choices[0].delta.content for c in replayer.chat.completions.create(model="m", messages=MESSAGES, stream=True)]
+        self.assertEqual(replayed, recorded)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test the cache stays under max_bytes by dropping the oldest recordings."""
+        client = install(StubOpenAIClient(), ModelCache(self.tmp.name, max_bytes=2500))
+        for i in range(10):
+            client.chat.completions.create(model="m", messages=[{"role": "user", "content": f"q{i}"}])
+        sizes = [os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(self.tmp.name) for f in files]
+        self.assertLessEqual(sum(sizes), 2500)
+        self.assertGreater(client.model_cache.stats()["evicted"], 0)
+        client.chat.completions.create(model="m", messages=[{"role": "user", "content": "q9"}])
+        self.assertEqual(client.model_cache.stats()["hits"], 1)
+
+    def test_recording_does_not_walk_the_cache_each_time(self):
+        """Test the cache directory is walked once, not on every recording, while it stays under max_bytes."""
+        client = self.cached_stub()
+        with mock.patch('model_cache.os.walk', wraps=os.walk) as walk:
+            for i in range(5):
+                client.chat.completions.create(model="m", messages=[{"role": "user", "content": f"q{i}"}])
+        self.assertEqual(walk.call_count, 1)
+
+    def test_instructor_calls_are_replayed(self):
+        """Test structured outputs through instructor replay from the cache."""
+        def responder(messages, tools):
+            call = {"id": "call_1", "type": "function",
+                    "function": {"name": tools[0]["function"]["name"], "arguments": json.dumps({"value": True})}}
+            return {"role": "assistant", "content": None, "tool_calls": [call]}
+
+        stub = StubOpenAIClient(responder)
+        for mode in ("auto", "replay"):
+            openai = OpenAI(api_key="test")
+            openai.chat.completions.create = stub.chat.completions.create
+            client = instructor.from_openai(install(openai, ModelCache(self.tmp.name, mode=mode)))
+            verdict = client.chat.completions.create(model="m", messages=MESSAGES, response_model=Verdict)
+            self.assertTrue(verdict.value)
+        self.assertEqual(len(stub.calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
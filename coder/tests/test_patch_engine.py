@@ -0,0 +1,80 @@
+import unittest
+import os
+import tempfile
+from tools.patch_engine import apply_patch
+
+class TestPatchEngine(unittest.TestCase):
+    def setUp(self):
+        """Create a workspace with two files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = {'a.py': ''.join(f"line {i}\n" for i in range(1, 21)), 'b.py': "x = 1\ny = 2\n"}
+        for name, content in self.files.items():
+            with open(self.path(name), 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_multi_file_patch_with_moved_hunk(self):
+        """Test that a hunk whose header is off by a few lines is still placed by its context."""
+        diff = ("--- a/a.py\n+++ b/a.py\n@@ -7,3 +7,3 @@\n line 10\n-line 11\n+line eleven\n line 12\n"
+                "--- a/b.py\n+++ b/b.py\n@@ -1,2 +1,3 @@\n x = 1\n+z = 3\n y = 2\n")
+        success, report, changed = apply_patch(diff, self.path)
+        self.assertTrue(success)
+        self.assertEqual(report, ["a.py: hunk 1 applied at line 10 (offset +3)", "b.py: hunk 1 applied at line 1"])
+        self.assertIn("line 10\nline eleven\nline 12\n", self.read('a.py'))
+        self.assertEqual(self.read('b.py'), "x = 1\nz = 3\ny = 2\n")
+        self.assertEqual(changed, [self.path('a.py'), self.path('b.py')])
+
+    def test_stale_context_changes_nothing(self):
+        """Test that a hunk with mismatching context is reported and no file is written."""
+        diff = ("--- a/b.py\n+++ b/b.py\n@@ -1,2 +1,2 @@\n x = 1\n-y = 2\n+y = 3\n"
+                "--- a/a.py\n+++ b/a.py\n@@ -1,2 +1,2 @@\n line 1\n-line two\n+line 2!\n")
+        success, report, changed = apply_patch(diff, self.path)
+        self.assertFalse(success)
+        self.assertTrue(report[1].startswith("a.py: hunk 1 FAILED"))
+        self.assertEqual(self.read('b.py'), self.files['b.py'])
+        self.assertEqual(changed, [])
+
+    def test_sections_for_the_same_file_all_apply(self):
+        """Test that a second section for a file is applied on top of the first instead of replacing it."""
+        diff = ("--- a/a.py\n+++ b/a.py\n@@ -1,3 +1,3 @@\n line 1\n-line 2\n+line two\n line 3\n"
+                "--- a/b.py\n+++ b/b.py\n@@ -1,2 +1,2 @@\n x = 1\n-y = 2\n+y = 3\n"
+                "--- a/a.py\n+++ b/a.py\n@@ -18,3 +18,3 @@\n line 18\n-line 19\n+line nineteen\n line 20\n")
+        success, report, changed = apply_patch(diff, self.path)
+        self.assertTrue(success)
+        self.assertIn("line 1\nline two\nline 3\n", self.read('a.py'))
+        self.assertIn("line 18\nline nineteen\nline 20\n", self.read('a.py'))
+        self.assertEqual(changed, [self.path('a.py'), self.path('b.py')])
+
+    def test_new_file_over_an_existing_one_fails(self):
+        """Test that a /dev/null source section for a path that exists is refused instead of prepended."""
+        diff = "--- /dev/null\n+++ b/b.py\n@@ -0,0 +1 @@\n+w = 0\n"
+        success, report, changed = apply_patch(diff, self.path)
+        self.assertFalse(success)
+        self.assertEqual(report[0], "b.py: FAILED: file already exists")
+        self.assertEqual(self.read('b.py'), self.files['b.py'])
+
+    def test_deletions_are_checked(self):
+        """Test that a deletion needs the file to exist and to hold exactly the removed lines."""
+        stale = "--- a/b.py\n+++ /dev/null\n@@ -1,2 +0,0 @@\n-x = 1\n-y = 3\n"
+        success, report, _ = apply_patch(stale, self.path)
+        self.assertFalse(success)
+        self.assertTrue(report[0].startswith("b.py: FAILED: file content does not match"))
+        self.assertTrue(os.path.exists(self.path('b.py')))
+        success, report, _ = apply_patch("--- a/c.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-z = 1\n", self.path)
+        self.assertFalse(success)
+        self.assertEqual(report[0], "c.py: FAILED: file does not exist")
+        success, _, changed = apply_patch(stale.replace("y = 3", "y = 2"), self.path)
+        self.assertTrue(success)
+        self.assertFalse(os.path.exists(self.path('b.py')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import json
+import time
+import mongomock
+import server
+from parallel_swarm import ParallelSwarm
+from model_stub import StubOpenAIClient
+
+REPLY = " ".join(f"word{i}" for i in range(20))
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        database = mongomock.MongoClient().chat_database
+        server.messages_collection = database.messages
+        server.threads_collection = database.threads
+        self.model = StubOpenAIClient(lambda messages, tools: REPLY, chunk_delay_s=0.02)
+        server.swarm_client = ParallelSwarm(client=self.model)
+        self.client = server.app.test_client()
+
+    def post(self, thread_id, **data):
+        return self.client.post(f"/agent/continue_chat/{thread_id}", json=data, buffered=False)
+
+    def test_continue_chat_streams_tokens_and_stores_messages_once(self):
+        """Test the reply streams as SSE tokens and the turn is written to MongoDB at the end."""
+        response = self.post("t1", message="hello", agent="code")
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = parse_events(response.get_data(as_text=True))
+        self.assertEqual(events[0], ("start", {"thread_id": "t1", "agent": "Coder"}))
+        tokens = "".join(data["content"] for event, data in events if event == "token")
+        self.assertEqual(tokens, REPLY)
+        self.assertEqual(events[-1][0], "done")
+        self.assertIsNotNone(events[-1][1]["first_token_ms"])
+        stored = list(server.messages_collection.find({"thread_id": "t1"}))
+        self.assertEqual([doc["type"] for doc in stored], ["user", "agent"])
+        self.assertEqual(stored[1]["message"], REPLY)
+
+    def test_first_event_arrives_before_turn_finishes(self):
+        """Test the first bytes reach the client while the model is still generating."""
+        started = time.perf_counter()
+        response = self.post("t2", message="hello", agent="code")
+        chunks = iter(response.response)
+        next(chunks)
+        first_byte = time.perf_counter() - started
+        for _ in chunks:
+            pass
+        total = time.perf_counter() - started
+        self.assertLess(first_byte, total / 2)
+
+    def test_history_is_sent_to_the_model(self):
+        """Test later turns include the stored thread history and stay with the last agent."""
+        self.post("t3", message="first question", agent="code").get_data()
+        events = parse_events(self.post("t3", message="second question").get_data(as_text=True))
+        self.assertEqual(events[0][1]["agent"], "Coder")
+        contents = [m.get("content") for m in self.model.calls[-1]["messages"]]
+        self.assertIn("first question", contents)
+        self.assertIn(REPLY, contents)
+        self.assertEqual(server.messages_collection.count_documents({"thread_id": "t3"}), 4)
+
+    def test_rejects_empty_message_and_unknown_agent(self):
+        """Test bad requests are answered with 400 before any agent runs."""
+        self.assertEqual(self.post("t4", message="").status_code, 400)
+        self.assertEqual(self.post("t4", message="hi", agent="nope").status_code, 400)
+        self.assertEqual(self.model.calls, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import asyncio
+from history_manager import HistoryManager
+from session_cache import Session, SessionCache
+
+class TestSessionCache(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+
+    async def loader(self, thread_id):
+        self.loads.append(thread_id)
+        await asyncio.sleep(0.01)
+        return Session(thread_id, "agent", HistoryManager())
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_hits_do_not_reload(self):
+        """Test a cached session is returned without calling the loader again."""
+        async def scenario():
+            cache = SessionCache(self.loader)
+            first = await cache.get("t")
+            second = await cache.get("t")
+            return first, second, cache.stats()
+        first, second, stats = self.run_async(scenario())
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, ["t"])
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_concurrent_misses_share_one_load(self):
+        """Test simultaneous requests for an uncached thread load it once."""
+        async def scenario():
+            cache = SessionCache(self.loader)
+            return await asyncio.gather(*(cache.get("t") for _ in range(5)))
+        sessions = self.run_async(scenario())
+        self.assertEqual(self.loads, ["t"])
+        self.assertTrue(all(session is sessions[0] for session in sessions))
+
+    def test_least_recently_used_is_evicted_unless_busy(self):
+        """Test the oldest idle session goes past max_sessions, but not one in the middle of a turn."""
+        async def scenario():
+            cache = SessionCache(self.loader, max_sessions=2)
+            a = await cache.get("a")
+            await cache.get("b")
+            async with a.lock:
+                await cache.get("c")
+                busy_kept = "a" in cache._sessions
+            await cache.get("a")
+            await cache.get("d")
+            return busy_kept, list(cache._sessions), cache.stats()
+        busy_kept, cached, stats = self.run_async(scenario())
+        self.assertTrue(busy_kept)
+        self.assertEqual(cached, ["a", "d"])
+        self.assertEqual(stats["evicted_lru"], 2)
+
+    def test_idle_sessions_are_evicted(self):
+        """Test sessions unused for longer than the idle ttl are dropped and reloaded on next use."""
+        async def scenario():
+            cache = SessionCache(self.loader, idle_ttl_s=0.05)
+            await cache.get("t")
+            await asyncio.sleep(0.1)
+            evicted = cache.evict_idle()
+            await cache.get("t")
+            return evicted
+        self.assertEqual(self.run_async(scenario()), 1)
+        self.assertEqual(self.loads, ["t", "t"])
+
+    def test_failed_load_is_not_cached(self):
+        """Test a loader error reaches the caller and the next request tries again."""
+        attempts = []
+
+        async def failing(thread_id):
+            attempts.append(thread_id)
+            raise ConnectionError("mongo down")
+
+        async def scenario():
+            cache = SessionCache(failing)
+            for _ in range(2):
+                with self.assertRaises(ConnectionError):
+                    await cache.get("t")
+            return len(cache)
+        self.assertEqual(self.run_async(scenario()), 0)
+        self.assertEqual(len(attempts), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import time
+import tempfile
+from tools.shell_executor import OutputBuffer, ShellExecutor
+
+class TestShellExecutor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.executor = ShellExecutor()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_output_buffer_keeps_head_and_tail(self):
+        """Test large outputs keep their beginning and end with the omitted size noted."""
+        buffer = OutputBuffer(head_bytes=4, tail_bytes=4)
+        for chunk in (b"abc", b"defgh", b"ijklmn"):
+            buffer.append(chunk)
+        self.assertEqual(buffer.omitted_bytes, 6)
+        self.assertEqual(buffer.text(), "abcd\n... [6 bytes of output omitted] ...\nklmn")
+
+    def test_run_captures_output_and_exit_code(self):
+        """Test stdout and stderr are captured and a failing exit code is reported."""
+        result = self.executor.run("echo out; echo err >&2; exit 3", self.tmp.name, echo=False)
+        self.assertEqual(result.exit_code, 3)
+        self.assertIn("out", str(result))
+        self.assertIn("err", str(result))
+        self.assertTrue(str(result).endswith("[exit code 3]"))
+
+    def test_timeout_kills_command(self):
+        """Test a hung command is killed once the timeout expires."""
+        started = time.monotonic()
+        result = self.executor.run("echo started; sleep 30", self.tmp.name, timeout=0.5, echo=False)
+        self.assertTrue(result.timed_out)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertIn("started", str(result))
+
+    def test_background_job_can_be_polled_and_stopped(self):
+        """Test a background job reports output while running and can be stopped."""
+        job = self.executor.start("echo ready; sleep 30", self.tmp.name)
+        deadline = time.monotonic() + 5
+        while "ready" not in job.status() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertIn("running", job.status())
+        self.assertIn("ready", job.status())
+        self.executor.stop(job.job_id)
+        self.assertTrue(job.done)
+        self.assertIn("stopped", job.status())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import tempfile
+from tools.shell_session import ShellSession
+
+class TestShellSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, 'sub'))
+        self.session = ShellSession(self.tmp.name)
+
+    def tearDown(self):
+        self.session.close()
+        self.tmp.cleanup()
+
+    def test_state_persists_between_commands(self):
+        """Test cd and exported variables carry over and one shell serves every command."""
+        self.session.run("cd sub && export GREETING=hello", echo=False)
+        result = self.session.run("echo $GREETING; pwd", echo=False)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(str(result).split(), ["hello", os.path.realpath(os.path.join(self.tmp.name, 'sub'))])
+        self.assertEqual(self.session.stats()['spawns'], 1)
+
+    def test_exit_codes_and_output_without_newline(self):
+        """Test the exit code is captured and output lacking a final newline is kept intact."""
+        result = self.session.run("printf 'no newline'; false", echo=False)
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(result.output.text(), "no newline")
+
+    def test_session_restarts_after_exit_and_timeout(self):
+        """Test a command that exits the shell or hangs gets a fresh session next time."""
+        result = self.session.run("exit 4", echo=False)
+        self.assertEqual(result.exit_code, 4)
+        result = self.session.run("sleep 30", timeout=0.3, echo=False)
+        self.assertTrue(result.timed_out)
+        result = self.session.run("echo back", echo=False)
+        self.assertEqual(str(result), "back\n")
+        self.assertEqual(self.session.stats()['spawns'], 3)
+
+    def test_syntax_error_fails_fast_and_keeps_the_session(self):
+        """Test an unbalanced quote or trailing backslash fails at once without restarting the shell."""
+        self.session.run("cd sub", echo=False)
+        for command in ['echo "unterminated', "echo 'unterminated", "if true; then"]:
+            result = self.session.run(command, timeout=5, echo=False)
+            self.assertFalse(result.timed_out)
+            self.assertNotEqual(result.exit_code, 0)
+            self.assertLess(result.elapsed_s, 2)
+        result = self.session.run("echo trailing \\", timeout=5, echo=False)
+        self.assertEqual((result.exit_code, result.timed_out), (0, False))
+        self.assertEqual(str(self.session.run("pwd", echo=False)).strip(),
+                         os.path.realpath(os.path.join(self.tmp.name, 'sub')))
+        self.assertEqual(self.session.stats()['spawns'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import time
+import threading
+from tools.tool_executor import BARRIER, READ, WRITE, ToolExecutor, call_footprint
+
+class TestToolExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = ToolExecutor(workers=8)
+        self.log = []
+        self.lock = threading.Lock()
+
+    def tool(self, name, delay=0.1):
+        def function(**args):
+            with self.lock:
+                self.log.append(("start", name, args))
+            time.sleep(delay)
+            with self.lock:
+                self.log.append(("end", name, args))
+            return f"{name} {sorted(args.values())}"
+        return function
+
+    def test_reads_run_concurrently_in_order(self):
+        """Test independent reads overlap and their results keep the order of the calls."""
+        calls = [("read_file", self.tool("read_file"), {"file_name_with_path": f"f{i}.py"}) for i in range(5)]
+        started = time.perf_counter()
+        results = self.executor.run(calls)
+        self.assertLess(time.perf_counter() - started, 0.3)
+        self.assertEqual([r.value for r in results], [f"read_file ['f{i}.py']" for i in range(5)])
+        self.assertGreater(self.executor.stats()["speedup"], 2)
+
+    def test_writes_to_same_path_are_serialized(self):
+        """Test a read and writes of one path run one after another while another path proceeds."""
+        calls = [("write_file", self.tool("write_file"), {"file_name_with_path": "a.py", "content": "1"}),
+                 ("read_file", self.tool("read_file"), {"file_name_with_path": "./a.py"}),
+                 ("write_files", self.tool("write_files"), {"files": {"a.py": "2"}}),
+                 ("read_file", self.tool("read_file"), {"file_name_with_path": "b.py"})]
+        results = self.executor.run(calls)
+        a_events = [event[:2] for event in self.log if event[1] != "read_file" or event[2].get("file_name_with_path") != "b.py"]
+        self.assertEqual(a_events, [("start", "write_file"), ("end", "write_file"), ("start", "read_file"),
+                                    ("end", "read_file"), ("start", "write_files"), ("end", "write_files")])
+        self.assertEqual(self.log[1][:2], ("start", "read_file"))
+        self.assertEqual(len(results), 4)
+
+    def test_shell_command_is_a_barrier(self):
+        """Test a shell command waits for earlier calls and later calls wait for it."""
+        calls = [("read_file", self.tool("read_file"), {"file_name_with_path": "a.py"}),
+                 ("run_shell_command", self.tool("run_shell_command", 0.05), {"command": "make"}),
+                 ("find_file", self.tool("find_file"), {"file_pattern": "*.py"})]
+        self.executor.run(calls)
+        self.assertEqual([event[:2] for event in self.log],
+                         [("start", "read_file"), ("end", "read_file"), ("start", "run_shell_command"),
+                          ("end", "run_shell_command"), ("start", "find_file"), ("end", "find_file")])
+
+    def test_footprints(self):
+        """Test calls are classified by the paths named in their arguments."""
+        blocks = "x.py\n<<<<<<< SEARCH\na\n=======\nb\n>>>>>>> REPLACE\n"
+        self.assertEqual(call_footprint("edit_files", {"edit_blocks": blocks}), (WRITE, frozenset({"x.py"})))
+        self.assertEqual(call_footprint("list_files", {"directory": "."}), (READ, None))
+        self.assertEqual(call_footprint("git_commit", {"message": "m"}), (BARRIER, None))
+
+    def test_errors_are_returned_per_call(self):
+        """Test a failing call does not stop the others."""
+        def failing(**args):
+            raise ValueError("boom")
+        results = self.executor.run([("read_file", failing, {}), ("read_file", self.tool("read_file", 0), {})])
+        self.assertIsInstance(results[0].error, ValueError)
+        self.assertEqual(results[1].value, "read_file []")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from tools.trigram_index import TrigramIndex, required_literals
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        """Create a small workspace and index it."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.files = {'a.py': "def find_file():\n    pass\n", 'b.py': "import os\n", 'c.txt': "FIND_FILE docs\n"}
+        for name, content in self.files.items():
+            with open(os.path.join(self.root, name), 'w') as f:
+                f.write(content)
+        self.index = TrigramIndex(self.root)
+        self.index.rebuild(workers=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_narrow_literal_and_regex(self):
+        """Test that narrowing keeps only files that can match."""
+        paths = sorted(self.files)
+        self.assertEqual(self.index.narrow('find_file', paths), ['a.py', 'c.txt'])
+        self.assertEqual(self.index.narrow(r'import\s+os', paths, use_regex=True), ['b.py'])
+        self.assertEqual(self.index.narrow('a|b', paths, use_regex=True), paths)
+        self.assertEqual(required_literals(r'def \w+_file', use_regex=True), ['def ', '_file'])
+
+    def test_changed_files_stay_candidates(self):
+        """Test that files changed after indexing are kept until the index is updated."""
+        path = os.path.join(self.root, 'b.py')
+        with open(path, 'w') as f:
+            f.write("def find_file_again():\n    pass\n")
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(self.index.narrow('find_file', sorted(self.files)), ['a.py', 'b.py', 'c.txt'])
+        stats = self.index.update(workers=1)
+        self.assertEqual(stats['changed'], 1)
+        os.remove(os.path.join(self.root, 'c.txt'))
+        self.index.update(workers=1)
+        self.assertEqual(self.index.narrow('find_file', ['a.py', 'b.py']), ['a.py', 'b.py'])
+        self.assertEqual(self.index.stats()['files'], 2)
+
+    def test_in_place_append_stays_a_candidate(self):
+        """Test that a file appended to in place, which changes no directory, is kept until re-indexed."""
+        with open(os.path.join(self.root, 'b.py'), 'a') as f:
+            f.write("giraffe_unique = 1\n")
+        with mock.patch.object(self.index, 'update_in_background') as update:
+            self.assertEqual(self.index.narrow('giraffe_unique', sorted(self.files)), ['b.py'])
+        update.assert_called_once()
+        self.index.update(workers=1)
+        self.assertEqual(self.index.narrow('giraffe_unique', sorted(self.files)), ['b.py'])
+        self.assertEqual(self.index.narrow('find_file', ['b.py']), [])
+
+if __name__ == '__main__':
+    unittest.main()
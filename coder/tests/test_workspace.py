@@ -0,0 +1,77 @@
+import unittest
+import os
+import tempfile
+from tools.shell_session import sessions_supported
+from tools.workspace import PathEscapeError, Workspace, workspace_root
+
+class TestWorkspace(unittest.TestCase):
+    def setUp(self):
+        """Create two repositories side by side under one parent."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parent = os.path.realpath(self.tmp.name)
+        for repo in ['repo_a', 'repo_b']:
+            os.makedirs(os.path.join(self.parent, repo, 'src'))
+        self.workspace = Workspace(os.path.join(self.parent, 'repo_a'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_paths_inside_the_root_resolve(self):
+        """Test relative paths, and absolute paths inside the root, resolve to absolute paths in the workspace."""
+        root = self.workspace.root
+        self.assertEqual(self.workspace.resolve('src/main.py'), os.path.join(root, 'src', 'main.py'))
+        self.assertEqual(self.workspace.resolve('src/../README.md'), os.path.join(root, 'README.md'))
+        self.assertEqual(self.workspace.resolve(os.path.join(root, 'src')), os.path.join(root, 'src'))
+        self.assertEqual(self.workspace.resolve(''), root)
+
+    def test_paths_leading_outside_are_refused(self):
+        """Test parent references, absolute paths elsewhere and sibling repositories are refused."""
+        for path in ['../repo_b/src', 'src/../../repo_b', '/etc/passwd', os.path.join(self.parent, 'repo_a_old')]:
+            with self.assertRaises(PathEscapeError):
+                self.workspace.resolve(path)
+
+    def test_symlinks_out_of_the_root_are_refused(self):
+        """Test a symlink inside the workspace that points at another repository cannot be followed."""
+        os.symlink(os.path.join(self.parent, 'repo_b'), os.path.join(self.workspace.root, 'link'))
+        with self.assertRaises(PathEscapeError):
+            self.workspace.resolve('link/src')
+
+    def test_workspaces_keep_their_own_jobs_and_state(self):
+        """Test background jobs are visible only to the workspace that started them, and caches follow the root."""
+        other = Workspace(os.path.join(self.parent, 'repo_b'))
+        self.workspace.add_job(7)
+        self.assertTrue(self.workspace.owns_job(7))
+        self.assertFalse(other.owns_job(7))
+        self.assertIsNot(self.workspace.index(), other.index())
+        self.assertIs(self.workspace.index(), Workspace(self.workspace.root).index())
+
+    def test_named_workspaces_are_directories_under_the_parent(self):
+        """Test server clients can only name directories under the workspaces root."""
+        self.assertEqual(workspace_root(None, 'default', self.parent), os.path.abspath('default'))
+        self.assertEqual(workspace_root('repo_b', 'default', self.parent), os.path.join(self.parent, 'repo_b'))
+        for name in ['../etc', 'missing', '.', '/tmp']:
+            with self.assertRaises(ValueError):
+                workspace_root(name, 'default', self.parent)
+        with self.assertRaises(ValueError):
+            workspace_root('repo_b', 'default', None)
+
+    @unittest.skipUnless(sessions_supported(), "needs a POSIX shell")
+    def test_workspaces_on_one_root_have_their_own_shell(self):
+        """Test two conversations on the same repository do not share a working directory or environment."""
+        other = Workspace(self.workspace.root)
+        self.assertIs(self.workspace.shell(), self.workspace.shell())
+        self.assertIsNot(self.workspace.shell(), other.shell())
+        try:
+            self.workspace.shell().run("cd src && export MODE=mine", echo=False)
+            self.assertEqual(other.shell().run("pwd; echo \"[$MODE]\"", echo=False).output.text().split(),
+                             [self.workspace.root, '[]'])
+            shell = self.workspace.shell()
+            self.workspace.close()
+            self.assertFalse(shell.alive)
+            self.assertIsNot(self.workspace.shell(), shell)
+        finally:
+            self.workspace.close()
+            other.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import os
+import tempfile
+from tools.workspace_index import WorkspaceIndex
+
+class TestWorkspaceIndex(unittest.TestCase):
+    def setUp(self):
+        """Create a small tree to index."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, 'src', 'pkg'))
+        os.makedirs(os.path.join(self.root, '.git'))
+        os.makedirs(os.path.join(self.root, 'node_modules', 'dep'))
+        for path in ['README.md', 'src/main.py', 'src/pkg/util.py', '.git/HEAD', '.gitignore', 'node_modules/dep/util.py']:
+            with open(os.path.join(self.root, path), 'w') as f:
+                f.write('node_modules/\n' if path == '.gitignore' else path)
+        self.index = WorkspaceIndex(self.root, poll_interval=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_by_name_and_pattern(self):
+        """Test basename, glob and regex lookups."""
+        self.assertEqual(self.index.find('util.py'), [os.path.join('src', 'pkg', 'util.py')])
+        self.assertEqual(self.index.find('*.py', os.path.join(self.root, 'src', 'pkg')),
+                         [os.path.join('src', 'pkg', 'util.py')])
+        self.assertEqual(self.index.find(r'^ma.*\.py$', use_regex=True), [os.path.join('src', 'main.py')])
+        self.assertEqual(self.index.find('HEAD'), [])
+        self.assertIn('.git', self.index.listdir(self.root))
+        self.assertIn('node_modules', self.index.listdir(self.root))
+        self.assertIsNone(self.index.find('*.py', os.path.join(self.root, 'node_modules')))
+        self.assertGreater(self.index.stats()['hits'], 0)
+
+    def test_tracks_changes(self):
+        """Test that notified writes and polled external changes are picked up."""
+        self.index.ensure_built()
+        new_file = os.path.join(self.root, 'src', 'new', 'added.py')
+        os.makedirs(os.path.dirname(new_file))
+        with open(new_file, 'w') as f:
+            f.write('x')
+        self.index.notify_changed(new_file)
+        self.assertEqual(self.index.find('added.py'), [os.path.join('src', 'new', 'added.py')])
+
+        os.remove(os.path.join(self.root, 'src', 'main.py'))
+        self.index.poll()
+        self.assertEqual(self.index.find('main.py'), [])
+        self.assertEqual(self.index.stats()['files'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+from tools.state_dir import state_dir
+from tools.write_batch import WriteBatch
+
+class TestWriteBatch(unittest.TestCase):
+    def setUp(self):
+        """Create a workspace with one existing file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(self.path('keep.txt'), 'w') as f:
+            f.write("original\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.tmp.name, *names)
+
+    def read(self, *names):
+        with open(self.path(*names)) as f:
+            return f.read()
+
+    def test_commit_coalesces_and_creates_directories(self):
+        """Test repeated writes keep the last content and missing directories are created."""
+        with WriteBatch(self.tmp.name) as batch:
+            batch.write(self.path('keep.txt'), "first\n")
+            batch.write(self.path('keep.txt'), "second\n")
+            batch.write(self.path('pkg', 'sub', 'new.py'), "X = 1\n")
+            batch.mkdir(self.path('empty'))
+            self.assertEqual(batch.staged(self.path('keep.txt')), "second\n")
+            self.assertEqual(self.read('keep.txt'), "original\n")
+        self.assertEqual(self.read('keep.txt'), "second\n")
+        self.assertEqual(self.read('pkg', 'sub', 'new.py'), "X = 1\n")
+        self.assertTrue(os.path.isdir(self.path('empty')))
+        leftovers = [name for name in os.listdir(self.tmp.name) if name.endswith(('.tmp', '.bak'))]
+        self.assertEqual(leftovers, [])
+
+    def test_failed_commit_rolls_back(self):
+        """Test a failing rename restores files that were already replaced."""
+        os.makedirs(self.path('blocker'))
+        with open(self.path('blocker', 'inner'), 'w') as f:
+            f.write("x")
+        batch = WriteBatch(self.tmp.name)
+        batch.write(self.path('keep.txt'), "changed\n")
+        batch.write(self.path('created.txt'), "new\n")
+        batch.write(self.path('blocker'), "cannot replace a non-empty directory\n")
+        with self.assertRaises(OSError):
+            batch.commit()
+        self.assertEqual(self.read('keep.txt'), "original\n")
+        self.assertFalse(os.path.exists(self.path('created.txt')))
+        self.assertTrue(os.path.isdir(self.path('blocker')))
+
+    def test_rollback_on_exception_writes_nothing(self):
+        """Test an exception inside the block discards staged writes."""
+        with self.assertRaises(RuntimeError):
+            with WriteBatch(self.tmp.name) as batch:
+                batch.write(self.path('keep.txt'), "changed\n")
+                batch.delete(self.path('keep.txt'))
+                raise RuntimeError("abort")
+        self.assertEqual(self.read('keep.txt'), "original\n")
+
+    def test_lock_state_stays_out_of_the_work_tree(self):
+        """Test the write lock goes in the git directory of a repository, and outside the root of anything else."""
+        self.assertFalse(state_dir(self.tmp.name).startswith(self.tmp.name + os.sep))
+        os.makedirs(self.path('.git'))
+        with WriteBatch(self.tmp.name) as batch:
+            batch.write(self.path('keep.txt'), "changed\n")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['.git', 'keep.txt'])
+        self.assertTrue(os.path.exists(self.path('.git', 'codeassist', 'write.lock')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+
+def _read_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import: changing the umask to read it is not thread-safe.
+UMASK = _read_umask()
+
+
+def write_temp(path: str, content: str, fsync: bool = True) -> str:
+    """Write content to a new temp file beside path, with path's permissions, and return its name."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='') as file:
+            file.write(content)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o666 & ~UMASK)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def atomic_write_text(path: str, content: str, fsync: bool = True):
+    """Write content to path through a temp file in the same directory and rename it into place.
+
+    Readers see either the old or the new file, never a partial write. The
+    original file's permissions are kept.
+    """
+    tmp_path = write_temp(path, content, fsync)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,79 +1,133 @@
 import os
 import fnmatch
 import re
-from typing import List, ClassVar
-import subprocess
-import yaml  # Import the yaml module
+from typing import List
 import logging
-from unidiff import PatchSet
 
 from swarm import Agent
 from swarm.types import AgentFunction
 
+from tools.content_cache import content_cache
+from tools.content_search import search_files
+from tools.edit_blocks import EditError, apply_edit_blocks
+from tools.file_reader import MAX_READ_BYTES, file_is_binary, read_bytes, read_lines, summarize_large_file
+from tools.gitignore import GitIgnoreMatcher
+from tools.patch_engine import PatchError, apply_patch
+from tools.prompts import load_prompt
+from tools.shell_executor import DEFAULT_TIMEOUT_S, shell_executor
+from tools.shell_session import cd_command, sessions_supported
+from tools.workspace import PathEscapeError, Workspace
+from tools.write_batch import WriteBatch
+
 class CodeAssistant(Agent):
-    base_path: ClassVar[str] = ''
-    
-    def __init__(self):
+
+    def __init__(self, workspace: Workspace = None):
         super().__init__()
         self.name: str = "Coder"
         self.model: str = "gpt-4o"
         # Read instructions from the Markdown file
-        with open('tools/code_assistant.md', 'r') as file:
-            self.instructions = file.read()
+        self.instructions = load_prompt('code_assistant.md')
         self.functions: List[AgentFunction] = [self.list_files,
                                                self.read_file,
                                                self.write_file,
+                                               self.write_files,
+                                               self.edit_files,
                                                self.find_string_in_files, self.find_file,
                                                self.create_directory,
-                                               self.run_shell_command
+                                               self.run_shell_command,
+                                               self.start_background_command,
+                                               self.check_background_command,
+                                               self.stop_background_command,
+                                               self.apply_diff_to_file
                                                ]  
         self.tool_choice: str = None
         self.parallel_tool_calls: bool = True
+        self._workspace = workspace or Workspace()
+
+    @property
+    def workspace(self) -> Workspace:
+        return self._workspace
+
+    @property
+    def base_path(self) -> str:
+        """Root of the repository this agent works in."""
+        return self._workspace.root
+
+    def _resolve(self, path: str) -> str:
+        """Return the absolute path of a tool argument, raising PathEscapeError if it leads outside the workspace."""
+        try:
+            return self._workspace.resolve(path)
+        except PathEscapeError as e:
+            logging.error(str(e))
+            raise
+
+    def _workspace_index(self):
+        """Return the shared in-memory file index for the workspace."""
+        return self._workspace.index()
 
-    def _validate_file_path(self, file_name_with_path: str):
-        """Validate that the file path does not start with '../'."""
-        if file_name_with_path.startswith("../"):
-            logging.error(f"Invalid file path: {file_name_with_path}. Path cannot start with '../'.")
-            return False
-        return True
-
-    def _validate_directory_path(self, dir_path: str):
-        """Validate that the directory path does not start with '../'."""
-        if dir_path.startswith("../"):
-            logging.error(f"Invalid directory path: {dir_path}. Path cannot start with '../'.")
-            return False
-        return True
+    def _gitignore_matcher(self, dir_path: str, gitignore_path: str = None, include_ignored: bool = False):
+        """Return a matcher for the workspace .gitignore files plus an optional extra ignore file.
+
+        Returns None when ignored files should be included, which is also the case when
+        dir_path is itself ignored and was asked for explicitly.
+        """
+        if include_ignored:
+            return None
+        extra = [self._resolve(gitignore_path)] if gitignore_path else []
+        matcher = GitIgnoreMatcher(self.base_path, extra)
+        return None if matcher.is_ignored(dir_path, True) else matcher
     
-    def list_files(self, directory: str, gitignore_path: str = None):
-        """List files in a given directory relative to the base path, respecting the specified .gitignore file."""
-        dir_path = os.path.join(self.base_path, directory)
+    def _committed(self, paths):
+        """Drop cached content and refresh the workspace index for paths that were just written."""
+        for path in paths:
+            content_cache.invalidate(path)
+            self._workspace_index().notify_changed(path)
+
+    def list_files(self, directory: str, gitignore_path: str = None, include_ignored: bool = False):
+        """List files in a given directory relative to the base path, respecting the workspace .gitignore files and an optional extra ignore file. Set include_ignored to list ignored files too."""
+        try:
+            dir_path = self._resolve(directory)
+            matcher = self._gitignore_matcher(dir_path, gitignore_path, include_ignored)
+        except PathEscapeError as e:
+            return str(e)
         if not os.path.exists(dir_path):
             logging.warning(f"Directory {dir_path} does not exist.")
             return []
-        ignore_patterns = []
-        if gitignore_path and os.path.exists(gitignore_path):
-            with open(gitignore_path, 'r') as file:
-                ignore_patterns = [line.strip() for line in file if line.strip() and not line.startswith('#')]
         
         # List all files and filter out ignored ones
-        files = os.listdir(dir_path)
-        filtered_files = [f for f in files if not any(fnmatch.fnmatch(f, pattern) for pattern in ignore_patterns)]
+        files = self._workspace_index().listdir(dir_path)
+        if files is None:
+            files = os.listdir(dir_path)
+        filtered_files = [f for f in files if matcher is None or not matcher.is_ignored(os.path.join(dir_path, f))]
         
         logging.info(f"Files in {dir_path} (filtered): {filtered_files}")
         return filtered_files
     
-    def read_file(self, file_name_with_path: str):
-        """Read the content of a specified file, ensuring the path is valid and not starting with '../'."""
-        file_path = os.path.join(self.base_path, file_name_with_path)
+    def read_file(self, file_name_with_path: str, start_line: int = None, end_line: int = None, start_byte: int = None, end_byte: int = None):
+        """Read the content of a specified file inside the workspace. Optionally read only 1-based inclusive lines start_line..end_line or bytes start_byte..end_byte; a range returns at most 256 KB and then says where to continue. Files too large to return whole come back as a first page plus an outline."""
+        try:
+            file_path = self._resolve(file_name_with_path)
+        except PathEscapeError as e:
+            return str(e)
 
         logging.info(f"Content of {file_path} ")
 
-        if not self._validate_file_path(file_name_with_path):
-            return "Invalid file path. Path cannot start with '../'."
-        
         try:
-            with open(file_path, 'r') as file:
-                content = file.read()
+            if file_is_binary(file_path):
+                logging.info(f"{file_path} is a binary file, not reading it.")
+                return f"{file_path} is a binary file ({os.path.getsize(file_path)} bytes); content not shown."
+            if start_line is not None or end_line is not None:
+                content, line_count = read_lines(file_path, start_line or 1, end_line)
+                logging.info(f"Lines {start_line or 1}-{end_line or line_count} of {file_path} read successfully.")
+                return content
+            if start_byte is not None or end_byte is not None:
+                content = read_bytes(file_path, start_byte or 0, end_byte)
+                logging.info(f"Bytes {start_byte or 0}-{end_byte} of {file_path} read successfully.")
+                return content
+            if os.path.getsize(file_path) > MAX_READ_BYTES:
+                logging.info(f"{file_path} is larger than {MAX_READ_BYTES} bytes, returning first page and outline.")
+                return summarize_large_file(file_path)
+            content = content_cache.read_text(file_path)
             logging.info(f"Content of {file_path} read successfully.")
             return content
         except FileNotFoundError:
@@ -84,144 +138,253 @@ class CodeAssistant(Agent):
             return str(e)
     
     def write_file(self, file_name_with_path: str, content: str):
-        """Write specified content to a file, ensuring the path is valid and not starting with '../'."""
-        if not self._validate_file_path(file_name_with_path):
-            return "Invalid file path. Path cannot start with '../'."
-        
-        file_path = os.path.join(self.base_path, file_name_with_path)
+        """Write specified content to a file inside the workspace."""
+        return self.write_files({file_name_with_path: content})
+
+    def write_files(self, files: dict):
+        """Write several files in one transaction. files maps each file path to its full new content. Either every file is written or none is."""
         try:
-            with open(file_path, 'w') as file:
-                file.write(content)
-            logging.info(f"Content written to {file_path} successfully.")
+            paths = {self._resolve(file_name_with_path): content for file_name_with_path, content in files.items()}
+        except PathEscapeError as e:
+            return str(e)
+
+        batch = WriteBatch(self.base_path)
+        for file_path, content in paths.items():
+            batch.write(file_path, content)
+        try:
+            self._committed(batch.commit())
+            logging.info(f"Content written to {', '.join(files)} successfully.")
             return "Success!"
         except Exception as e:
-            logging.error(f"Error writing to {file_path}: {e}")
+            logging.error(f"Error writing to {', '.join(files)}: {e}")
             return str(e)
 
+    def edit_files(self, edit_blocks: str):
+        """Edit one or more existing files with SEARCH/REPLACE blocks instead of rewriting them. Each block is the file path on its own line, then '<<<<<<< SEARCH', the exact lines to replace (unique in the file), '=======', the new lines and '>>>>>>> REPLACE'. Either all blocks apply or no file is changed."""
+        def resolve(path):
+            try:
+                return self._resolve(path)
+            except PathEscapeError as e:
+                raise EditError(str(e))
+
+        try:
+            success, report, stats = apply_edit_blocks(edit_blocks, resolve, root=self.base_path)
+        except EditError as e:
+            logging.error(f"Error parsing edit blocks: {e}")
+            return str(e)
+        except Exception as e:
+            logging.error(f"Error applying edit blocks: {e}")
+            return str(e)
+
+        if not success:
+            logging.error("Edit blocks could not be applied: " + "; ".join(report))
+            return "Failed!\n" + "\n".join(report)
+        self._committed(stats)
+        for path, file_stats in stats.items():
+            logging.info(f"Edited {path}: {file_stats['edits']} edits, {file_stats['bytes_written']} bytes written, "
+                         f"~{file_stats['tokens_saved']} output tokens saved versus a full rewrite.")
+        return "Success!\n" + "\n".join(report)
+
     def append_to_file(self, file_name_with_path: str, content: str):
         """Append content to a file."""
-        file_path = os.path.join(self.base_path, file_name_with_path)
+        try:
+            file_path = self._resolve(file_name_with_path)
+        except PathEscapeError as e:
+            return str(e)
         try:
             with open(file_path, 'a') as file:
                 file.write(content)
+            content_cache.invalidate(file_path)
+            self._workspace_index().notify_changed(file_path)
             logging.info(f"Content appended to {file_path} successfully.")
             return "Success!"
         except Exception as e:
             logging.error(f"Error appending to {file_path}: {e}")
             return "Error"
 
-    def find_string_in_files(self, search_string: str, dir_path: str, file_pattern: str = '*'):
-        """Search for a string within the directory path, respecting the file pattern and limiting to 1000 results."""
-        dir_path = os.path.join(self.base_path, dir_path)
+    def find_string_in_files(self, search_string: str, dir_path: str, file_pattern: str = '*', use_regex: bool = False):
+        """Search for a string (or regex if use_regex is set) within the directory path, respecting the file pattern and limiting to 1000 results. Returns 'path:line: snippet' entries."""
+        try:
+            dir_path = self._resolve(dir_path)
+        except PathEscapeError as e:
+            return str(e)
         logging.info(f"Searching for '{search_string}' in files matching '{file_pattern}' under {dir_path}...")
 
-        # Construct the grep command with include pattern and limiting output
-        grep_command = f"grep -rl --include='{file_pattern}' '{search_string}' {dir_path}"
+        # Candidate files come from the workspace index; the pattern applies to the file name like grep --include.
+        # The index already skips ignored directories, so it is only used while ignore rules apply.
+        matcher = self._gitignore_matcher(dir_path)
+        index = self._workspace_index()
+        rel_files = index.files(dir_path) if matcher is not None and index.covers(dir_path) else None
+        if rel_files is not None:
+            # When an on-disk trigram index has been built, drop files that cannot contain the string
+            trigram_index = self._workspace.trigram_index()
+            if trigram_index is not None:
+                rel_files = trigram_index.narrow(search_string, rel_files, use_regex)
+            rel_dir = index.relative(dir_path) or os.curdir
+            candidates = [os.path.join(dir_path, os.path.relpath(rel, rel_dir)) for rel in rel_files
+                          if fnmatch.fnmatch(os.path.basename(rel), file_pattern)]
+            candidates = [path for path in candidates if not matcher.is_ignored(path, False)]
+        else:
+            walk = matcher.walk(dir_path) if matcher is not None else os.walk(dir_path)
+            candidates = [os.path.join(root, file) for root, _, files in walk
+                          for file in files if fnmatch.fnmatch(file, file_pattern)]
 
         try:
-            # Run the grep command
-            process = subprocess.run(grep_command, shell=True, check=True, capture_output=True, text=True)
-
-            # Process the output and limit to 1000 results
-            matched_files = process.stdout.splitlines()[:1000]
+            result = search_files(candidates, search_string, use_regex=use_regex, max_results=1000)
+        except re.error as e:
+            logging.error(f"Invalid search pattern '{search_string}': {e}")
+            return f"Invalid search pattern: {e}"
 
-            for match in matched_files:
-                logging.info(f"String found: {match}")
+        matches = [str(match) for match in result.matches]
+        for match in matches:
+            logging.info(f"String found: {match}")
 
-            logging.info(f"Search completed. Matches found: {len(matched_files)}")
-            return matched_files
-
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error running grep command: {e.stderr}")
-            return []
+        stats = result.stats
+        logging.info(f"Search completed. Matches found: {len(matches)} "
+                     f"({stats['files_scanned']} files, {stats['bytes_scanned']} bytes, "
+                     f"{stats['mb_per_s']} MB/s, truncated: {stats['truncated']})")
+        return matches
 
     def read_context_file_as_string(self):
-        """Read and parse the context.yml file, returning its content as a dictionary."""
-        content = self.read_file('context.yml')
-        logging.info("Reading context.yml content.")
-        return content
-
-    def find_file(self, file_pattern: str, dir_path: str = ".", use_regex: bool = False, gitignore_path: str = None):
-        """Find a file by name or regex pattern within the specified directory, respecting the specified .gitignore file."""
-        if not self._validate_directory_path(dir_path):
-            return "Invalid directory path. Path cannot start with '../'."
-        
-        dir_path = os.path.join(self.base_path, dir_path)
+        """Return the file contexts in context.yml format."""
+        logging.info("Reading context entries.")
+        return self._workspace.context_store().as_yaml()
+
+    def find_file(self, file_pattern: str, dir_path: str = ".", use_regex: bool = False, gitignore_path: str = None, include_ignored: bool = False):
+        """Find a file by name or regex pattern within the specified directory, respecting the workspace .gitignore files and an optional extra ignore file. Set include_ignored to search ignored files too."""
+        try:
+            dir_path = self._resolve(dir_path)
+            matcher = self._gitignore_matcher(dir_path, gitignore_path, include_ignored)
+        except PathEscapeError as e:
+            return str(e)
         logging.info(f"Searching for file pattern '{file_pattern}' under {dir_path}...")
         found_files = []
         
-        # Read and parse .gitignore
-        ignore_patterns = []
-        if gitignore_path and os.path.exists(gitignore_path):
-            with open(gitignore_path, 'r') as file:
-                ignore_patterns = [line.strip() for line in file if line.strip() and not line.startswith('#')]
-        
-        for root, _, files in os.walk(dir_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Skip ignored files
-                if any(fnmatch.fnmatch(file_path, pattern) for pattern in ignore_patterns):
-                    continue
-                # Match using regex or fnmatch
-                if use_regex:
-                    if re.search(file_pattern, file):
-                        found_files.append(file_path)
-                        logging.info(f"File found: {file_path}")
-                else:
-                    if fnmatch.fnmatch(file, file_pattern):
-                        found_files.append(file_path)
-                        logging.info(f"File found: {file_path}")
+        # Name lookups run against the in-memory index, which already skips ignored
+        # directories; otherwise walk the disk, pruning ignored directories.
+        index = self._workspace_index()
+        matches = index.find(file_pattern, dir_path, use_regex) if matcher is not None and index.covers(dir_path) else None
+        if matches is not None:
+            rel_dir = index.relative(dir_path)
+            candidates = [os.path.join(dir_path, os.path.relpath(rel, rel_dir or os.curdir)) for rel in matches]
+        else:
+            candidates = []
+            for root, _, files in (matcher.walk(dir_path) if matcher is not None else os.walk(dir_path)):
+                for file in files:
+                    if use_regex:
+                        if re.search(file_pattern, file):
+                            candidates.append(os.path.join(root, file))
+                    elif fnmatch.fnmatch(file, file_pattern):
+                        candidates.append(os.path.join(root, file))
+
+        for file_path in candidates:
+            # Skip ignored files
+            if matcher is not None and matcher.is_ignored(file_path, False):
+                continue
+            found_files.append(file_path)
+            logging.info(f"File found: {file_path}")
         
         logging.info(f"Search completed. Files found: {found_files}")
         return found_files
     
     def create_directory(self, dir_name: str):
         """Create a directory if it does not exist."""
-        dir_path = os.path.join(self.base_path, dir_name)
+        try:
+            dir_path = self._resolve(dir_name)
+        except PathEscapeError as e:
+            return str(e)
         try:
             os.makedirs(dir_path, exist_ok=True)
+            self._workspace_index().notify_changed(dir_path)
             logging.info(f"Directory {dir_path} created successfully.")
             return "Success!"
         except Exception as e:
             logging.error(f"Error creating directory {dir_path}: {e}")
             return str(e)
     
-    def run_shell_command(self, command: str, directory: str):
-        """Run a shell command in a specified directory and return its output."""
-        directory = os.path.join(self.base_path, directory)
-        try:
-            result = subprocess.run(command, shell=True, cwd=directory, check=True, capture_output=True, text=True)
-            logging.info(f"Command '{command}' executed successfully in {directory}.")
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error running command '{command}' in {directory}: {e.stderr}")
-            return str(e.stderr)
-    
+    def run_shell_command(self, command: str, directory: str = None, timeout: int = DEFAULT_TIMEOUT_S):
+        """Run a shell command and return its combined output. Commands share one persistent shell, so cd, exported variables and activated virtualenvs carry over to later calls; if directory is given the shell changes to it first. The command is killed after timeout seconds (the shell is then restarted); long outputs keep only their beginning and end. Use start_background_command for servers, watchers or 'logs -f'."""
+        change_directory = bool(directory)
+        try:
+            directory = self._resolve(directory)
+        except PathEscapeError as e:
+            return str(e)
+        try:
+            if sessions_supported():
+                session = self._workspace.shell()
+                if change_directory:
+                    result = session.run(cd_command(directory), echo=False)
+                    if result.exit_code:
+                        logging.error(f"Could not change to {directory}: {result}")
+                        return str(result)
+                result = session.run(command, timeout=timeout)
+                logging.debug(f"Shell session stats: {session.stats()}")
+            else:
+                result = shell_executor.run(command, directory, timeout=timeout)
+            # The command may have changed files the workspace index cannot see yet; re-scan before the next tool.
+            self._workspace.git().invalidate()
+            self._workspace_index().poll()
+        except Exception as e:
+            logging.error(f"Error running command '{command}' in {directory}: {e}")
+            return str(e)
+        if result.timed_out:
+            logging.error(f"Command '{command}' in {directory} timed out after {timeout}s.")
+        elif result.exit_code:
+            logging.error(f"Command '{command}' in {directory} failed with exit code {result.exit_code}.")
+        else:
+            logging.info(f"Command '{command}' executed successfully in {directory} in {result.elapsed_s:.1f}s.")
+        return str(result)
+
+    def start_background_command(self, command: str, directory: str):
+        """Start a long-running shell command (server, watcher, log tail) in the background and return its job id."""
+        try:
+            directory = self._resolve(directory)
+            job = shell_executor.start(command, directory)
+        except Exception as e:
+            logging.error(f"Error starting command '{command}' in {directory}: {e}")
+            return str(e)
+        self._workspace.add_job(job.job_id)
+        logging.info(f"Started background job {job.job_id}: '{command}' in {directory}.")
+        return f"Started job {job.job_id}. Use check_background_command to see its output."
+
+    def check_background_command(self, job_id: int):
+        """Return the status and output so far of a background job."""
+        job = shell_executor.get(job_id) if self._workspace.owns_job(job_id) else None
+        if job is None:
+            return f"No background job {job_id}."
+        return job.status()
+
+    def stop_background_command(self, job_id: int):
+        """Kill a background job and return its final output."""
+        job = shell_executor.stop(job_id) if self._workspace.owns_job(job_id) else None
+        if job is None:
+            return f"No background job {job_id}."
+        logging.info(f"Stopped background job {job_id}.")
+        return job.status()
+
     def apply_diff_to_file(self, file_path: str, diff: str):
-        """Apply unified diff to a file using unidiff."""
-        try:
-            # Read the original file content
-            with open(file_path, 'r') as file:
-                original_content = file.readlines()
-            
-            # Create a patch set
-            patch = PatchSet(diff)
-            
-            # Apply the patch
-            for p in patch:
-                for h in p:
-                    for line in h:
-                        if line.is_added:
-                            original_content.insert(line.target_line_no - 1, line.value)
-                        elif line.is_removed:
-                            del original_content[line.source_line_no - 1]
-            
-            # Write the modified content back to the file
-            with open(file_path, 'w') as file:
-                file.writelines(original_content)
-            
-            logging.info(f"Multiple diffs applied to {file_path} successfully.")
-            return "Success!"
+        """Apply a unified diff. Context lines are verified and hunks that moved are found nearby. If file_path is empty, or the diff touches several files, the paths in the diff headers are used. Nothing is written unless every hunk applies."""
+        try:
+            if file_path:
+                self._resolve(file_path)
+
+            def resolve(path):
+                try:
+                    return self._resolve(path)
+                except PathEscapeError as e:
+                    raise PatchError(f"Invalid file path in diff: {e}")
+
+            success, report, changed_paths = apply_patch(diff, resolve, default_path=file_path or None,
+                                                         root=self.base_path)
+            for line in report:
+                logging.info(f"Diff: {line}")
+            if not success:
+                logging.error(f"Diff could not be applied to {file_path or 'files in diff'}.")
+                return "Failed!\n" + "\n".join(report)
+
+            self._committed(changed_paths)
+            logging.info(f"Multiple diffs applied to {file_path or 'files in diff'} successfully.")
+            return "Success!\n" + "\n".join(report)
         except Exception as e:
             logging.error(f"Error applying diffs to {file_path}: {e}")
-            return str(e)
\ No newline at end of file
+            return str(e)
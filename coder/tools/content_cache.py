@@ -0,0 +1,92 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+# Byte budget for cached file contents, shared by every agent in the process.
+DEFAULT_MAX_BYTES = int(os.environ.get('CODEASSIST_CACHE_BYTES', 64 * 1024 * 1024))
+
+
+class ContentCache:
+    """Process-wide LRU cache of decoded file contents.
+
+    Entries are keyed on (path, size, mtime_ns), so a file changed outside the
+    agents is re-read on the next lookup. Writers should still call
+    invalidate() so the old version stops taking up budget straight away.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+                       'bytes_served': 0, 'bytes_read': 0}
+
+    def configure(self, max_bytes: int):
+        """Change the byte budget, evicting entries if it shrank."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def read_text(self, path: str) -> str:
+        """Return the text content of path, from the cache when the file is unchanged."""
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                self._stats['bytes_served'] += stat.st_size
+                return entry[1]
+
+        with open(key, 'r') as file:
+            content = file.read()
+
+        with self._lock:
+            self._stats['misses'] += 1
+            self._stats['bytes_read'] += stat.st_size
+            self._remove(key)
+            if stat.st_size <= self.max_bytes:
+                self._entries[key] = (version, content)
+                self._bytes += stat.st_size
+                self._evict()
+        return content
+
+    def invalidate(self, path: str):
+        """Drop any cached content for path."""
+        with self._lock:
+            if self._remove(os.path.abspath(path)):
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[0][0]
+        return True
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, ((size, _), _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._stats['evictions'] += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current memory use."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+
+content_cache = ContentCache()
+
+
+def log_cache_stats():
+    logging.debug(f"Content cache stats: {content_cache.stats()}")
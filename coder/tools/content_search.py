@@ -0,0 +1,162 @@
+import os
+import re
+import mmap
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, List, Optional
+
+# Files with a NUL byte in their first block are treated as binary and skipped.
+BINARY_SNIFF_BYTES = 8192
+MAX_SNIPPET_CHARS = 200
+
+
+def is_binary(data: bytes) -> bool:
+    """Cheap binary check on the leading bytes of a file."""
+    return b'\0' in data[:BINARY_SNIFF_BYTES]
+
+
+class SearchMatch:
+    def __init__(self, path: str, line: int, snippet: str):
+        self.path = path
+        self.line = line
+        self.snippet = snippet
+
+    def __str__(self):
+        return f"{self.path}:{self.line}: {self.snippet}"
+
+    def __repr__(self):
+        return f"SearchMatch({self.path!r}, {self.line}, {self.snippet!r})"
+
+
+class SearchResult:
+    def __init__(self, matches: List[SearchMatch], stats: dict):
+        self.matches = matches
+        self.stats = stats
+
+
+class ContentSearcher:
+    """Searches file contents in-process with a thread pool over memory-mapped files.
+
+    Supports literal and regex patterns, skips binary files and stops handing
+    out work as soon as max_results matches have been collected.
+    """
+
+    def __init__(self, pattern: str, use_regex: bool = False, ignore_case: bool = False,
+                 max_results: int = 1000, context_lines: int = 0, workers: Optional[int] = None):
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        if use_regex:
+            self._regex = re.compile(pattern.encode('utf-8'), flags)
+            self._needle = None
+        elif ignore_case:
+            self._regex = re.compile(re.escape(pattern.encode('utf-8')), flags)
+            self._needle = None
+        else:
+            self._regex = None
+            self._needle = pattern.encode('utf-8')
+        self.max_results = max_results
+        self.context_lines = context_lines
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._found = 0
+        self._stats = {'files_scanned': 0, 'binary_skipped': 0, 'bytes_scanned': 0}
+
+    def _offsets(self, data):
+        """Yield the start offset of each match."""
+        if self._needle is not None:
+            if not self._needle:
+                return
+            pos = data.find(self._needle)
+            while pos != -1:
+                yield pos
+                pos = data.find(self._needle, pos + 1)
+        else:
+            for match in self._regex.finditer(data):
+                yield match.start()
+
+    def _snippet(self, data, start: int, end: int) -> str:
+        """Decode the lines around a match, widening by context_lines on each side."""
+        for _ in range(self.context_lines):
+            if start > 0:
+                start = data.rfind(b'\n', 0, start - 1) + 1
+            if end < len(data):
+                next_end = data.find(b'\n', end + 1)
+                end = len(data) if next_end == -1 else next_end
+        lines = data[start:end].decode('utf-8', errors='replace').splitlines()
+        return '\n'.join(line[:MAX_SNIPPET_CHARS] for line in lines)
+
+    def search_file(self, path: str) -> List[SearchMatch]:
+        """Search a single file; at most one match is reported per line."""
+        matches = []
+        if self._stop.is_set():
+            return matches
+        try:
+            with open(path, 'rb') as file:
+                size = os.fstat(file.fileno()).st_size
+                if size == 0:
+                    return matches
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if is_binary(data[:BINARY_SNIFF_BYTES]):
+                        with self._lock:
+                            self._stats['binary_skipped'] += 1
+                        return matches
+                    line_no, counted_to, last_line_end = 1, 0, -1
+                    for offset in self._offsets(data):
+                        if offset <= last_line_end:
+                            continue
+                        if self._stop.is_set():
+                            break
+                        line_no += data[counted_to:offset].count(b'\n')
+                        counted_to = offset
+                        line_start = data.rfind(b'\n', 0, offset) + 1
+                        line_end = data.find(b'\n', offset)
+                        last_line_end = size if line_end == -1 else line_end
+                        with self._lock:
+                            if self._found >= self.max_results:
+                                self._stop.set()
+                                break
+                            self._found += 1
+                        matches.append(SearchMatch(path, line_no, self._snippet(data, line_start, last_line_end)))
+            with self._lock:
+                self._stats['files_scanned'] += 1
+                self._stats['bytes_scanned'] += size
+        except (OSError, ValueError) as e:
+            logging.debug(f"Skipping {path}: {e}")
+        return matches
+
+    def run(self, paths: Iterable[str]) -> SearchResult:
+        """Search the given files and return matches in input order along with throughput stats."""
+        start = time.perf_counter()
+        results = {}
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Keep a bounded number of files in flight so an early stop wastes little work.
+            for position, path in enumerate(paths):
+                if self._stop.is_set():
+                    break
+                pending[executor.submit(self.search_file, path)] = position
+                if len(pending) >= self.workers * 4:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[pending.pop(future)] = future.result()
+            for future, position in pending.items():
+                results[position] = future.result()
+
+        matches = [match for position in sorted(results) for match in results[position]]
+        elapsed = time.perf_counter() - start
+        stats = dict(self._stats,
+                     matches=len(matches),
+                     truncated=self._stop.is_set(),
+                     elapsed_s=round(elapsed, 4),
+                     mb_per_s=round(self._stats['bytes_scanned'] / (1024 * 1024) / elapsed, 2) if elapsed else 0.0)
+        return SearchResult(matches[:self.max_results], stats)
+
+
+def search_files(paths: Iterable[str], pattern: str, use_regex: bool = False, ignore_case: bool = False,
+                 max_results: int = 1000, context_lines: int = 0, workers: Optional[int] = None) -> SearchResult:
+    """Search file contents for a literal string or regex. See ContentSearcher."""
+    searcher = ContentSearcher(pattern, use_regex=use_regex, ignore_case=ignore_case,
+                               max_results=max_results, context_lines=context_lines, workers=workers)
+    return searcher.run(paths)
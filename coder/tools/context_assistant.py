@@ -1,43 +1,61 @@
-import os
-import yaml  # Import the yaml module
 import logging
 
 from tools.code_assistant import CodeAssistant
+from tools.context_refresh import ContextRefresher
+from tools.prompts import load_prompt
+from tools.workspace import Workspace
 
 class ContextAssistant(CodeAssistant):
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, workspace: Workspace = None):
+        super().__init__(workspace)
         self.name: str = "Context Assistant"
         self.model: str = "gpt-4o"
         # Read instructions from the Markdown file
-        with open('tools/context_assistant.md', 'r') as file:
-            self.instructions = file.read()
+        self.instructions = load_prompt('context_assistant.md')
         self.functions = [self.read_context_file,
-                          self.update_context_file, self.read_file, self.write_file, self.list_files]
+                          self.update_context_file, self.update_context_files, self.export_context_file,
+                          self.refresh_context,
+                          self.read_file, self.write_file, self.list_files]
 
     def read_context_file(self):
-        """Read and parse the context.yml file, returning its content as a dictionary."""
-        content = self.read_file('context.yml')
-        logging.info("Reading context.yml content.")
-        if content:
-            return yaml.safe_load(content) or {}
-        return {}
+        """Read the file contexts, returning them as a dictionary of file path to description."""
+        logging.info("Reading context entries.")
+        return self.workspace.context_store().all()
 
     def update_context_file(self, file_path: str, context_content: str):
-        """Add or update file context in the context.yml file."""
-        context_file_path = os.path.join(self.base_path, 'context.yml')
-        
-        # Load existing contexts using the read_context_file method
-        context_data = self.read_context_file()
-        
-        # Update context
-        context_data[file_path] = context_content
-        
-        # Write updated context back to the file using the write_file method
-        success = self.write_file('context.yml', yaml.safe_dump(context_data, default_flow_style=False))
-        
-        if success:
-            logging.info(f"Context for {file_path} updated in {context_file_path}")
-        else:
-            logging.error(f"Failed to update context for {file_path} in {context_file_path}")
\ No newline at end of file
+        """Add or update the context of one file."""
+        return self.update_context_files({file_path: context_content})
+
+    def update_context_files(self, contexts: dict):
+        """Add or update the context of several files at once. contexts maps each file path to its description."""
+        try:
+            self.workspace.context_store().update(contexts)
+        except Exception as e:
+            logging.error(f"Failed to update context for {', '.join(contexts)}: {e}")
+            return str(e)
+        logging.info(f"Context for {', '.join(contexts)} updated.")
+        return "Success!"
+
+    def export_context_file(self):
+        """Write all context entries to context.yml. Call this before asking for context.yml to be staged."""
+        try:
+            path = self.workspace.context_store().export()
+        except Exception as e:
+            logging.error(f"Failed to export context.yml: {e}")
+            return str(e)
+        self._committed([path])
+        return "Success!"
+
+    def refresh_context(self, file_paths: str = ""):
+        """Re-describe files that changed since their context was written and drop entries of deleted files. file_paths is a space-separated list; empty means the files that already have an entry, so name new files to describe them. At most 50 files are described per call; call again for the rest."""
+        from openai import OpenAI
+
+        try:
+            refresher = ContextRefresher(self.base_path, OpenAI())
+            stats = refresher.refresh(file_paths.split() or None)
+        except Exception as e:
+            logging.error(f"Failed to refresh context: {e}")
+            return str(e)
+        return (f"Success! {stats['summarized']} files described, {stats['unchanged']} unchanged, "
+                f"{stats['deleted']} entries removed, {stats['failed']} failed, {stats['remaining']} left for the next call.")
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.content_search import is_binary, BINARY_SNIFF_BYTES
+from tools.context_store import CONTEXT_FILE, file_hash, get_context_store
+from tools.git_backend import get_git_backend
+from tools.workspace_index import SKIP_DIRS, get_workspace_index
+
+DEFAULT_WORKERS = 4
+DEFAULT_MODEL = 'gpt-4o-mini'
+# Only this much of a file is sent to the model.
+MAX_SUMMARY_BYTES = 48 * 1024
+# Summaries are written to the store in batches of this size as they complete.
+FLUSH_EVERY = 20
+# At most this many files are summarized per refresh; the rest are left for the next one.
+MAX_REFRESH_FILES = 50
+
+SYSTEM_PROMPT = ("You write entries for a codebase context file. In two or three sentences, describe what the given "
+                 "file does and how it fits into the project, for a developer new to the codebase. Describe the file "
+                 "in general, not specific recent changes. Reply with the description only.")
+
+
+class ContextRefresher:
+    """Brings the context store in line with the workspace.
+
+    Each entry remembers the hash of the file it was written from. A refresh
+    hashes the files that have an entry (or the files it is given), asks the
+    model to summarize only the ones that are new or whose hash changed
+    (several at a time, at most max_files per call), and drops the entries
+    of files that no longer exist inside the workspace.
+    """
+
+    def __init__(self, root: str, client, model: str = DEFAULT_MODEL, workers: int = DEFAULT_WORKERS):
+        self.root = os.path.abspath(root)
+        self.client = client
+        self.model = model
+        self.workers = workers
+        self.store = get_context_store(self.root)
+
+    def candidates(self) -> List[str]:
+        """Files worth describing: tracked by git (or, outside a repository, indexed) text files."""
+        result = get_git_backend(self.root).run('ls-files', '-z')
+        if result.ok:
+            paths = [path for path in result.stdout.split('\0') if path]
+        else:
+            paths = [path.replace(os.sep, '/') for path in get_workspace_index(self.root).files() or []]
+        return [path for path in paths
+                if path != CONTEXT_FILE and not any(part in SKIP_DIRS for part in path.split('/'))]
+
+    def _resolve(self, path: str) -> Optional[str]:
+        """Absolute path of an entry's file, or None if it is outside the workspace or gone."""
+        full = os.path.normpath(os.path.join(self.root, path))
+        if os.path.relpath(full, self.root).startswith(os.pardir) or not os.path.isfile(full):
+            return None
+        return full
+
+    def plan(self, paths: Optional[Iterable[str]] = None) -> Tuple[Dict[str, str], List[str], int]:
+        """Work out (files to summarize with their hashes, entries to drop, number unchanged).
+
+        paths defaults to the files that already have an entry; files without one are only considered when named.
+        """
+        known = self.store.hashes()
+        paths = list(paths) if paths is not None else sorted(known)
+        changed, deleted, unchanged = {}, [], 0
+        for path in paths:
+            full = self._resolve(path)
+            if full is None:
+                if path in known:
+                    deleted.append(path)
+                continue
+            with open(full, 'rb') as file:
+                if is_binary(file.read(BINARY_SNIFF_BYTES)):
+                    continue
+            digest = file_hash(full)
+            if known.get(path) == digest:
+                unchanged += 1
+            else:
+                changed[path] = digest
+        return changed, deleted, unchanged
+
+    def summarize(self, path: str) -> str:
+        with open(self._resolve(path), 'rb') as file:
+            content = file.read(MAX_SUMMARY_BYTES).decode('utf-8', errors='replace')
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{'role': 'system', 'content': SYSTEM_PROMPT},
+                      {'role': 'user', 'content': f"File: {path}\n\n{content}"}])
+        return response.choices[0].message.content.strip()
+
+    def refresh(self, paths: Optional[Iterable[str]] = None, dry_run: bool = False,
+                max_files: Optional[int] = MAX_REFRESH_FILES) -> dict:
+        started = time.perf_counter()
+        changed, deleted, unchanged = self.plan(paths)
+        remaining = sorted(changed)[max_files:] if max_files else []
+        for path in remaining:
+            del changed[path]
+        stats = {'unchanged': unchanged, 'summarized': 0, 'failed': 0, 'deleted': len(deleted),
+                 'remaining': len(remaining)}
+        if dry_run:
+            stats.update(summarized=len(changed), changed_paths=sorted(changed), deleted_paths=deleted)
+            return stats
+        if deleted:
+            self.store.delete(deleted)
+
+        pending: Dict[str, str] = {}
+
+        def flush():
+            self.store.update(pending, hashes={path: changed[path] for path in pending})
+            pending.clear()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.summarize, path): path for path in changed}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    pending[path] = future.result()
+                    stats['summarized'] += 1
+                except Exception as e:
+                    stats['failed'] += 1
+                    logging.error(f"Could not summarize {path}: {e}")
+                if len(pending) >= FLUSH_EVERY:
+                    flush()
+        flush()
+        stats['elapsed_s'] = round(time.perf_counter() - started, 2)
+        logging.info(f"Context refresh for {self.root}: {stats}")
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-summarize changed files into context.yml.")
+    parser.add_argument('base_path')
+    parser.add_argument('paths', nargs='*',
+                        help="Files to consider (relative to base_path); by default, those that already have an entry.")
+    parser.add_argument('--all', action='store_true', help="Also describe tracked files that have no entry yet.")
+    parser.add_argument('--max-files', type=int, default=MAX_REFRESH_FILES,
+                        help="Summarize at most this many files (0 for no limit).")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--stub', action='store_true', help="Use the offline stub model instead of OpenAI.")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would change.")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        client = None
+    elif args.stub:
+        from model_stub import StubOpenAIClient
+        client = StubOpenAIClient()
+    else:
+        from openai import OpenAI
+        client = OpenAI()
+    refresher = ContextRefresher(args.base_path, client, model=args.model, workers=args.workers)
+    paths = args.paths or None
+    if args.all:
+        paths = sorted(set(paths or []) | set(refresher.candidates()) | set(refresher.store.hashes()))
+    stats = refresher.refresh(paths, dry_run=args.dry_run, max_files=args.max_files)
+    if not args.dry_run:
+        refresher.store.export()
+    print(stats)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()
@@ -0,0 +1,247 @@
+import os
+import time
+import hashlib
+import atexit
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+import yaml
+
+from tools.atomic_io import atomic_write_text
+from tools.state_dir import state_dir
+from tools.write_batch import workspace_lock
+
+STORE_FILE = 'context.db'
+CONTEXT_FILE = 'context.yml'
+# context.yml is rewritten after this many changes even if nobody asks for it.
+EXPORT_EVERY_CHANGES = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    content TEXT,           -- NULL marks a deletion not yet exported
+    updated_at REAL NOT NULL,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT       -- hash of the file the summary was made from, if known
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContextStore:
+    """File summaries for a workspace, kept in SQLite instead of being rewritten as YAML on every change.
+
+    Upserts touch one row. Concurrent writers (threads, agents, processes)
+    are serialized by SQLite. Rows changed since the last export are marked
+    dirty. export() writes them out as context.yml, the format the rest of
+    the tooling and git history expect, and checkpoints the database. If
+    context.yml is changed outside the store (a pull, a hand edit), its
+    entries are imported on the next access; entries with unexported local
+    changes win. Imported summaries are taken to describe the files as they
+    are now, so their current hashes are recorded with them.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.db_path = os.path.join(state_dir(self.root), STORE_FILE)
+        self.yaml_path = os.path.join(self.root, CONTEXT_FILE)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(entries)')}
+        if 'content_hash' not in columns:
+            self._db.execute('ALTER TABLE entries ADD COLUMN content_hash TEXT')
+
+    # Sync with context.yml
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self._db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def _yaml_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.yaml_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _current_hash(self, path: str) -> Optional[str]:
+        """Hash of the file an entry describes, or None if it is outside the workspace or gone."""
+        full = os.path.normpath(os.path.join(self.root, path))
+        if os.path.relpath(full, self.root).startswith(os.pardir) or not os.path.isfile(full):
+            return None
+        try:
+            return file_hash(full)
+        except OSError:
+            return None
+
+    def sync(self):
+        """Import context.yml if it changed since the store last read or wrote it."""
+        mtime = self._yaml_mtime()
+        with self._lock:
+            if mtime is None or str(mtime) == self._meta('yaml_mtime_ns'):
+                return
+            try:
+                with open(self.yaml_path) as file:
+                    data = yaml.safe_load(file) or {}
+            except (OSError, yaml.YAMLError) as e:
+                logging.error(f"Could not import {self.yaml_path}: {e}")
+                return
+            now = time.time()
+            rows = [(str(path), str(content), now, self._current_hash(str(path))) for path, content in data.items()]
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                clean = [row[0] for row in self._db.execute('SELECT path FROM entries WHERE dirty = 0')]
+                self._db.executemany('DELETE FROM entries WHERE path = ?',
+                                     [(path,) for path in clean if path not in data])
+                # A summary that is unchanged keeps the hash it was written from, so an edit since then still
+                # counts as a change; a new or rewritten one is taken to describe the file as it is now.
+                self._db.executemany(
+                    'INSERT INTO entries (path, content, updated_at, content_hash) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(path) DO UPDATE SET content = excluded.content, updated_at = excluded.updated_at, '
+                    'content_hash = CASE WHEN entries.content IS excluded.content AND entries.content_hash IS NOT NULL '
+                    'THEN entries.content_hash ELSE excluded.content_hash END '
+                    'WHERE entries.dirty = 0',
+                    rows)
+                self._set_meta('yaml_mtime_ns', mtime)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        logging.info(f"Imported {len(data)} context entries from {self.yaml_path}")
+
+    def export(self) -> str:
+        """Write every entry to context.yml, clear the dirty marks and compact the database. Returns the path."""
+        self.sync()
+        with self._lock, workspace_lock(self.root):
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                data = self._entries()
+                atomic_write_text(self.yaml_path, yaml.safe_dump(data, default_flow_style=False))
+                self._db.execute('DELETE FROM entries WHERE content IS NULL')
+                self._db.execute('UPDATE entries SET dirty = 0 WHERE dirty = 1')
+                self._set_meta('yaml_mtime_ns', self._yaml_mtime())
+                self._set_meta('changes_since_export', 0)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        logging.info(f"Exported {len(data)} context entries to {self.yaml_path}")
+        return self.yaml_path
+
+    # Reads
+
+    def _entries(self) -> Dict[str, str]:
+        rows = self._db.execute('SELECT path, content FROM entries WHERE content IS NOT NULL ORDER BY path')
+        return dict(rows.fetchall())
+
+    def all(self) -> Dict[str, str]:
+        self.sync()
+        with self._lock:
+            return self._entries()
+
+    def get(self, path: str) -> Optional[str]:
+        self.sync()
+        with self._lock:
+            row = self._db.execute('SELECT content FROM entries WHERE path = ?', (path,)).fetchone()
+        return row[0] if row else None
+
+    def as_yaml(self) -> str:
+        """All entries in context.yml format."""
+        return yaml.safe_dump(self.all(), default_flow_style=False)
+
+    def pending_changes(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM entries WHERE dirty = 1').fetchone()[0]
+
+    # Writes
+
+    def hashes(self) -> Dict[str, Optional[str]]:
+        """Content hash recorded for each entry (None where unknown)."""
+        self.sync()
+        with self._lock:
+            rows = self._db.execute('SELECT path, content_hash FROM entries WHERE content IS NOT NULL')
+            return dict(rows.fetchall())
+
+    def update(self, entries: Dict[str, Optional[str]], hashes: Optional[Dict[str, str]] = None):
+        """Upsert several entries in one transaction; a None content deletes the entry.
+
+        hashes optionally records the hash of the file each summary was made from.
+        """
+        if not entries:
+            return
+        self.sync()
+        hashes = hashes or {}
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.executemany(
+                    'INSERT INTO entries (path, content, updated_at, dirty, content_hash) VALUES (?, ?, ?, 1, ?) '
+                    'ON CONFLICT(path) DO UPDATE SET content = excluded.content, '
+                    'updated_at = excluded.updated_at, dirty = 1, content_hash = excluded.content_hash',
+                    [(path, content, now, hashes.get(path)) for path, content in entries.items()])
+                changes = int(self._meta('changes_since_export') or 0) + len(entries)
+                self._set_meta('changes_since_export', changes)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        if changes >= EXPORT_EVERY_CHANGES:
+            self.export()
+
+    def upsert(self, path: str, content: str):
+        self.update({path: content})
+
+    def delete(self, paths: Iterable[str]):
+        self.update({path: None for path in paths})
+
+    def close(self):
+        with _stores_lock:
+            if _stores.get(self.root) is self:
+                del _stores[self.root]
+        with self._lock:
+            self._db.close()
+
+
+_stores: Dict[str, ContextStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_context_store(base_path: str) -> ContextStore:
+    """Return the shared context store for base_path, creating it on first use."""
+    root = os.path.abspath(base_path or os.curdir)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = ContextStore(root)
+        return store
+
+
+@atexit.register
+def export_pending():
+    """Write out changes that were never exported, so context.yml is current when the process ends."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        try:
+            if store.pending_changes():
+                store.export()
+        except Exception as e:
+            logging.error(f"Could not export context store for {store.root}: {e}")
@@ -0,0 +1,173 @@
+import os
+import re
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tools.write_batch import WriteBatch, workspace_lock
+from tools.token_count import count_tokens
+
+SEARCH_MARKER = re.compile(r'^<{5,9} SEARCH\s*$')
+DIVIDER_MARKER = re.compile(r'^={5,9}\s*$')
+REPLACE_MARKER = re.compile(r'^>{5,9} REPLACE\s*$')
+
+
+class EditError(Exception):
+    pass
+
+
+class EditBlock:
+    def __init__(self, path: str, search: str, replace: str):
+        self.path = path
+        self.search = search
+        self.replace = replace
+        self.source = ''
+
+
+def parse_edit_blocks(text: str) -> List[EditBlock]:
+    """Parse SEARCH/REPLACE blocks, each preceded by a line holding the file path:
+
+        path/to/file.py
+        <<<<<<< SEARCH
+        old lines
+        =======
+        new lines
+        >>>>>>> REPLACE
+
+    A block without a path line reuses the previous block's path.
+    """
+    lines = text.splitlines(keepends=True)
+    blocks: List[EditBlock] = []
+    path: Optional[str] = None
+    i = 0
+    while i < len(lines):
+        if not SEARCH_MARKER.match(lines[i]):
+            candidate = lines[i].strip()
+            if candidate and not candidate.startswith('```'):
+                path = candidate.strip('`')
+            i += 1
+            continue
+        if path is None:
+            raise EditError(f"Edit block at line {i + 1} has no file path before it.")
+        start = i
+        search, replace, section = [], [], None
+        i += 1
+        while i < len(lines):
+            if section is None and DIVIDER_MARKER.match(lines[i]):
+                section = replace
+            elif section is not None and REPLACE_MARKER.match(lines[i]):
+                break
+            else:
+                (search if section is None else replace).append(lines[i])
+            i += 1
+        else:
+            raise EditError(f"Edit block for {path} starting at line {start + 1} is not closed with '>>>>>>> REPLACE'.")
+        block = EditBlock(path, ''.join(search), ''.join(replace))
+        block.source = ''.join(lines[start:i + 1])
+        blocks.append(block)
+        i += 1
+    if not blocks:
+        raise EditError("No '<<<<<<< SEARCH' blocks found.")
+    return blocks
+
+
+def _find_unique(content: str, search: str) -> Tuple[Optional[int], int, str]:
+    """Locate search in content. Returns (start, end, error).
+
+    Exact matches are tried first; if there is none, lines are compared with
+    trailing whitespace ignored. The match must be unique either way.
+    """
+    count = content.count(search)
+    if count == 1:
+        start = content.index(search)
+        return start, start + len(search), ''
+    if count > 1:
+        return None, 0, f"SEARCH text occurs {count} times; add surrounding lines to make it unique."
+
+    wanted = [line.rstrip() for line in search.splitlines()]
+    lines = content.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    found = [i for i in range(len(lines) - len(wanted) + 1)
+             if all(lines[i + j].rstrip() == wanted[j] for j in range(len(wanted)))]
+    if len(found) == 1:
+        return offsets[found[0]], offsets[found[0] + len(wanted)], ''
+    if len(found) > 1:
+        return None, 0, f"SEARCH text occurs {len(found)} times; add surrounding lines to make it unique."
+    return None, 0, "SEARCH text not found; re-read the file and copy the lines exactly."
+
+
+def _apply_blocks(blocks: List[EditBlock], resolve: Callable[[str], str]):
+    """Apply blocks to the current file contents in memory; returns (ok, contents, block sources, report)."""
+    contents: Dict[str, str] = {}
+    block_sources: Dict[str, List[str]] = {}
+    report: List[str] = []
+    ok = True
+    for number, block in enumerate(blocks, start=1):
+        path = resolve(block.path)
+        if path not in contents:
+            if os.path.exists(path):
+                with open(path, 'r', newline='') as file:
+                    contents[path] = file.read()
+            elif not block.search.strip():
+                contents[path] = ''
+            else:
+                ok = False
+                report.append(f"{block.path}: block {number} FAILED: file does not exist.")
+                continue
+        content = contents[path]
+        if not block.search.strip():
+            if content:
+                ok = False
+                report.append(f"{block.path}: block {number} FAILED: empty SEARCH is only allowed for new files.")
+                continue
+            contents[path] = block.replace
+        else:
+            start, end, error = _find_unique(content, block.search)
+            if start is None:
+                ok = False
+                report.append(f"{block.path}: block {number} FAILED: {error}")
+                continue
+            replace = block.replace
+            if content[start:end].endswith('\n') and replace and not replace.endswith('\n'):
+                replace += '\n'
+            contents[path] = content[:start] + replace + content[end:]
+        block_sources.setdefault(path, []).append(block.source)
+        report.append(f"{block.path}: block {number} applied")
+    return ok, contents, block_sources, report
+
+
+def apply_edit_blocks(text: str, resolve: Callable[[str], str],
+                      root: Optional[str] = None) -> Tuple[bool, List[str], Dict[str, dict]]:
+    """Apply every edit block in text, or none of them.
+
+    Blocks for the same file apply in order to the evolving content. An empty
+    SEARCH creates a file that does not exist yet. Each file is written once
+    and all of them are committed as one WriteBatch; the workspace lock on
+    root is held from the first read to the commit. Returns (success, report
+    lines, per-file stats with bytes written and an estimate of the output
+    tokens saved compared with rewriting the whole file).
+    """
+    blocks = parse_edit_blocks(text)
+    # Files are read under the workspace lock and it is held until the batch has committed,
+    # so an edit running concurrently on the same file cannot be silently overwritten.
+    with workspace_lock(root):
+        ok, contents, block_sources, report = _apply_blocks(blocks, resolve)
+        if not ok:
+            report.append("No files were changed.")
+            return False, report, {}
+
+        batch = WriteBatch(root)
+        for path, content in contents.items():
+            batch.write(path, content)
+        batch.commit()
+    stats = {}
+    for path, content in contents.items():
+        edit_tokens = sum(count_tokens(source) for source in block_sources[path])
+        stats[path] = {
+            'edits': len(block_sources[path]),
+            'bytes_written': len(content.encode('utf-8')),
+            'tokens_saved': max(count_tokens(content) - edit_tokens, 0),
+        }
+        logging.debug(f"Edited {path}: {stats[path]}")
+    return True, report, stats
@@ -1,8 +1,8 @@
 import os
-import yaml  # Import the yaml module
 import logging
 
 from tools.code_assistant import CodeAssistant
+from tools.workspace import Workspace
 
 PROMPT = """
 This Facets Agent is designed to assist users in creating, managing, and modifying JSON files specific to Facets resources. It leverages sample files and established conventions to maintain consistency and usability. Below is the structured approach to its functionality:
@@ -36,8 +36,8 @@ Interactive Editing: Suggests changes for confirmation before applying them.
 Error Reporting: Highlights issues with user instructions or JSON generation and provides actionable suggestions."""
 
 class FacetsAssistant(CodeAssistant):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, workspace: Workspace = None):
+        super().__init__(workspace)
         self.name: str = "Facets Assistant"
         self.model: str = "gpt-4o"
         self.instructions = PROMPT
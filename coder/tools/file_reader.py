@@ -0,0 +1,168 @@
+import os
+import re
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from tools.content_search import is_binary, BINARY_SNIFF_BYTES
+
+# Files larger than this are not returned whole; read_file shows a first page and an outline.
+MAX_READ_BYTES = 256 * 1024
+FIRST_PAGE_LINES = 200
+MAX_OUTLINE_ENTRIES = 200
+# The line index keeps the byte offset of every LINE_INDEX_STRIDE-th line.
+LINE_INDEX_STRIDE = 1000
+MAX_INDEXED_FILES = 64
+
+# Declarations worth listing in an outline, across the languages we usually see.
+OUTLINE_PATTERN = re.compile(
+    rb'^[ \t]*(?:(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:def|class|function|func|interface|struct|enum|type|fn|impl|module|resource)\s+\S'
+    rb'|#{1,3} \S)', re.MULTILINE)
+
+
+def file_is_binary(path: str) -> bool:
+    """Check the first block of a file for NUL bytes."""
+    with open(path, 'rb') as file:
+        return is_binary(file.read(BINARY_SNIFF_BYTES))
+
+
+class LineIndex:
+    """Sparse line -> byte offset index of one file version."""
+
+    def __init__(self, data):
+        self.checkpoints = array('Q', [0])
+        count, pos = 0, 0
+        while True:
+            pos = data.find(b'\n', pos)
+            if pos == -1:
+                break
+            pos += 1
+            count += 1
+            if count % LINE_INDEX_STRIDE == 0:
+                self.checkpoints.append(pos)
+        # A trailing newline does not start another line.
+        self.line_count = count + (1 if len(data) and data[-1:] != b'\n' else 0)
+
+    def offset_of(self, data, line: int) -> int:
+        """Byte offset at which 1-based line starts, scanning from the nearest checkpoint."""
+        checkpoint = min((line - 1) // LINE_INDEX_STRIDE, len(self.checkpoints) - 1)
+        pos = self.checkpoints[checkpoint]
+        for _ in range(line - 1 - checkpoint * LINE_INDEX_STRIDE):
+            pos = data.find(b'\n', pos)
+            if pos == -1:
+                return len(data)
+            pos += 1
+        return pos
+
+
+_line_indexes: 'OrderedDict[str, Tuple[int, int, LineIndex]]' = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def _line_index(path: str, stat, data) -> LineIndex:
+    """Return the cached line index for this version of the file, building it if needed."""
+    key = os.path.abspath(path)
+    with _line_indexes_lock:
+        cached = _line_indexes.get(key)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            _line_indexes.move_to_end(key)
+            return cached[2]
+    index = LineIndex(data)
+    with _line_indexes_lock:
+        _line_indexes[key] = (stat.st_size, stat.st_mtime_ns, index)
+        _line_indexes.move_to_end(key)
+        while len(_line_indexes) > MAX_INDEXED_FILES:
+            _line_indexes.popitem(last=False)
+    return index
+
+
+def _decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def read_lines(path: str, start_line: int = 1, end_line: Optional[int] = None,
+               max_bytes: int = MAX_READ_BYTES) -> Tuple[str, int]:
+    """Read 1-based inclusive lines [start_line, end_line] without loading the whole file.
+
+    Returns the text and the total number of lines in the file. A range
+    longer than max_bytes is cut at the last whole line that fits (or, for a
+    single longer line, at max_bytes) and ends with a note saying where to
+    continue.
+    """
+    start_line = max(start_line or 1, 1)
+    with open(path, 'rb') as file:
+        stat = os.fstat(file.fileno())
+        if stat.st_size == 0:
+            return '', 0
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index = _line_index(path, stat, data)
+            if end_line is None or end_line > index.line_count:
+                end_line = index.line_count
+            if start_line > end_line:
+                return '', index.line_count
+            start = index.offset_of(data, start_line)
+            end = index.offset_of(data, end_line + 1)
+            if end - start <= max_bytes:
+                return _decode(data[start:end]), index.line_count
+            cut = data.rfind(b'\n', start, start + max_bytes)
+            if cut == -1:
+                note = (f"[Line {start_line} is longer than {max_bytes} bytes; cut off at byte {start + max_bytes}. "
+                        f"Continue with start_byte={start + max_bytes}.]")
+                return _decode(data[start:start + max_bytes]) + note, index.line_count
+            last_line = start_line + data[start:cut].count(b'\n')
+            note = (f"[Cut off at {max_bytes} bytes: showing lines {start_line}-{last_line} of {index.line_count}. "
+                    f"Continue with start_line={last_line + 1}.]")
+            return _decode(data[start:cut + 1]) + note, index.line_count
+
+
+def read_bytes(path: str, start_byte: int = 0, end_byte: Optional[int] = None, max_bytes: int = MAX_READ_BYTES) -> str:
+    """Read the byte range [start_byte, end_byte) and decode it leniently.
+
+    At most max_bytes are returned; a longer range ends with a note saying where to continue.
+    """
+    start_byte = max(start_byte or 0, 0)
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        end = size if end_byte is None else min(max(end_byte, start_byte), size)
+        file.seek(start_byte)
+        if end - start_byte <= max_bytes:
+            return _decode(file.read(end - start_byte))
+        content = _decode(file.read(max_bytes))
+    return content + (f"[Cut off at {max_bytes} bytes: showing bytes {start_byte}-{start_byte + max_bytes} of {size}. "
+                      f"Continue with start_byte={start_byte + max_bytes}.]")
+
+
+def outline(path: str) -> List[str]:
+    """'line: declaration' entries for classes, functions and headings in the file."""
+    entries = []
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return entries
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            line_no, counted_to = 1, 0
+            for match in OUTLINE_PATTERN.finditer(data):
+                line_no += data[counted_to:match.start()].count(b'\n')
+                counted_to = match.start()
+                end = data.find(b'\n', match.start())
+                text = _decode(data[match.start():end if end != -1 else len(data)]).strip()
+                entries.append(f"{line_no}: {text[:120]}")
+                if len(entries) >= MAX_OUTLINE_ENTRIES:
+                    entries.append("...")
+                    break
+    return entries
+
+
+def summarize_large_file(path: str) -> str:
+    """First page of a large file plus an outline and a hint on reading the rest by range."""
+    size = os.path.getsize(path)
+    first_page, line_count = read_lines(path, 1, FIRST_PAGE_LINES)
+    parts = [f"[{path} is {size} bytes and {line_count} lines; showing lines 1-{min(FIRST_PAGE_LINES, line_count)}. "
+             f"Use start_line/end_line or start_byte/end_byte to read more.]",
+             first_page]
+    entries = outline(path)
+    if entries:
+        parts.append("[Outline]")
+        parts.append('\n'.join(entries))
+    return '\n'.join(parts)
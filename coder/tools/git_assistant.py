@@ -1,21 +1,21 @@
-import subprocess
 import os
 import logging
-from typing import ClassVar
 
 from swarm import Agent
 
+from tools.git_pager import diff_summary, file_diff_page, log_page
+from tools.prompts import load_prompt
+from tools.workspace import Workspace
+
 
 class GitAssistant(Agent):
-    base_path: ClassVar[str] = ''
 
-    def __init__(self):
+    def __init__(self, workspace: Workspace = None):
         super().__init__()
         self.name = "Git Assistant"
         self.model: str = "gpt-4o"
         # Read instructions from the Markdown file
-        with open('tools/git_assistant.md', 'r') as file:
-            self.instructions = file.read()
+        self.instructions = load_prompt('git_assistant.md')
         self.functions = [
             self.git_status,
             self.git_diff,
@@ -24,29 +24,49 @@ class GitAssistant(Agent):
             self.git_push,  # Added git push function
             self.git_log,   # List git commits
             self.git_reset, # Unstage changes
+            self.git_show,
         ]
         self.tool_choice: str = None
         self.parallel_tool_calls: bool = True
+        self._workspace = workspace or Workspace()
+
+    @property
+    def workspace(self) -> Workspace:
+        return self._workspace
+
+    @property
+    def base_path(self) -> str:
+        return self._workspace.root
+
+    def _git(self):
+        return self._workspace.git()
 
     def git_status(self):
         """Runs git status and returns the output."""
         logging.info("Checking git status...")
-        result = subprocess.run(["git", "status"], cwd=self.base_path, capture_output=True, text=True)
+        result = self._git().status()
         logging.info("Git status checked.")
         return result.stdout
 
-    def git_diff(self):
-        """Runs git diff and returns the output."""
+    def git_diff(self, file_path: str = "", page: int = 1, full: bool = False):
+        """Shows staged changes. Without file_path returns a summary of lines added and removed per file; with file_path returns one page of that file's hunks. Lockfiles, generated and binary files are only summarized unless full is True."""
         logging.info("Retrieving git diff...")
-        result = subprocess.run(["git", "diff", "--cached"], cwd=self.base_path, capture_output=True, text=True)
+        try:
+            if not file_path:
+                output = diff_summary(self._git(), ["--cached"])
+            else:
+                output = file_diff_page(self._git(), ["--cached"], file_path, page=page, full=full)
+        except Exception as e:
+            logging.error(f"Failed to retrieve git diff: {e}")
+            return str(e)
         logging.info("Git diff retrieved.")
-        return result.stdout
+        return output
 
     def git_commit(self, message):
         """Executes git commit using the provided message."""
         message = message + "\n\n Crafted by Jarvis"
         logging.info("Committing changes...")
-        result = subprocess.run(["git", "commit", "-m", message], cwd=self.base_path, capture_output=True, text=True)
+        result = self._git().run("commit", "-m", message)
         if result.returncode == 0:
             logging.info("Changes committed.")
         else:
@@ -59,7 +79,7 @@ class GitAssistant(Agent):
             files = "."
         file_list = files.split() if isinstance(files, str) else files
         logging.info(f"Adding {files} to staging area...")
-        result = subprocess.run(["git", "add"] + file_list, cwd=self.base_path, capture_output=True, text=True)
+        result = self._git().run("add", *file_list)
         if result.returncode == 0:
             logging.info(f"Added {files} to staging area.")
         else:
@@ -69,30 +89,46 @@ class GitAssistant(Agent):
     def git_push(self):
         """Executes git push """
         logging.info("Pushing changes to remote repository...")
-        result = subprocess.run(["git", "push"], cwd=self.base_path, capture_output=True, text=True)
+        result = self._git().run("push")
         if result.returncode == 0:
             logging.info("Changes pushed successfully.")
         else:
             logging.error("Failed to push changes.")
         return result.stdout if result.returncode == 0 else result.stderr
 
-    def git_log(self, n=10):
-        """Lists the latest n git commits."""
+    def git_log(self, n: int = 10, page: int = 1, full: bool = False):
+        """Lists n git commits (hash, date, author and subject), newest first; page 2 lists the n before those. Set full to include commit bodies and changed files."""
         logging.info("Retrieving git log...")
-        result = subprocess.run(["git", "log", f"-n {n}"], cwd=self.base_path, capture_output=True, text=True)
+        output, more = log_page(self._git(), n=n, page=page, full=full)
+        if more:
+            output += f"\n\n(more commits: call git_log with page={page + 1})"
         logging.info("Git log retrieved.")
-        return result.stdout
+        return output
 
     def git_reset(self):
         """Unstages all changes in the current repository."""
         logging.info("Unstaging all changes...")
-        result = subprocess.run(["git", "reset"], cwd=self.base_path, capture_output=True, text=True)
+        result = self._git().run("reset")
         if result.returncode == 0:
             logging.info("All changes unstaged.")
         else:
             logging.error("Failed to unstage changes.")
         return result.stdout if result.returncode == 0 else result.stderr
 
+    def git_show(self, file_path: str, revision: str = "HEAD"):
+        """Returns the content of a file as it is at the given revision (default HEAD)."""
+        logging.info(f"Reading {file_path} at {revision}...")
+        obj = self._git().read_object(f"{revision}:{file_path}")
+        if obj is None:
+            logging.error(f"{file_path} does not exist at {revision}.")
+            return f"{file_path} does not exist at {revision}."
+        obj_type, content = obj
+        if obj_type != "blob":
+            return f"{file_path} is a {obj_type} at {revision}, not a file."
+        if b"\0" in content[:8192]:
+            return f"{file_path} is a binary file ({len(content)} bytes) at {revision}; content not shown."
+        return content.decode("utf-8", errors="replace")
+
     def update_requirements(self):
         """Updates requirements.txt with necessary packages for the assistant."""
         logging.info("Updating requirements.txt...")
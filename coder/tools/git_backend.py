@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import logging
+import threading
+import subprocess
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tools.workspace_index import get_workspace_index
+
+# Cached status results are reused for at most this long. Writes made through
+# the agent's tools and anything that touches the index or refs invalidate the
+# cache sooner; the limit covers in-place edits made outside the agent, which
+# do not change any directory mtime the workspace index watches.
+STATUS_TTL_S = 5.0
+
+# Config for every git invocation: keep untracked-file scans cached in the
+# index, and use the builtin fsmonitor daemon where git ships one.
+GIT_CONFIG = ['-c', 'core.untrackedCache=true']
+if sys.platform in ('darwin', 'win32'):
+    GIT_CONFIG += ['-c', 'core.fsmonitor=true']
+
+
+class GitResult:
+    def __init__(self, args: List[str], returncode: int, stdout: str, stderr: str, elapsed_s: float):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elapsed_s = elapsed_s
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def output(self) -> str:
+        """stdout on success, stderr otherwise, the way the git tools report results."""
+        return self.stdout if self.ok else self.stderr
+
+
+class GitBackend:
+    """Runs git for one repository and keeps the expensive parts warm.
+
+    Every call is timed and logged. Status results are cached until the
+    index, HEAD or the current branch ref change, the workspace index sees a
+    change, or invalidate() is called. Object reads go through one long-lived
+    'git cat-file --batch' process instead of a process per read.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._git_dir: Optional[str] = None
+        self._common_dir: Optional[str] = None
+        self._status_cache: Dict[Tuple, Tuple[tuple, float, GitResult]] = {}
+        self._status_lock = threading.Lock()
+        self._cat_file: Optional[subprocess.Popen] = None
+        self._cat_file_lock = threading.Lock()
+        self._stats = {'calls': 0, 'git_time': 0.0, 'status_hits': 0, 'status_misses': 0, 'objects_read': 0}
+
+    def command(self, *args: str) -> List[str]:
+        return ['git', *GIT_CONFIG, *args]
+
+    def run(self, *args: str, input: Optional[str] = None) -> GitResult:
+        """Run a git subcommand in the repository and wait for it."""
+        started = time.perf_counter()
+        process = subprocess.run(self.command(*args), cwd=self.root, input=input, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        self._stats['calls'] += 1
+        self._stats['git_time'] += elapsed
+        logging.debug(f"git {' '.join(args)} took {elapsed * 1000:.1f} ms (exit {process.returncode})")
+        return GitResult(list(args), process.returncode, process.stdout, process.stderr, elapsed)
+
+    def stream(self, *args: str) -> Iterator[str]:
+        """Yield the output lines of a git subcommand as it produces them.
+
+        Only the current line is held in memory. If the caller stops early the
+        process is killed.
+        """
+        started = time.perf_counter()
+        process = subprocess.Popen(self.command(*args), cwd=self.root, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, text=True, errors='replace')
+        try:
+            yield from process.stdout
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+            elapsed = time.perf_counter() - started
+            self._stats['calls'] += 1
+            self._stats['git_time'] += elapsed
+            logging.debug(f"git {' '.join(args)} streamed in {elapsed * 1000:.1f} ms (exit {process.returncode})")
+
+    # Repository state
+
+    def _dirs(self) -> Tuple[Optional[str], Optional[str]]:
+        if self._git_dir is None:
+            result = self.run('rev-parse', '--absolute-git-dir', '--git-common-dir')
+            if result.ok:
+                git_dir, common_dir = result.stdout.splitlines()[:2]
+                self._git_dir = git_dir
+                self._common_dir = os.path.normpath(os.path.join(self.root, common_dir))
+        return self._git_dir, self._common_dir
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def state_key(self) -> tuple:
+        """Fingerprint of the index, HEAD, the checked-out ref and the work tree as far as the workspace index knows."""
+        git_dir, common_dir = self._dirs()
+        if git_dir is None:
+            return ()
+        head_path = os.path.join(git_dir, 'HEAD')
+        try:
+            with open(head_path) as file:
+                head = file.read().strip()
+        except OSError:
+            head = ''
+        ref_mtime = None
+        if head.startswith('ref: '):
+            ref_mtime = (self._mtime(os.path.join(common_dir, head[5:])),
+                         self._mtime(os.path.join(common_dir, 'packed-refs')))
+        index = get_workspace_index(self.root)
+        index.ensure_built()
+        return (self._mtime(os.path.join(git_dir, 'index')), head, ref_mtime, index.generation)
+
+    def invalidate(self):
+        """Forget cached status results, e.g. after a shell command that may have changed files."""
+        with self._status_lock:
+            self._status_cache.clear()
+
+    def status(self, *args: str) -> GitResult:
+        """git status with the given arguments, served from the cache while the repository is unchanged."""
+        key = self.state_key()
+        now = time.monotonic()
+        with self._status_lock:
+            cached = self._status_cache.get(args)
+            if cached and cached[0] == key and now - cached[1] < STATUS_TTL_S:
+                self._stats['status_hits'] += 1
+                logging.debug(f"git status {' '.join(args)} served from cache")
+                return cached[2]
+        self._stats['status_misses'] += 1
+        result = self.run('status', *args)
+        if result.ok:
+            with self._status_lock:
+                # git status may refresh the index, so fingerprint the state after it ran.
+                self._status_cache[args] = (self.state_key(), now, result)
+        return result
+
+    # Objects
+
+    def _start_cat_file(self):
+        self._cat_file = subprocess.Popen(self.command('cat-file', '--batch'), cwd=self.root,
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def read_object(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        """Read an object such as 'HEAD:path/to/file' as (type, content); None if it does not exist."""
+        started = time.perf_counter()
+        with self._cat_file_lock:
+            for attempt in range(2):
+                if self._cat_file is None or self._cat_file.poll() is not None:
+                    self._start_cat_file()
+                try:
+                    self._cat_file.stdin.write(spec.encode() + b'\n')
+                    self._cat_file.stdin.flush()
+                    header = self._cat_file.stdout.readline().decode()
+                    if not header:
+                        raise BrokenPipeError('git cat-file exited')
+                    fields = header.split()
+                    if len(fields) != 3:
+                        return None
+                    size = int(fields[2])
+                    content = self._cat_file.stdout.read(size + 1)[:size]
+                    break
+                except (BrokenPipeError, OSError):
+                    self._cat_file = None
+                    if attempt:
+                        raise
+        self._stats['objects_read'] += 1
+        logging.debug(f"git cat-file {spec} took {(time.perf_counter() - started) * 1000:.1f} ms")
+        return fields[1], content
+
+    def close(self):
+        with self._cat_file_lock:
+            if self._cat_file is not None:
+                self._cat_file.stdin.close()
+                self._cat_file.wait()
+                self._cat_file = None
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats['avg_call_ms'] = round(stats['git_time'] * 1000 / stats['calls'], 1) if stats['calls'] else 0.0
+        return stats
+
+
+_backends: Dict[str, GitBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_git_backend(base_path: str) -> GitBackend:
+    """Return the shared backend for base_path, creating it on first use."""
+    root = os.path.abspath(base_path or os.curdir)
+    with _backends_lock:
+        backend = _backends.get(root)
+        if backend is None:
+            backend = _backends[root] = GitBackend(root)
+        return backend
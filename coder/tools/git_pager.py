@@ -0,0 +1,172 @@
+import os
+import fnmatch
+from typing import Iterator, List, Optional, Tuple
+
+from tools.git_backend import GitBackend
+
+# Upper bound on the text returned for one page of a diff.
+PAGE_CHARS = 12000
+# Files listed in a diff summary before the rest are only counted.
+MAX_SUMMARY_FILES = 200
+
+LOCKFILES = {'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock',
+             'Pipfile.lock', 'uv.lock', 'Cargo.lock', 'go.sum', 'composer.lock', 'Gemfile.lock',
+             'packages.lock.json', 'flake.lock'}
+GENERATED_PATTERNS = ['*.min.js', '*.min.css', '*.map', '*_pb2.py', '*_pb2_grpc.py', '*.pb.go',
+                      '*.generated.*', '*.snap', 'dist/*', 'build/*', 'vendor/*', 'node_modules/*']
+
+
+def classify(path: str, binary: bool = False) -> Optional[str]:
+    """'binary', 'lockfile' or 'generated' for files whose hunks are not worth reading, else None."""
+    if binary:
+        return 'binary'
+    if os.path.basename(path) in LOCKFILES:
+        return 'lockfile'
+    if any(fnmatch.fnmatch(path, pattern) for pattern in GENERATED_PATTERNS):
+        return 'generated'
+    return None
+
+
+class FileChange:
+    def __init__(self, path: str, added: Optional[int], deleted: Optional[int], old_path: Optional[str] = None):
+        self.path = path
+        self.old_path = old_path
+        self.added = added
+        self.deleted = deleted
+
+    @property
+    def binary(self) -> bool:
+        return self.added is None
+
+    @property
+    def kind(self) -> Optional[str]:
+        return classify(self.path, self.binary)
+
+
+def numstat(backend: GitBackend, diff_args: List[str]) -> List[FileChange]:
+    """Per-file line counts for a diff; binary files have None counts."""
+    result = backend.run('diff', '--numstat', '-z', *diff_args)
+    if not result.ok:
+        raise RuntimeError(result.stderr.strip())
+    fields = result.stdout.split('\0')
+    changes = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        added, deleted, path = fields[i].split('\t', 2)
+        old_path = None
+        if not path:
+            # Renames are written as 'added\tdeleted\t\0old\0new'.
+            old_path, path = fields[i + 1], fields[i + 2]
+            i += 2
+        changes.append(FileChange(path, None if added == '-' else int(added),
+                                  None if deleted == '-' else int(deleted), old_path))
+        i += 1
+    return changes
+
+
+def diff_summary(backend: GitBackend, diff_args: List[str]) -> str:
+    changes = numstat(backend, diff_args)
+    if not changes:
+        return "No changes."
+    added = sum(change.added or 0 for change in changes)
+    deleted = sum(change.deleted or 0 for change in changes)
+    lines = [f"{len(changes)} files changed, {added} insertions(+), {deleted} deletions(-)"]
+    for change in changes[:MAX_SUMMARY_FILES]:
+        name = f"{change.old_path} => {change.path}" if change.old_path else change.path
+        counts = "binary" if change.binary else f"+{change.added} -{change.deleted}"
+        note = f"  [{change.kind}, summarized]" if change.kind and not change.binary else ""
+        lines.append(f"  {name}  {counts}{note}")
+    if len(changes) > MAX_SUMMARY_FILES:
+        lines.append(f"  ... and {len(changes) - MAX_SUMMARY_FILES} more files")
+    return "\n".join(lines)
+
+
+def _split_long(hunk: List[str], page_chars: int) -> Iterator[List[str]]:
+    """Split a hunk bigger than a page into page-sized pieces."""
+    piece, size = [], 0
+    for line in hunk:
+        if piece and size + len(line) > page_chars:
+            yield piece
+            piece, size = [], 0
+        piece.append(line)
+        size += len(line)
+    if piece:
+        yield piece
+
+
+def _paginate(lines: Iterator[str], page_chars: int) -> Iterator[List[str]]:
+    """Group diff lines into pages, breaking only between hunks unless a single hunk is too big."""
+    page: List[str] = []
+    size = 0
+
+    def add(hunk):
+        nonlocal page, size
+        for piece in _split_long(hunk, page_chars):
+            piece_size = sum(len(line) for line in piece)
+            if page and size + piece_size > page_chars:
+                yield page
+                page, size = [], 0
+            page.extend(piece)
+            size += piece_size
+
+    hunk: List[str] = []
+    for line in lines:
+        if line.startswith('@@') and hunk:
+            yield from add(hunk)
+            hunk = []
+        hunk.append(line)
+    yield from add(hunk)
+    if page:
+        yield page
+
+
+def file_diff_page(backend: GitBackend, diff_args: List[str], path: str, page: int = 1,
+                   full: bool = False, page_chars: int = PAGE_CHARS) -> str:
+    """One page of the hunks of a single file's diff.
+
+    The diff is streamed from git and only the requested page is kept, so
+    memory stays bounded however large the diff is. Lockfiles, generated and
+    binary files get a one-line summary unless full is set (binary files
+    always do).
+    """
+    change = next((c for c in numstat(backend, diff_args + ['--', path])), None)
+    if change is None:
+        return f"No changes in {path}."
+    if change.kind and (change.binary or not full):
+        if change.binary:
+            return f"{path}: binary file changed; content not shown."
+        return (f"{path}: {change.kind} changed, +{change.added} -{change.deleted} lines; hunks not shown. "
+                f"Pass full=True to page through them anyway.")
+
+    wanted, total = None, 0
+    for number, lines in enumerate(_paginate(backend.stream('diff', *diff_args, '--', path), page_chars), start=1):
+        total = number
+        if number == page:
+            wanted = lines
+    if wanted is None:
+        return f"{path} has {total} pages of diff; page {page} does not exist."
+    header = f"{path} (+{change.added} -{change.deleted}), page {page} of {total}"
+    if page < total:
+        header += f"; call again with page={page + 1} for more"
+    return header + "\n" + "".join(wanted)
+
+
+def log_page(backend: GitBackend, n: int = 10, page: int = 1, full: bool = False) -> Tuple[str, bool]:
+    """n commits starting after the first (page - 1) * n, two lines each, or with bodies and file stats if full.
+
+    Returns (text, whether more commits follow).
+    """
+    # Each commit starts with an ASCII record separator so commits can be told apart while streaming.
+    fmt = '%x1e%h %ad %an%n    %s' + ('%n%n%w(0,4,4)%b' if full else '')
+    args = ['log', f'--max-count={n + 1}', f'--skip={(page - 1) * n}', '--date=short', f'--format={fmt}']
+    if full:
+        args.append('--stat')
+    commits: List[List[str]] = []
+    for line in backend.stream(*args):
+        if line.startswith('\x1e'):
+            commits.append([])
+            line = line[1:]
+        if commits:
+            commits[-1].append(line)
+    text = "".join(line for commit in commits[:n] for line in commit).rstrip('\n')
+    return text, len(commits) > n
@@ -0,0 +1,203 @@
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+GITIGNORE = '.gitignore'
+
+# Compiled rules keyed by absolute file path, invalidated by mtime.
+_rules_cache: Dict[str, Tuple[int, 'GitIgnoreRules']] = {}
+_rules_cache_lock = threading.Lock()
+
+
+def _translate(pattern: str) -> str:
+    """Translate one gitignore glob into a regex body matching '/'-separated relative paths."""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+    out = [] if anchored else ['(?:.*/)?']
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        at_segment_start = i == 0 or pattern[i - 1] == '/'
+        if c == '*':
+            if pattern.startswith('**/', i) and at_segment_start:
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i) and i + 2 == n and at_segment_start:
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', ']') else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class GitIgnoreRules:
+    """The compiled rules of one ignore file.
+
+    Consecutive rules with the same (negated, directory-only) flags are joined
+    into one alternation regex, so a path is checked against a handful of
+    regexes instead of every pattern. Groups are evaluated last to first, as
+    the last matching rule wins.
+    """
+
+    def __init__(self, lines: List[str]):
+        rules = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            # Trailing spaces are ignored unless escaped.
+            stripped = line.rstrip(' ')
+            if stripped.endswith('\\') and len(stripped) < len(line):
+                stripped += ' '
+            line = stripped
+            negate = line.startswith('!')
+            if negate or line.startswith('\\!') or line.startswith('\\#'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if line:
+                rules.append((negate, dir_only, _translate(line)))
+
+        self.groups: List[Tuple[bool, bool, re.Pattern]] = []
+        start = 0
+        for i in range(1, len(rules) + 1):
+            if i == len(rules) or rules[i][:2] != rules[start][:2]:
+                negate, dir_only = rules[start][:2]
+                regex = re.compile('^(?:' + '|'.join(r[2] for r in rules[start:i]) + ')$')
+                self.groups.append((negate, dir_only, regex))
+                start = i
+        self.groups.reverse()
+        self.has_dir_only = any(group[1] for group in self.groups)
+
+    def match(self, rel_path: str, is_dir) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no rule matches.
+
+        is_dir is a bool or a zero-argument callable, evaluated only when a
+        directory-only rule needs it.
+        """
+        for negate, dir_only, regex in self.groups:
+            if dir_only:
+                if callable(is_dir):
+                    is_dir = is_dir()
+                if not is_dir:
+                    continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
+
+def load_rules(path: str) -> Optional[GitIgnoreRules]:
+    """Compile an ignore file, reusing the cached rules while its mtime is unchanged."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    with _rules_cache_lock:
+        cached = _rules_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, 'r', errors='replace') as file:
+            rules = GitIgnoreRules(file.readlines())
+    except OSError as e:
+        logging.warning(f"Could not read ignore file {path}: {e}")
+        return None
+    with _rules_cache_lock:
+        _rules_cache[path] = (mtime, rules)
+    return rules
+
+
+class GitIgnoreMatcher:
+    """Decides whether paths under root are ignored, following gitignore semantics.
+
+    Rules come from .git/info/exclude, any extra ignore files (applied at the
+    root), the root .gitignore and every nested .gitignore, with deeper files
+    taking precedence. Once a directory is ignored nothing below it can be
+    re-included, so decisions for directories are memoized and whole subtrees
+    are skipped. Create a matcher per operation; compiled rules are shared.
+    """
+
+    def __init__(self, root: str, extra_ignore_files: Optional[List[str]] = None):
+        self.root = os.path.abspath(root)
+        self._root_rules = [rules for rules in
+                            (load_rules(path) for path in
+                             [os.path.join(self.root, '.git', 'info', 'exclude')] + list(extra_ignore_files or []))
+                            if rules is not None]
+        self._dir_rules: Dict[str, Optional[GitIgnoreRules]] = {}
+        self._dir_ignored: Dict[str, bool] = {}
+
+    def _rules_for(self, rel_dir: str) -> Optional[GitIgnoreRules]:
+        if rel_dir not in self._dir_rules:
+            self._dir_rules[rel_dir] = load_rules(os.path.join(self.root, rel_dir, GITIGNORE))
+        return self._dir_rules[rel_dir]
+
+    def _decide(self, rel: str, is_dir) -> bool:
+        """Apply the rules of every level to rel, assuming its ancestors are not ignored."""
+        parts = rel.split('/')
+        # Deepest .gitignore first; within a file the last matching rule wins.
+        for depth in range(len(parts) - 1, -1, -1):
+            rules = self._rules_for('/'.join(parts[:depth]))
+            if rules is not None:
+                result = rules.match('/'.join(parts[depth:]), is_dir)
+                if result is not None:
+                    return result
+        for rules in reversed(self._root_rules):
+            result = rules.match(rel, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def _is_dir_ignored(self, rel_dir: str) -> bool:
+        ignored = self._dir_ignored.get(rel_dir)
+        if ignored is None:
+            ignored = self._dir_ignored[rel_dir] = self._decide(rel_dir, True)
+        return ignored
+
+    def is_ignored(self, path: str, is_dir: Optional[bool] = None) -> bool:
+        """Whether path (absolute or relative to the working directory) is ignored.
+
+        is_dir is looked up on disk only if a directory-only rule needs it.
+        """
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.curdir or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return False
+        rel = rel.replace(os.sep, '/')
+        parts = rel.split('/')
+        if '.git' in parts:
+            return True
+        for i in range(1, len(parts)):
+            if self._is_dir_ignored('/'.join(parts[:i])):
+                return True
+        if is_dir:
+            return self._is_dir_ignored(rel)
+        if is_dir is None:
+            abs_path = os.path.join(self.root, rel)
+            return self._decide(rel, lambda: os.path.isdir(abs_path))
+        return self._decide(rel, False)
+
+    def walk(self, top: str):
+        """os.walk that never descends into ignored directories and drops ignored files."""
+        for root, dirs, files in os.walk(top):
+            dirs[:] = [d for d in dirs if not self.is_ignored(os.path.join(root, d), True)]
+            yield root, dirs, [f for f in files if not self.is_ignored(os.path.join(root, f), False)]
@@ -0,0 +1,261 @@
+import os
+import re
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from tools.write_batch import WriteBatch, workspace_lock
+
+# How far (in lines) a hunk may have moved from the position in its header.
+MAX_FUZZ_LINES = 200
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+NO_NEWLINE_MARKER = '\\ No newline at end of file'
+
+
+class PatchError(Exception):
+    pass
+
+
+class Hunk:
+    def __init__(self, source_start: int, header: str):
+        self.source_start = source_start
+        self.header = header
+        # (tag, text) pairs; tag is ' ', '-' or '+', text has no line ending.
+        self.lines: List[Tuple[str, str]] = []
+        self.source_no_newline = False
+        self.target_no_newline = False
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != '+']
+
+    @property
+    def new_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != '-']
+
+
+class FilePatch:
+    def __init__(self, source: Optional[str], target: Optional[str]):
+        self.source = source
+        self.target = target
+        self.hunks: List[Hunk] = []
+
+    @property
+    def path(self) -> str:
+        return self.target or self.source
+
+    @property
+    def is_new(self) -> bool:
+        return self.source is None
+
+    @property
+    def is_deleted(self) -> bool:
+        return self.target is None
+
+
+def _strip_path(header_value: str) -> Optional[str]:
+    path = header_value.split('\t')[0].strip()
+    if path == '/dev/null':
+        return None
+    if path[:2] in ('a/', 'b/'):
+        path = path[2:]
+    return path
+
+
+def parse_patch(diff: str) -> List[FilePatch]:
+    """Parse a unified diff leniently.
+
+    Hunk line counts in headers are not trusted (model-written diffs often get
+    them wrong); a hunk runs until the next hunk or file header. A blank line
+    inside a hunk is read as an empty context line, one at its end is dropped.
+    """
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    hunk: Optional[Hunk] = None
+    lines = diff.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('--- ') and i + 1 < len(lines) and lines[i + 1].startswith('+++ '):
+            current = FilePatch(_strip_path(line[4:]), _strip_path(lines[i + 1][4:]))
+            patches.append(current)
+            hunk = None
+            i += 2
+            continue
+        match = HUNK_HEADER.match(line)
+        if match:
+            if current is None:
+                raise PatchError("Hunk found before any '---'/'+++' file header.")
+            start = int(match.group(1))
+            # An empty source range ('-N,0') inserts after line N.
+            hunk = Hunk(start + 1 if match.group(2) == '0' else start, line)
+            current.hunks.append(hunk)
+        elif hunk is not None:
+            if line.startswith(NO_NEWLINE_MARKER[:2]):
+                last_tag = hunk.lines[-1][0] if hunk.lines else ' '
+                if last_tag in ' -':
+                    hunk.source_no_newline = True
+                if last_tag in ' +':
+                    hunk.target_no_newline = True
+            elif line[:1] in (' ', '-', '+'):
+                hunk.lines.append((line[0], line[1:]))
+            elif line == '':
+                # Marked for now: blank lines at the very end of a hunk are dropped below.
+                hunk.lines.append(('=', ''))
+            elif line.startswith('diff ') or line.startswith('index '):
+                hunk = None
+        i += 1
+    if not patches:
+        raise PatchError("No file headers ('---'/'+++') found in diff.")
+    for patch in patches:
+        for hunk in patch.hunks:
+            while hunk.lines and hunk.lines[-1][0] == '=':
+                hunk.lines.pop()
+            hunk.lines = [(' ' if tag == '=' else tag, text) for tag, text in hunk.lines]
+    return patches
+
+
+def _matches(lines: List[str], position: int, expected: List[str], loose: bool) -> bool:
+    if position < 0 or position + len(expected) > len(lines):
+        return False
+    for offset, text in enumerate(expected):
+        line = lines[position + offset].rstrip('\r\n')
+        if line != text and not (loose and line.rstrip() == text.rstrip()):
+            return False
+    return True
+
+
+def _locate(lines: List[str], hunk: Hunk, lower_bound: int, fuzz: int) -> Optional[int]:
+    """Index where the hunk's old lines occur, searching outward from the header position.
+
+    Exact matches are preferred; trailing-whitespace differences are accepted
+    as a fallback. Positions before lower_bound belong to earlier hunks.
+    """
+    expected = hunk.old_lines
+    origin = max(hunk.source_start - 1, 0)
+    for loose in (False, True):
+        for distance in range(fuzz + 1):
+            for position in ((origin,) if distance == 0 else (origin - distance, origin + distance)):
+                if position >= lower_bound and _matches(lines, position, expected, loose):
+                    return position
+    return None
+
+
+def apply_hunks(lines: List[str], hunks: List[Hunk], fuzz: int = MAX_FUZZ_LINES) -> Tuple[Optional[List[str]], List[str]]:
+    """Merge hunks into lines (with line endings) in a single pass.
+
+    Returns the new lines, or None if any hunk could not be placed, plus a
+    per-hunk report.
+    """
+    newline = '\r\n' if lines and lines[0].endswith('\r\n') else '\n'
+    output: List[str] = []
+    report: List[str] = []
+    consumed = 0
+    failed = False
+    for number, hunk in enumerate(sorted(hunks, key=lambda h: h.source_start), start=1):
+        position = _locate(lines, hunk, consumed, fuzz)
+        if position is None:
+            failed = True
+            report.append(f"hunk {number} FAILED: context not found near line {hunk.source_start} ({hunk.header})")
+            continue
+        offset = position + 1 - hunk.source_start
+        report.append(f"hunk {number} applied at line {position + 1}" + (f" (offset {offset:+d})" if offset else ""))
+        end = position + len(hunk.old_lines)
+        output.extend(lines[consumed:position])
+        # Context lines keep their original text and line endings.
+        new_lines, source = [], position
+        for tag, text in hunk.lines:
+            if tag == ' ':
+                new_lines.append(lines[source])
+            if tag == '+':
+                new_lines.append(text + newline)
+            if tag != '+':
+                source += 1
+        if new_lines and end == len(lines):
+            original_has_newline = not lines or lines[-1].endswith('\n')
+            if hunk.target_no_newline or (not original_has_newline and not hunk.source_no_newline):
+                new_lines[-1] = new_lines[-1].rstrip('\r\n')
+            elif not new_lines[-1].endswith('\n'):
+                new_lines[-1] += newline
+        output.extend(new_lines)
+        consumed = end
+    output.extend(lines[consumed:])
+    return (None if failed else output), report
+
+
+def apply_patch(diff: str, resolve: Callable[[str], str], default_path: Optional[str] = None,
+                fuzz: int = MAX_FUZZ_LINES, root: Optional[str] = None) -> Tuple[bool, List[str], List[str]]:
+    """Apply a (possibly multi-file) unified diff.
+
+    resolve maps a path from the diff to a filesystem path. If default_path is
+    given and the diff touches a single file, that file is patched regardless
+    of the names in the headers. Every file is checked before any is written,
+    and the writes are committed as one WriteBatch, so a patch either applies
+    completely or leaves the workspace untouched. The workspace lock on root
+    is held from the first read to the commit, so a concurrent edit of the
+    same file cannot be silently overwritten.
+    Returns (success, report lines, changed paths).
+    """
+    patches = parse_patch(diff)
+    with workspace_lock(root):
+        planned, report, ok = _plan_patch(patches, resolve, default_path, fuzz)
+        if not ok:
+            report.append("No files were changed.")
+            return False, report, []
+        batch = WriteBatch(root)
+        for path, content in planned:
+            if content is None:
+                batch.delete(path)
+            else:
+                batch.write(path, content)
+        batch.commit()
+    logging.debug(f"Patched {[path for path, _ in planned]}")
+    return True, report, [path for path, _ in planned]
+
+
+def _plan_patch(patches, resolve: Callable[[str], str], default_path: Optional[str], fuzz: int):
+    """Apply patches to the current file contents in memory; returns (planned writes, report lines, ok).
+
+    A file that appears in several sections is patched section after section,
+    each applied to the result of the ones before it. A new file must not
+    exist yet, and a deleted one must exist and hold exactly the lines the
+    patch removes.
+    """
+    planned = {}
+    report: List[str] = []
+    ok = True
+    for patch in patches:
+        display = default_path if default_path and len(patches) == 1 else patch.path
+        path = resolve(display)
+        if path in planned:
+            content = planned[path]
+        elif os.path.exists(path):
+            with open(path, 'r', newline='') as file:
+                content = file.read()
+        else:
+            content = None
+        if content is None and not patch.is_new:
+            report.append(f"{display}: FAILED: file does not exist")
+            ok = False
+            continue
+        if patch.is_new and content is not None:
+            report.append(f"{display}: FAILED: file already exists")
+            ok = False
+            continue
+        original = (content or '').splitlines(keepends=True)
+        if patch.is_deleted:
+            expected = [text for hunk in patch.hunks for text in hunk.old_lines]
+            if len(original) != len(expected) or not _matches(original, 0, expected, loose=True):
+                report.append(f"{display}: FAILED: file content does not match the lines the patch deletes")
+                ok = False
+                continue
+            planned[path] = None
+            report.append(f"{display}: deleted")
+            continue
+        new_lines, hunk_report = apply_hunks(original, patch.hunks, fuzz)
+        report.extend(f"{display}: {line}" for line in hunk_report)
+        if new_lines is None:
+            ok = False
+        else:
+            planned[path] = ''.join(new_lines)
+    return list(planned.items()), report, ok
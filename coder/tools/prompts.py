@@ -0,0 +1,12 @@
+import os
+from functools import lru_cache
+
+# Agent instructions live next to the assistants, so they load from any working directory.
+PROMPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@lru_cache(maxsize=None)
+def load_prompt(file_name: str) -> str:
+    """Return the instructions in a Markdown file of PROMPTS_DIR, read once per process."""
+    with open(os.path.join(PROMPTS_DIR, file_name), 'r') as file:
+        return file.read()
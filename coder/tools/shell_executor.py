@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+import threading
+import itertools
+from typing import Dict, Optional
+
+# Wall-clock limit for foreground commands, in seconds.
+DEFAULT_TIMEOUT_S = 300
+# How much output is kept from the start and the end of a command; the middle is dropped.
+HEAD_BYTES = 16 * 1024
+TAIL_BYTES = 16 * 1024
+# Time a killed process group gets between SIGTERM and SIGKILL.
+KILL_GRACE_S = 3
+READ_CHUNK = 4096
+
+
+class OutputBuffer:
+    """Keeps the first head_bytes and last tail_bytes of a stream, counting what was dropped in between."""
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+
+    def append(self, data: bytes):
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    @property
+    def omitted_bytes(self) -> int:
+        return self.total_bytes - len(self.head) - len(self.tail)
+
+    def text(self) -> str:
+        head = self.head.decode('utf-8', errors='replace')
+        if not self.omitted_bytes:
+            return head + self.tail.decode('utf-8', errors='replace')
+        tail = self.tail.decode('utf-8', errors='replace')
+        return f"{head}\n... [{self.omitted_bytes} bytes of output omitted] ...\n{tail}"
+
+
+class ShellResult:
+    def __init__(self, command: str, exit_code: Optional[int], output: OutputBuffer, elapsed_s: float, timed_out: bool):
+        self.command = command
+        self.exit_code = exit_code
+        self.output = output
+        self.elapsed_s = elapsed_s
+        self.timed_out = timed_out
+
+    def __str__(self):
+        text = self.output.text()
+        if self.timed_out:
+            text += f"\n[timed out after {self.elapsed_s:.0f}s; process killed]"
+        elif self.exit_code:
+            text += f"\n[exit code {self.exit_code}]"
+        return text
+
+
+class ShellJob:
+    """A command running in the background; output is captured into a capped buffer as it arrives."""
+
+    def __init__(self, job_id: int, command: str, cwd: str):
+        self.job_id = job_id
+        self.command = command
+        self.cwd = cwd
+        self.output = OutputBuffer()
+        self.started = time.monotonic()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.future = None
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def status(self) -> str:
+        if not self.done:
+            elapsed = time.monotonic() - self.started
+            return f"Job {self.job_id} running for {elapsed:.0f}s ({self.output.total_bytes} bytes of output):\n{self.output.text()}"
+        if self.future.cancelled():
+            return f"Job {self.job_id} was stopped:\n{self.output.text()}"
+        try:
+            result = self.future.result()
+        except Exception as e:
+            return f"Job {self.job_id} failed: {e}"
+        return f"Job {self.job_id} finished in {result.elapsed_s:.1f}s:\n{result}"
+
+
+class ShellExecutor:
+    """Runs shell commands on a background asyncio loop.
+
+    Output is streamed to the console as it arrives (for foreground
+    commands) and kept as head and tail only, so huge outputs do not pile up
+    in memory. Commands run in their own process group, which is killed
+    when the wall-clock limit is reached.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._jobs: Dict[int, ShellJob] = {}
+        self._job_ids = itertools.count(1)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='shell-executor', daemon=True).start()
+            return self._loop
+
+    async def _pump(self, stream: asyncio.StreamReader, output: OutputBuffer, echo):
+        while True:
+            data = await stream.read(READ_CHUNK)
+            if not data:
+                return
+            output.append(data)
+            if echo is not None:
+                echo.write(data.decode('utf-8', errors='replace'))
+                echo.flush()
+
+    async def _kill(self, process: asyncio.subprocess.Process):
+        """Terminate the command's whole process group, escalating to SIGKILL if it does not exit."""
+        for sig in (signal.SIGTERM, getattr(signal, 'SIGKILL', signal.SIGTERM)):
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, sig)
+                else:
+                    process.kill()
+            except (ProcessLookupError, PermissionError):
+                return
+            try:
+                await asyncio.wait_for(process.wait(), KILL_GRACE_S)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    async def _run(self, command: str, cwd: str, timeout: Optional[float], output: OutputBuffer,
+                   echo: bool, job: Optional[ShellJob] = None) -> ShellResult:
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_shell(
+            command, cwd=cwd, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            start_new_session=hasattr(os, 'killpg'))
+        if job is not None:
+            job.process = process
+        pumps = asyncio.gather(self._pump(process.stdout, output, sys.stdout if echo else None),
+                               self._pump(process.stderr, output, sys.stderr if echo else None))
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(pumps), timeout)
+            await process.wait()
+        except asyncio.TimeoutError:
+            timed_out = True
+        except asyncio.CancelledError:
+            await self._kill(process)
+            raise
+        finally:
+            if process.returncode is None:
+                await self._kill(process)
+            if not pumps.done():
+                # Grandchildren may still hold the pipes open after the group was killed.
+                try:
+                    await asyncio.wait_for(pumps, KILL_GRACE_S)
+                except asyncio.TimeoutError:
+                    pass
+        elapsed = time.monotonic() - started
+        logging.debug(f"Shell command {command!r} exited with {process.returncode} after {elapsed:.2f}s "
+                      f"({output.total_bytes} bytes of output, {output.omitted_bytes} omitted)")
+        return ShellResult(command, process.returncode, output, elapsed, timed_out)
+
+    def run(self, command: str, cwd: str, timeout: Optional[float] = DEFAULT_TIMEOUT_S, echo: bool = True) -> ShellResult:
+        """Run command to completion (or until timeout), streaming its output to the console if echo is set."""
+        coroutine = self._run(command, cwd, timeout, OutputBuffer(), echo)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def start(self, command: str, cwd: str, timeout: Optional[float] = None) -> ShellJob:
+        """Start command in the background and return its job; poll it with job.status()."""
+        job = ShellJob(next(self._job_ids), command, cwd)
+        job.future = asyncio.run_coroutine_threadsafe(
+            self._run(command, cwd, timeout, job.output, echo=False, job=job), self._get_loop())
+        self._jobs[job.job_id] = job
+        logging.debug(f"Started background job {job.job_id}: {command!r} in {cwd}")
+        return job
+
+    def get(self, job_id: int) -> Optional[ShellJob]:
+        return self._jobs.get(job_id)
+
+    def stop(self, job_id: int) -> Optional[ShellJob]:
+        """Kill a background job; returns the job, or None if there is no such job."""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.done:
+            job.future.cancel()
+            if job.process is not None and job.process.returncode is None:
+                asyncio.run_coroutine_threadsafe(self._kill(job.process), self._get_loop()).result()
+        return job
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+
+shell_executor = ShellExecutor()
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import uuid
+import shlex
+import shutil
+import signal
+import logging
+import selectors
+import threading
+import subprocess
+from typing import Optional
+
+from tools.shell_executor import DEFAULT_TIMEOUT_S, KILL_GRACE_S, READ_CHUNK, OutputBuffer, ShellResult
+
+# A session unused for this long is replaced by a fresh shell on its next command.
+IDLE_TIMEOUT_S = 600
+
+
+class ShellSession:
+    """A long-lived bash process that runs commands one at a time.
+
+    cd, exported variables and activated virtualenvs carry over between
+    commands. Each command is run through eval and followed by a printf of a
+    random marker and its exit code, which is how the end of its output is found. A command that
+    times out takes the session down with it; so does one that exits the
+    shell. The next command then starts a fresh session.
+    """
+
+    def __init__(self, cwd: str):
+        self.cwd = os.path.abspath(cwd)
+        self.marker = f"__codeassist_done_{uuid.uuid4().hex}__".encode()
+        self.process: Optional[subprocess.Popen] = None
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+        self.spawns = 0
+        self.spawn_time_s = 0.0
+        self.commands = 0
+        self.command_time_s = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _spawn(self):
+        started = time.monotonic()
+        bash = shutil.which('bash')
+        self.process = subprocess.Popen(
+            [bash, '--noprofile', '--norc'] if bash else ['/bin/sh'],
+            cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            start_new_session=True)
+        self.spawns += 1
+        self.spawn_time_s += time.monotonic() - started
+        logging.debug(f"Started shell session {self.process.pid} in {self.cwd} "
+                      f"({(time.monotonic() - started) * 1000:.1f} ms)")
+
+    def close(self):
+        """Kill the shell and everything it started."""
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                break
+            try:
+                process.wait(KILL_GRACE_S)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+        for stream in (process.stdin, process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def _ensure_started(self):
+        if self.alive and time.monotonic() - self.last_used > IDLE_TIMEOUT_S:
+            logging.debug(f"Recycling shell session {self.process.pid} after {IDLE_TIMEOUT_S}s idle")
+            self.close()
+        if not self.alive:
+            if self.process is not None:
+                logging.debug(f"Shell session {self.process.pid} exited with {self.process.returncode}; restarting")
+                self.close()
+            self._spawn()
+
+    def run(self, command: str, timeout: Optional[float] = DEFAULT_TIMEOUT_S, echo: bool = True) -> ShellResult:
+        """Run command in the session, streaming its output to the console if echo is set."""
+        with self.lock:
+            self._ensure_started()
+            started = time.monotonic()
+            output = OutputBuffer()
+            # The command goes through eval as one quoted word, so a syntax error (an unterminated
+            # quote, a trailing backslash) fails the command instead of swallowing the marker line.
+            # Its stdin is /dev/null so it cannot swallow the commands that follow it.
+            script = (f"{{ eval {shlex.quote(command)}\n}} < /dev/null 2>&1\n"
+                      f"printf '\\n%s %d\\n' {self.marker.decode()} $?\n")
+            exit_code, timed_out = None, False
+            try:
+                self.process.stdin.write(script.encode())
+                self.process.stdin.flush()
+                exit_code, timed_out = self._read_until_marker(output, timeout, sys.stdout if echo else None)
+            except (BrokenPipeError, OSError) as e:
+                logging.debug(f"Shell session failed while running {command!r}: {e}")
+            if exit_code is None:
+                # Timed out, or the shell died (e.g. the command ran 'exit'): start over next time.
+                if self.process is not None and not timed_out:
+                    try:
+                        exit_code = self.process.wait(KILL_GRACE_S)
+                    except subprocess.TimeoutExpired:
+                        pass
+                self.close()
+            elapsed = time.monotonic() - started
+            self.last_used = time.monotonic()
+            self.commands += 1
+            self.command_time_s += elapsed
+            return ShellResult(command, exit_code, output, elapsed, timed_out)
+
+    def _read_until_marker(self, output: OutputBuffer, timeout: Optional[float], echo):
+        """Copy output until the end marker; returns (exit code, timed out). Exit code is None if the shell died."""
+        fd = self.process.stdout.fileno()
+        deadline = time.monotonic() + timeout if timeout else None
+        pending = bytearray()
+        end = b'\n' + self.marker + b' '
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                index = pending.find(end)
+                if index >= 0 and pending.find(b'\n', index + len(end)) >= 0:
+                    self._emit(output, bytes(pending[:index]), echo)
+                    line_end = pending.find(b'\n', index + len(end))
+                    return int(pending[index + len(end):line_end]), False
+                if index < 0 and len(pending) > len(end):
+                    # Everything that cannot be the start of the marker is safe to pass on.
+                    self._emit(output, bytes(pending[:-len(end)]), echo)
+                    del pending[:-len(end)]
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._emit(output, bytes(pending), echo)
+                    return None, True
+                if not selector.select(remaining):
+                    continue
+                data = os.read(fd, READ_CHUNK)
+                if not data:
+                    self._emit(output, bytes(pending), echo)
+                    return None, False
+                pending += data
+
+    @staticmethod
+    def _emit(output: OutputBuffer, data: bytes, echo):
+        if not data:
+            return
+        output.append(data)
+        if echo is not None:
+            echo.write(data.decode('utf-8', errors='replace'))
+            echo.flush()
+
+    def stats(self) -> dict:
+        return {
+            'alive': self.alive,
+            'spawns': self.spawns,
+            'spawn_time_ms': round(self.spawn_time_s * 1000, 1),
+            'commands': self.commands,
+            'avg_command_ms': round(self.command_time_s * 1000 / self.commands, 1) if self.commands else 0.0,
+        }
+
+
+def sessions_supported() -> bool:
+    return hasattr(os, 'killpg') and os.path.exists('/bin/sh')
+
+
+def cd_command(directory: str) -> str:
+    return f"cd -- {shlex.quote(directory)}"
+
+
+def measure_overhead(runs: int = 20) -> dict:
+    """Average latency of a no-op command in a fresh shell per call versus a warm session, in milliseconds."""
+    started = time.monotonic()
+    for _ in range(runs):
+        subprocess.run('true', shell=True, check=True)
+    fresh = (time.monotonic() - started) * 1000 / runs
+
+    session = ShellSession(os.curdir)
+    session.run('true', echo=False)
+    started = time.monotonic()
+    for _ in range(runs):
+        session.run('true', echo=False)
+    warm = (time.monotonic() - started) * 1000 / runs
+    session.close()
+    return {'runs': runs, 'fresh_shell_ms': round(fresh, 2), 'warm_session_ms': round(warm, 2)}
+
+
+if __name__ == '__main__':
+    print(measure_overhead(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
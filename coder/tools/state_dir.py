@@ -0,0 +1,35 @@
+import os
+import hashlib
+from typing import Optional
+
+# Where state of workspaces that are not git repositories goes.
+CACHE_HOME = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+STATE_SUBDIR = 'codeassist'
+
+
+def git_dir(root: str) -> Optional[str]:
+    """The git directory of the repository at root, following a '.git' file (worktrees, submodules); None if there is none."""
+    dot_git = os.path.join(root, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        with open(dot_git) as file:
+            line = file.readline().strip()
+        if line.startswith('gitdir:'):
+            return os.path.normpath(os.path.join(root, line[len('gitdir:'):].strip()))
+    return None
+
+
+def state_dir(root: str) -> str:
+    """Directory for the tools' state about the workspace at root (write lock, trigram index, context store).
+
+    It is kept out of the work tree, so it never shows up in git status or
+    gets staged: inside the git directory (.git/codeassist) for a git
+    repository, otherwise under the user cache directory, keyed by root.
+    """
+    root = os.path.abspath(root)
+    git = git_dir(root)
+    if git is not None:
+        return os.path.join(git, STATE_SUBDIR)
+    key = hashlib.sha256(root.encode()).hexdigest()[:16]
+    return os.path.join(CACHE_HOME, STATE_SUBDIR, f"{os.path.basename(root) or 'root'}-{key}")
@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.edit_blocks import EditError, parse_edit_blocks
+from tools.patch_engine import PatchError, parse_patch
+
+# Upper bound on tool calls of one model turn that run at the same time.
+DEFAULT_WORKERS = 8
+
+# Tools that only look at the workspace. They run alongside each other freely.
+READ_TOOLS = {
+    'list_files', 'read_file', 'find_string_in_files', 'find_file', 'check_background_command',
+    'git_status', 'git_diff', 'git_log', 'git_show', 'read_context_file', 'read_context_file_as_string',
+}
+# Tools that change the files named in their arguments. Calls touching the same
+# path run one after another, in the order the model asked for them.
+WRITE_TOOLS = {
+    'write_file', 'write_files', 'edit_files', 'append_to_file', 'apply_diff_to_file', 'create_directory',
+    'update_context_file', 'update_context_files',
+}
+# Arguments that name the single path a tool reads or writes.
+PATH_ARGS = ('file_name_with_path', 'file_path', 'dir_name')
+# Any other tool (shell commands, git commits, agent transfers...) may touch
+# anything, so it waits for every earlier call and every later call waits for it.
+
+READ, WRITE, BARRIER = 'read', 'write', 'barrier'
+
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(str(path).strip()).lstrip(os.sep)
+
+
+def call_footprint(name: str, args: dict) -> Tuple[str, Optional[frozenset]]:
+    """Classify a tool call as (kind, paths). paths is None when the call may touch any path."""
+    if name in READ_TOOLS:
+        kind = READ
+    elif name in WRITE_TOOLS:
+        kind = WRITE
+    else:
+        return BARRIER, None
+    paths = [args[arg] for arg in PATH_ARGS if args.get(arg)]
+    for arg in ('files', 'contexts'):
+        if isinstance(args.get(arg), dict):
+            paths.extend(args[arg])
+    try:
+        if name == 'edit_files':
+            paths.extend(block.path for block in parse_edit_blocks(args.get('edit_blocks', '')))
+        elif name == 'apply_diff_to_file':
+            paths.extend(patch.path for patch in parse_patch(args.get('diff', '')) if patch.path)
+    except (EditError, PatchError):
+        # The tool reports the error itself; until then, assume it could touch anything.
+        return kind, None
+    if not paths:
+        return kind, None
+    return kind, frozenset(_normalize(path) for path in paths)
+
+
+def conflicts(earlier: Tuple[str, Optional[frozenset]], later: Tuple[str, Optional[frozenset]]) -> bool:
+    """Whether later has to wait for earlier."""
+    if BARRIER in (earlier[0], later[0]):
+        return True
+    if earlier[0] == READ and later[0] == READ:
+        return False
+    if earlier[1] is None or later[1] is None:
+        return True
+    return bool(earlier[1] & later[1])
+
+
+class ToolCallResult:
+    def __init__(self, name: str, value: Any = None, error: Optional[BaseException] = None,
+                 elapsed_s: float = 0.0, waited_s: float = 0.0):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.elapsed_s = elapsed_s
+        self.waited_s = waited_s
+
+
+class ToolExecutor:
+    """Runs the tool calls of one model turn concurrently.
+
+    Reads run side by side on a thread pool; the tools are I/O bound
+    (files, git and shell subprocesses), so threads overlap their waits.
+    A call that conflicts with an earlier one (a write to the same path, or
+    any call next to a shell command or another tool with unknown effects)
+    starts only after that one finished, so the outcome matches running the
+    calls one by one. Results come back in the order the calls were given.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._stats = {'turns': 0, 'calls': 0, 'parallel_turns': 0, 'tool_time': 0.0, 'wall_time': 0.0}
+
+    def run(self, calls: List[Tuple[str, Callable, dict]]) -> List[ToolCallResult]:
+        """Run (name, function, args) calls and return their results in the same order."""
+        started = time.perf_counter()
+        if len(calls) < 2 or self.workers < 2:
+            results = [self._call(name, function, args, started) for name, function, args in calls]
+        else:
+            results = self._run_concurrently(calls, started)
+        wall = time.perf_counter() - started
+        self._record(results, wall)
+        return results
+
+    @staticmethod
+    def _call(name: str, function: Callable, args: dict, queued_at: float) -> ToolCallResult:
+        started = time.perf_counter()
+        try:
+            value, error = function(**args), None
+        except Exception as e:
+            value, error = None, e
+        return ToolCallResult(name, value, error, time.perf_counter() - started, started - queued_at)
+
+    def _run_concurrently(self, calls: List[Tuple[str, Callable, dict]], started: float) -> List[ToolCallResult]:
+        footprints = [call_footprint(name, args) for name, _, args in calls]
+        done = [threading.Event() for _ in calls]
+
+        def task(index: int) -> ToolCallResult:
+            for earlier in range(index):
+                if conflicts(footprints[earlier], footprints[index]):
+                    done[earlier].wait()
+            try:
+                name, function, args = calls[index]
+                return self._call(name, function, args, started)
+            finally:
+                done[index].set()
+
+        # The pool starts tasks in submission order, so a task only ever waits
+        # for tasks that already started; no worker can deadlock on a queued one.
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(calls)), thread_name_prefix='tool') as pool:
+            futures = [pool.submit(task, index) for index in range(len(calls))]
+            return [future.result() for future in futures]
+
+    def _record(self, results: List[ToolCallResult], wall: float):
+        tool_time = sum(result.elapsed_s for result in results)
+        with self._lock:
+            self._stats['turns'] += 1
+            self._stats['calls'] += len(results)
+            self._stats['parallel_turns'] += len(results) > 1
+            self._stats['tool_time'] += tool_time
+            self._stats['wall_time'] += wall
+        for result in results:
+            logging.debug(f"Tool {result.name} took {result.elapsed_s * 1000:.1f} ms "
+                          f"after waiting {result.waited_s * 1000:.1f} ms")
+        if len(results) > 1:
+            logging.info(f"Ran {len(results)} tool calls in {wall * 1000:.1f} ms "
+                         f"({tool_time * 1000:.1f} ms one after another)")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['speedup'] = round(stats['tool_time'] / stats['wall_time'], 2) if stats['wall_time'] else 1.0
+        return stats
@@ -1,22 +1,26 @@
-from typing import ClassVar
+import os
 
 from swarm import Agent
 
-import os
+from tools.prompts import load_prompt
+from tools.workspace import Workspace
 
 class TriageAssistant(Agent):
-    base_path: ClassVar[str] = ''
 
-    def __init__(self):
+    def __init__(self, workspace: Workspace = None):
         super().__init__()
         self.name = "Triage Agent"
         # Read instructions from the Markdown file
-        with open('tools/triage_assistant.md', 'r') as file:
-            self.instructions = file.read()
+        self.instructions = load_prompt('triage_assistant.md')
         self.functions = []
         self.tool_choice: str = None
         self.parallel_tool_calls: bool = True
         self.model: str = "gpt-4o"
+        self._workspace = workspace or Workspace()
+
+    @property
+    def base_path(self) -> str:
+        return self._workspace.root
 
     def load_project_context(self):
         context_file = os.path.join(self.base_path, 'project_context.txt')
@@ -0,0 +1,359 @@
+import os
+import sys
+import json
+import logging
+import sqlite3
+import argparse
+import threading
+import subprocess
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from tools.content_search import is_binary, BINARY_SNIFF_BYTES
+from tools.state_dir import state_dir
+from tools.workspace_index import SKIP_DIRS
+
+INDEX_DIR = 'index'
+INDEX_FILE = 'trigrams.db'
+# Larger files are never indexed; they always stay in the candidate set.
+MAX_INDEX_FILE_BYTES = 1024 * 1024
+# Rebuild from scratch once this share of file ids in the postings is dead.
+MAX_DEAD_RATIO = 0.25
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+def trigrams(data: bytes) -> set:
+    """Distinct case-folded trigrams of data, packed into ints."""
+    data = data.lower()
+    return {int.from_bytes(data[i:i + 3], 'big') for i in range(len(data) - 2)}
+
+
+def required_literals(pattern: str, use_regex: bool = False) -> List[str]:
+    """Literal substrings that every match of the pattern must contain."""
+    if not use_regex:
+        return [pattern]
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    runs, current = [], []
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(arg))
+            continue
+        if op is sre_parse.BRANCH:
+            # Top-level alternation: no single literal is required.
+            return []
+        runs.append(''.join(current))
+        current = []
+    runs.append(''.join(current))
+    return [run for run in runs if len(run) >= 3]
+
+
+def _file_grams(path: str) -> Tuple[int, int, Optional[List[int]]]:
+    """Stat and tokenize one file. Grams are None for binary or oversized files."""
+    stat = os.stat(path)
+    if stat.st_size > MAX_INDEX_FILE_BYTES:
+        return stat.st_size, stat.st_mtime_ns, None
+    with open(path, 'rb') as file:
+        data = file.read()
+    if is_binary(data[:BINARY_SNIFF_BYTES]):
+        return stat.st_size, stat.st_mtime_ns, None
+    return stat.st_size, stat.st_mtime_ns, list(trigrams(data))
+
+
+class TrigramIndex:
+    """Persistent trigram inverted index over the files of a workspace.
+
+    Stored in SQLite in the workspace's state directory (see state_dir): a
+    files table with (id, path, size, mtime_ns) and one posting list (array
+    of file ids) per trigram. Changed files get a new id, so old postings go dead instead of
+    being rewritten; a full rebuild compacts them away. narrow() only drops
+    files whose indexed size and mtime still match the disk, so a stale index
+    costs speed, never results.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(state_dir(self.root), INDEX_DIR, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._files: Optional[Dict[str, Tuple[int, int, int, bool]]] = None
+        self._updating: Optional[threading.Thread] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, indexed INTEGER)")
+        conn.execute("CREATE TABLE IF NOT EXISTS postings (gram INTEGER PRIMARY KEY, ids BLOB)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return conn
+
+    def _load_files(self, conn) -> Dict[str, Tuple[int, int, int, bool]]:
+        return {path: (file_id, size, mtime_ns, bool(indexed))
+                for file_id, path, size, mtime_ns, indexed in conn.execute("SELECT * FROM files")}
+
+    def _meta(self, conn, key: str, default=0):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, conn, key: str, value):
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    # Building
+
+    def list_workspace_files(self) -> List[str]:
+        """Tracked and untracked-but-not-ignored files from git, or a plain walk outside git."""
+        try:
+            result = subprocess.run(["git", "ls-files", "-z", "-co", "--exclude-standard"],
+                                    cwd=self.root, capture_output=True, check=True)
+            paths = [p for p in result.stdout.decode('utf-8', errors='surrogateescape').split('\0') if p]
+        except (OSError, subprocess.CalledProcessError):
+            paths = []
+            for root, dirs, files in os.walk(self.root):
+                dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+                paths.extend(os.path.relpath(os.path.join(root, f), self.root) for f in files)
+        return [p for p in paths if not p.split('/')[0] in SKIP_DIRS and os.path.isfile(os.path.join(self.root, p))]
+
+    def _tokenize(self, paths: List[str], workers: Optional[int]) -> Iterable[Tuple[str, tuple]]:
+        full_paths = [os.path.join(self.root, p) for p in paths]
+        if len(paths) < 64 or workers == 1:
+            yield from zip(paths, map(_safe_file_grams, full_paths))
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from zip(paths, executor.map(_safe_file_grams, full_paths, chunksize=64))
+
+    def rebuild(self, workers: Optional[int] = None) -> dict:
+        """Index every workspace file from scratch."""
+        start = time.perf_counter()
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            conn = self._connect()
+            postings: Dict[int, array] = {}
+            with conn:
+                for rel, result in self._tokenize(self.list_workspace_files(), workers):
+                    if result is None:
+                        continue
+                    size, mtime_ns, grams = result
+                    cursor = conn.execute("INSERT INTO files (path, size, mtime_ns, indexed) VALUES (?, ?, ?, ?)",
+                                          (rel, size, mtime_ns, grams is not None))
+                    for gram in grams or ():
+                        postings.setdefault(gram, array('I')).append(cursor.lastrowid)
+                conn.executemany("INSERT INTO postings VALUES (?, ?)",
+                                 ((gram, ids.tobytes()) for gram, ids in postings.items()))
+                self._set_meta(conn, 'dead_files', 0)
+                self._set_meta(conn, 'built_at', time.time())
+            self._files = self._load_files(conn)
+            conn.close()
+        elapsed = time.perf_counter() - start
+        logging.info(f"Trigram index rebuilt for {self.root}: {len(self._files)} files in {elapsed:.2f}s")
+        return {'files': len(self._files), 'rebuild_s': round(elapsed, 3)}
+
+    def update(self, workers: Optional[int] = None) -> dict:
+        """Re-index files whose size or mtime changed and forget deleted ones."""
+        if not self.exists():
+            return self.rebuild(workers)
+        start = time.perf_counter()
+        with self._lock:
+            conn = self._connect()
+            files = self._load_files(conn)
+            current = set(self.list_workspace_files())
+            removed = [path for path in files if path not in current]
+            changed = []
+            for rel in current:
+                entry = files.get(rel)
+                try:
+                    stat = os.stat(os.path.join(self.root, rel))
+                except OSError:
+                    continue
+                if entry is None or (entry[1], entry[2]) != (stat.st_size, stat.st_mtime_ns):
+                    changed.append(rel)
+
+            dead = self._meta(conn, 'dead_files')
+            with conn:
+                for rel in removed + [rel for rel in changed if rel in files]:
+                    conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+                    if files[rel][3]:
+                        dead += 1
+                appended: Dict[int, array] = {}
+                for rel, result in self._tokenize(changed, workers):
+                    if result is None:
+                        continue
+                    size, mtime_ns, grams = result
+                    cursor = conn.execute("INSERT INTO files (path, size, mtime_ns, indexed) VALUES (?, ?, ?, ?)",
+                                          (rel, size, mtime_ns, grams is not None))
+                    for gram in grams or ():
+                        appended.setdefault(gram, array('I')).append(cursor.lastrowid)
+                for gram, ids in appended.items():
+                    row = conn.execute("SELECT ids FROM postings WHERE gram = ?", (gram,)).fetchone()
+                    conn.execute("INSERT OR REPLACE INTO postings VALUES (?, ?)",
+                                 (gram, (row[0] if row else b'') + ids.tobytes()))
+                self._set_meta(conn, 'dead_files', dead)
+            self._files = self._load_files(conn)
+            conn.close()
+        stats = {'files': len(self._files), 'changed': len(changed), 'removed': len(removed),
+                 'update_s': round(time.perf_counter() - start, 3)}
+        logging.info(f"Trigram index updated for {self.root}: {stats}")
+        indexed = sum(1 for entry in self._files.values() if entry[3])
+        if dead > MAX_DEAD_RATIO * max(indexed, 1):
+            stats.update(self.rebuild(workers))
+        return stats
+
+    def update_in_background(self):
+        """Start an incremental update unless one is already running."""
+        if self._updating is not None and self._updating.is_alive():
+            return
+        self._updating = threading.Thread(target=self.update, kwargs={'workers': 1},
+                                          name='trigram-index-update', daemon=True)
+        self._updating.start()
+
+    # Queries
+
+    def candidate_ids(self, pattern: str, use_regex: bool = False) -> Optional[set]:
+        """Ids of indexed files that contain every trigram of the pattern, or None if it cannot narrow."""
+        grams = set()
+        for literal in required_literals(pattern, use_regex):
+            grams |= trigrams(literal.encode('utf-8'))
+        if not grams:
+            return None
+        conn = self._connect()
+        try:
+            lists = []
+            for gram in grams:
+                row = conn.execute("SELECT ids FROM postings WHERE gram = ?", (gram,)).fetchone()
+                if row is None:
+                    return set()
+                ids = array('I')
+                ids.frombytes(row[0])
+                lists.append(ids)
+        finally:
+            conn.close()
+        lists.sort(key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result.intersection_update(ids)
+            if not result:
+                break
+        return result
+
+    def narrow(self, pattern: str, rel_paths: List[str], use_regex: bool = False,
+               stat: Optional[Callable[[str], Optional[Tuple[int, int]]]] = None) -> List[str]:
+        """Drop files that cannot contain the pattern; unindexed or changed files are always kept."""
+        start = time.perf_counter()
+        ids = self.candidate_ids(pattern, use_regex)
+        if ids is None:
+            return rel_paths
+        if self._files is None:
+            conn = self._connect()
+            self._files = self._load_files(conn)
+            conn.close()
+        files = self._files
+        # Every file about to be dropped is checked on disk: an in-place edit changes no directory mtime, so
+        # the workspace index's recorded sizes and mtimes cannot be trusted to show it.
+        stat = stat or self._disk_stat
+        narrowed, stale = [], 0
+        for rel in rel_paths:
+            entry = files.get(rel)
+            if entry is None or not entry[3] or entry[0] in ids:
+                narrowed.append(rel)
+            elif (entry[1], entry[2]) != stat(rel):
+                narrowed.append(rel)
+                stale += 1
+        if stale:
+            self.update_in_background()
+        logging.info(f"Trigram index narrowed {len(rel_paths)} files to {len(narrowed)} "
+                     f"({stale} stale) in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return narrowed
+
+    def _disk_stat(self, rel: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.root, rel))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def stats(self) -> dict:
+        """Index size on disk and entry counts."""
+        if not self.exists():
+            return {'root': self.root, 'exists': False}
+        conn = self._connect()
+        try:
+            return {
+                'root': self.root,
+                'exists': True,
+                'files': conn.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+                'indexed_files': conn.execute("SELECT COUNT(*) FROM files WHERE indexed").fetchone()[0],
+                'trigrams': conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0],
+                'dead_files': self._meta(conn, 'dead_files'),
+                'size_bytes': os.path.getsize(self.path),
+            }
+        finally:
+            conn.close()
+
+
+def _safe_file_grams(path: str):
+    try:
+        return _file_grams(path)
+    except OSError as e:
+        logging.debug(f"Skipping {path}: {e}")
+        return None
+
+
+_indexes: Dict[str, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(base_path: str) -> Optional[TrigramIndex]:
+    """Return the trigram index for base_path if one has been built, otherwise None."""
+    root = os.path.abspath(base_path or os.curdir)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = TrigramIndex(root)
+    return index if index.exists() else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the on-disk trigram index of a workspace.")
+    parser.add_argument('base_path', help="Workspace root")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in [('build', "Rebuild the index from scratch"), ('update', "Incrementally update the index")]:
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument('--workers', type=int, default=None, help="Tokenizer processes")
+    subparsers.add_parser('stats', help="Show index size")
+    query = subparsers.add_parser('query', help="List candidate files for a pattern and time the lookup")
+    query.add_argument('pattern')
+    query.add_argument('--regex', action='store_true')
+    args = parser.parse_args(argv)
+
+    index = TrigramIndex(args.base_path)
+    if args.command == 'build':
+        result = index.rebuild(args.workers)
+    elif args.command == 'update':
+        result = index.update(args.workers)
+    elif args.command == 'stats':
+        result = index.stats()
+    else:
+        if not index.exists():
+            parser.error("No index found; run 'build' first.")
+        paths = index.list_workspace_files()
+        start = time.perf_counter()
+        candidates = index.narrow(args.pattern, paths, use_regex=args.regex)
+        result = {'files': len(paths), 'candidates': len(candidates),
+                  'query_ms': round((time.perf_counter() - start) * 1000, 2), 'paths': candidates[:50]}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()
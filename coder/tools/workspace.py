@@ -0,0 +1,119 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Optional, Set
+
+if TYPE_CHECKING:
+    from tools.context_store import ContextStore
+    from tools.git_backend import GitBackend
+    from tools.shell_session import ShellSession
+    from tools.trigram_index import TrigramIndex
+    from tools.workspace_index import WorkspaceIndex
+
+# Directory whose subdirectories server clients may pick as workspaces by name (see workspace_root).
+WORKSPACES_ROOT = os.environ.get('CODEASSIST_WORKSPACES_ROOT')
+
+
+class PathEscapeError(ValueError):
+    """A path given to a tool leads outside the workspace root."""
+
+
+class Workspace:
+    """The repository one conversation works in.
+
+    Agents are built around a workspace (see all_agents.create_agents) rather
+    than a class-wide base path, so one process can hold conversations on
+    different repositories side by side. Paths given to tools are resolved
+    against root and refused if they lead outside it, following symlinks.
+    The file index, git backend, context store and trigram index are per
+    root and shared through their registries with other workspaces on the
+    same repository. The shell session and background jobs belong to the
+    workspace, so a conversation keeps its own working directory and
+    environment, and only sees and stops the jobs it started.
+    """
+
+    def __init__(self, root: str = os.curdir):
+        self.root = os.path.abspath(root)
+        self._real_root = os.path.realpath(self.root)
+        self._jobs: Set[int] = set()
+        self._jobs_lock = threading.Lock()
+        self._shell: Optional['ShellSession'] = None
+        self._shell_lock = threading.Lock()
+
+    def contains(self, path: str) -> bool:
+        """Whether path (relative to root, or absolute) is inside root once symlinks are resolved."""
+        real = os.path.realpath(os.path.join(self.root, path))
+        return os.path.commonpath([real, self._real_root]) == self._real_root
+
+    def resolve(self, path: str) -> str:
+        """Return the absolute path of path, which is relative to root or absolute inside it.
+
+        Raises PathEscapeError if it leads outside root.
+        """
+        full = os.path.normpath(os.path.join(self.root, path or ''))
+        if not self.contains(full):
+            raise PathEscapeError(f"Invalid path {path}: it leads outside the workspace.")
+        return full
+
+    # The registries are imported on first use, so creating a workspace (and importing all_agents) stays cheap.
+
+    def index(self) -> 'WorkspaceIndex':
+        from tools.workspace_index import get_workspace_index
+        return get_workspace_index(self.root)
+
+    def git(self) -> 'GitBackend':
+        from tools.git_backend import get_git_backend
+        return get_git_backend(self.root)
+
+    def context_store(self) -> 'ContextStore':
+        from tools.context_store import get_context_store
+        return get_context_store(self.root)
+
+    def trigram_index(self) -> Optional['TrigramIndex']:
+        from tools.trigram_index import get_trigram_index
+        return get_trigram_index(self.root)
+
+    def shell(self) -> 'ShellSession':
+        """This workspace's shell session, started on first use."""
+        with self._shell_lock:
+            if self._shell is None:
+                from tools.shell_session import ShellSession
+                self._shell = ShellSession(self.root)
+            return self._shell
+
+    def close(self):
+        """Stop the shell session, if one was started; the next command starts a fresh one."""
+        with self._shell_lock:
+            shell, self._shell = self._shell, None
+        if shell is not None:
+            shell.close()
+
+    def add_job(self, job_id: int):
+        with self._jobs_lock:
+            self._jobs.add(job_id)
+
+    def owns_job(self, job_id: int) -> bool:
+        with self._jobs_lock:
+            return job_id in self._jobs
+
+    def __repr__(self) -> str:
+        return f"Workspace({self.root!r})"
+
+
+def workspace_root(name: Optional[str], default: str, parent: Optional[str] = WORKSPACES_ROOT) -> str:
+    """Root of the workspace a server client asked for by name: a directory directly or further under parent.
+
+    No name means the server's default workspace. Raises ValueError if named
+    workspaces are not enabled, or the name is not a directory under parent.
+    """
+    if not name:
+        return os.path.abspath(default)
+    if not parent:
+        raise ValueError("Named workspaces are not enabled on this server; set CODEASSIST_WORKSPACES_ROOT.")
+    workspaces = Workspace(parent)
+    try:
+        root = workspaces.resolve(name)
+    except PathEscapeError:
+        raise ValueError(f"Unknown workspace '{name}'")
+    if root == workspaces.root or not os.path.isdir(root):
+        raise ValueError(f"Unknown workspace '{name}'")
+    return root
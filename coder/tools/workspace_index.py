@@ -0,0 +1,320 @@
+import os
+import re
+import fnmatch
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from tools.gitignore import GITIGNORE, GitIgnoreMatcher
+
+# Directories that are listed but never descended into.
+SKIP_DIRS = {'.git', '.codeassist'}
+
+
+class WorkspaceIndex:
+    """In-memory index of every file under a base path.
+
+    The index keeps (size, mtime_ns) per file, the children of every directory and
+    a basename -> paths bucket map, so name lookups never touch the disk. A
+    polling watcher thread re-scans directories whose mtime changed, and
+    callers that write files can push changes in with notify_changed().
+    Directories ignored by the workspace's .gitignore files are listed but
+    not descended into; lookups inside them return None so callers fall back
+    to the disk.
+    """
+
+    def __init__(self, root: str, poll_interval: float = 2.0, respect_gitignore: bool = True):
+        self.root = os.path.abspath(root)
+        self.poll_interval = poll_interval
+        self.respect_gitignore = respect_gitignore
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._names: Dict[str, set] = defaultdict(set)
+        self._dirs: Dict[str, int] = {}
+        self._children: Dict[str, set] = defaultdict(set)
+        self._built = False
+        self._matcher: Optional[GitIgnoreMatcher] = None
+        self._ignore_files: Dict[str, Optional[int]] = {}
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._stats = {'build_time': 0.0, 'hits': 0, 'misses': 0, 'rescans': 0}
+
+    # Path helpers. Query methods take filesystem paths (absolute or relative
+    # to the working directory), the same paths the callers open.
+
+    def relative(self, path: str) -> Optional[str]:
+        """Return path relative to the index root, or None if it lies outside."""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.curdir:
+            return ''
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return None
+        return rel
+
+    def covers(self, path: str) -> bool:
+        """Whether path is inside the indexed tree."""
+        rel = self.relative(path)
+        return rel is not None and not any(part in SKIP_DIRS for part in rel.split(os.sep))
+
+    # Building
+
+    def build(self):
+        """Walk the whole tree once and start the watcher."""
+        start = time.perf_counter()
+        with self._lock:
+            self._files.clear()
+            self._names.clear()
+            self._dirs.clear()
+            self._children.clear()
+            self._matcher = GitIgnoreMatcher(self.root) if self.respect_gitignore else None
+            self._scan_tree('')
+            self._ignore_files = self._ignore_file_mtimes()
+            self._built = True
+            self.generation += 1
+        self._stats['build_time'] = time.perf_counter() - start
+        logging.info(f"Workspace index built for {self.root}: {len(self._files)} files, "
+                     f"{len(self._dirs)} directories in {self._stats['build_time']:.2f}s")
+        if self.poll_interval and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='workspace-index-watcher', daemon=True)
+            self._watcher.start()
+
+    def ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def _scan_tree(self, rel_dir: str):
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            stack.extend(self._scan_dir(current))
+
+    def _scan_dir(self, rel_dir: str) -> List[str]:
+        """Index the direct children of rel_dir and return its subdirectories."""
+        abs_dir = os.path.join(self.root, rel_dir)
+        subdirs = []
+        try:
+            self._dirs[rel_dir] = os.stat(abs_dir).st_mtime_ns
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            self._remove_dir(rel_dir)
+            return subdirs
+        children = set()
+        for entry in entries:
+            children.add(entry.name)
+            rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            try:
+                if entry.is_dir():
+                    if entry.name not in SKIP_DIRS and not entry.is_symlink() and not self._ignored_dir(rel):
+                        subdirs.append(rel)
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            self._add_file(rel, stat.st_size, stat.st_mtime_ns)
+        for name in self._children.get(rel_dir, set()) - children:
+            rel = os.path.join(rel_dir, name) if rel_dir else name
+            self._remove_file(rel)
+            self._remove_dir(rel)
+        self._children[rel_dir] = children
+        return subdirs
+
+    def _ignored_dir(self, rel_dir: str) -> bool:
+        return self._matcher is not None and self._matcher.is_ignored(os.path.join(self.root, rel_dir), True)
+
+    def _ignore_file_mtimes(self) -> Dict[str, Optional[int]]:
+        """Current mtimes of the indexed .gitignore files."""
+        mtimes = {}
+        for rel in self._names.get(GITIGNORE, ()):
+            try:
+                mtimes[rel] = os.stat(os.path.join(self.root, rel)).st_mtime_ns
+            except OSError:
+                mtimes[rel] = None
+        return mtimes
+
+    def _add_file(self, rel: str, size: int, mtime_ns: int):
+        self._files[rel] = (size, mtime_ns)
+        self._names[os.path.basename(rel)].add(rel)
+
+    def _remove_file(self, rel: str):
+        if self._files.pop(rel, None) is not None:
+            bucket = self._names.get(os.path.basename(rel))
+            if bucket is not None:
+                bucket.discard(rel)
+                if not bucket:
+                    del self._names[os.path.basename(rel)]
+
+    def _remove_dir(self, rel_dir: str):
+        if rel_dir not in self._dirs:
+            return
+        prefix = rel_dir + os.sep if rel_dir else ''
+        for rel in [d for d in self._dirs if d == rel_dir or d.startswith(prefix)]:
+            for name in self._children.pop(rel, set()):
+                self._remove_file(os.path.join(rel, name) if rel else name)
+            del self._dirs[rel]
+
+    # Updates
+
+    def notify_changed(self, path: str):
+        """Refresh a single path (file or directory) after it was written or removed."""
+        if not self._built or not self.covers(path):
+            return
+        if os.path.basename(path) == GITIGNORE:
+            # Ignore rules changed, so the set of pruned directories may have too.
+            self.build()
+            return
+        rel = self.relative(path)
+        with self._lock:
+            abs_path = os.path.join(self.root, rel)
+            parent = os.path.dirname(rel)
+            if parent not in self._dirs:
+                # New parent directories: rescan from the deepest known ancestor.
+                while parent and parent not in self._dirs:
+                    parent = os.path.dirname(parent)
+                self._scan_tree(parent)
+            elif os.path.isdir(abs_path):
+                self._children[parent].add(os.path.basename(rel))
+                self._scan_tree(rel)
+            elif os.path.isfile(abs_path):
+                stat = os.stat(abs_path)
+                self._children[parent].add(os.path.basename(rel))
+                self._add_file(rel, stat.st_size, stat.st_mtime_ns)
+            else:
+                self._children[parent].discard(os.path.basename(rel))
+                self._remove_file(rel)
+                self._remove_dir(rel)
+            self.generation += 1
+
+    def poll(self) -> int:
+        """Re-scan directories whose mtime changed. Returns the number re-scanned (0 before the first build)."""
+        if not self._built:
+            return 0
+        if self.respect_gitignore:
+            self._matcher = GitIgnoreMatcher(self.root)
+        changed = []
+        for rel_dir, mtime in list(self._dirs.items()):
+            try:
+                current = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                changed.append(rel_dir)
+        if changed:
+            with self._lock:
+                for rel_dir in changed:
+                    if rel_dir in self._dirs:
+                        for subdir in self._scan_dir(rel_dir):
+                            if subdir not in self._dirs:
+                                self._scan_tree(subdir)
+                self.generation += 1
+            self._stats['rescans'] += len(changed)
+            logging.debug(f"Workspace index re-scanned {len(changed)} directories under {self.root}")
+        if self.respect_gitignore and self._ignore_file_mtimes() != self._ignore_files:
+            logging.info(f"Ignore rules changed under {self.root}, rebuilding workspace index")
+            self.build()
+        return len(changed)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"Workspace index watcher error for {self.root}: {e}")
+
+    def close(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+
+    # Queries
+
+    def listdir(self, path: str) -> Optional[List[str]]:
+        """Names of the entries in a directory, or None if it is not indexed."""
+        rel = self.relative(path)
+        if rel is None:
+            self._stats['misses'] += 1
+            return None
+        self.ensure_built()
+        with self._lock:
+            if rel not in self._dirs:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return sorted(self._children[rel])
+
+    def files(self, path: Optional[str] = None) -> Optional[List[str]]:
+        """All indexed files under a directory, as paths relative to the root."""
+        rel_dir = self.relative(path or self.root)
+        if rel_dir is None:
+            self._stats['misses'] += 1
+            return None
+        self.ensure_built()
+        prefix = rel_dir + os.sep if rel_dir else ''
+        with self._lock:
+            if rel_dir and rel_dir not in self._dirs:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return sorted(rel for rel in self._files if rel.startswith(prefix))
+
+    def find(self, pattern: str, path: Optional[str] = None, use_regex: bool = False) -> Optional[List[str]]:
+        """Find files by basename (fnmatch or regex) under a directory.
+
+        Returns paths relative to the root, or None if the directory is not indexed.
+        """
+        rel_dir = self.relative(path or self.root)
+        if rel_dir is None:
+            self._stats['misses'] += 1
+            return None
+        self.ensure_built()
+        prefix = rel_dir + os.sep if rel_dir else ''
+        with self._lock:
+            if rel_dir and rel_dir not in self._dirs:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            if use_regex:
+                regex = re.compile(pattern)
+                names = [name for name in self._names if regex.search(name)]
+            elif any(c in pattern for c in '*?['):
+                names = [name for name in self._names if fnmatch.fnmatch(name, pattern)]
+            else:
+                names = [pattern] if pattern in self._names else []
+            return sorted(rel for name in names for rel in self._names[name] if rel.startswith(prefix))
+
+    def stat(self, path: str) -> Optional[Tuple[int, int]]:
+        """Indexed (size, mtime_ns) of a file, or None if unknown."""
+        rel = self.relative(path)
+        if rel is None:
+            return None
+        self.ensure_built()
+        return self._files.get(rel)
+
+    def stats(self) -> dict:
+        """Index size, build time and hit counts."""
+        with self._lock:
+            return {
+                'root': self.root,
+                'files': len(self._files),
+                'directories': len(self._dirs),
+                'basenames': len(self._names),
+                'generation': self.generation,
+                **self._stats,
+            }
+
+
+_indexes: Dict[str, WorkspaceIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_workspace_index(base_path: str) -> WorkspaceIndex:
+    """Return the shared index for base_path, creating it on first use."""
+    root = os.path.abspath(base_path or os.curdir)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = WorkspaceIndex(root)
+        return index
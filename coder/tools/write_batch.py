@@ -0,0 +1,193 @@
+import os
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+from tools.atomic_io import write_temp
+from tools.state_dir import state_dir
+
+LOCK_FILE = 'write.lock'
+
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+# Roots whose lock the current thread holds, so nested workspace_lock calls do not flock twice.
+_held = threading.local()
+
+
+@contextmanager
+def workspace_lock(root: Optional[str]):
+    """Serialize writers to a workspace, across threads and (where fcntl exists) processes.
+
+    Re-entrant within a thread: read-modify-write tools hold it from reading
+    a file until their WriteBatch (which takes it again) has committed.
+    """
+    key = os.path.abspath(root) if root else ''
+    with _locks_guard:
+        lock = _locks.setdefault(key, threading.RLock())
+    held = _held.__dict__.setdefault('roots', set())
+    with lock:
+        if not root or fcntl is None or key in held:
+            yield
+            return
+        lock_path = os.path.join(state_dir(key), LOCK_FILE)
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class WriteBatch:
+    """Stages file writes, deletions and directory creations and commits them as one unit.
+
+    Repeated writes to a path are coalesced, so each file is written and
+    fsynced once. On commit every file goes to a temp file next to its
+    target, the originals are hard-linked aside, and the temp files are
+    renamed into place; if any step fails the originals are restored.
+    Usable as a context manager: commits on success, rolls back on error.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root
+        self._files: Dict[str, Optional[str]] = {}
+        self._dirs: List[str] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def write(self, path: str, content: str):
+        with self._lock:
+            self._files[os.path.abspath(path)] = content
+
+    def delete(self, path: str):
+        with self._lock:
+            self._files[os.path.abspath(path)] = None
+
+    def mkdir(self, path: str):
+        with self._lock:
+            self._dirs.append(os.path.abspath(path))
+
+    def staged(self, path: str) -> Optional[str]:
+        """Content staged for path, or None if nothing (or a deletion) is staged."""
+        return self._files.get(os.path.abspath(path))
+
+    def rollback(self):
+        """Discard everything staged."""
+        with self._lock:
+            self._files.clear()
+            self._dirs.clear()
+
+    def commit(self) -> List[str]:
+        """Apply all staged changes atomically and return the changed paths."""
+        with self._lock:
+            files, dirs = dict(self._files), list(self._dirs)
+            self._files.clear()
+            self._dirs.clear()
+        if not files and not dirs:
+            return []
+
+        with workspace_lock(self.root):
+            created_dirs = []
+            temps: Dict[str, str] = {}
+            backups: Dict[str, Optional[str]] = {}
+            try:
+                for path in dirs + [os.path.dirname(path) for path, content in files.items() if content is not None]:
+                    created_dirs.extend(self._makedirs(path))
+                for path, content in files.items():
+                    if content is not None:
+                        temps[path] = write_temp(path, content)
+                for path in files:
+                    backups[path] = self._backup(path)
+                    if files[path] is None:
+                        if os.path.exists(path):
+                            os.remove(path)
+                    else:
+                        os.replace(temps.pop(path), path)
+            except BaseException:
+                self._restore(backups)
+                for tmp_path in temps.values():
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                for path in reversed(created_dirs):
+                    try:
+                        os.rmdir(path)
+                    except OSError:
+                        pass
+                raise
+            for backup in backups.values():
+                if backup is not None:
+                    os.remove(backup)
+            for directory in {os.path.dirname(path) for path in files} | set(dirs):
+                self._fsync_dir(directory)
+        logging.debug(f"Committed write batch: {len(files)} files, {len(dirs)} directories")
+        return list(files) + dirs
+
+    @staticmethod
+    def _makedirs(path: str) -> List[str]:
+        """Create path and missing parents, returning the directories that were created."""
+        missing = []
+        while path and not os.path.isdir(path):
+            missing.append(path)
+            path = os.path.dirname(path)
+        for directory in reversed(missing):
+            os.makedirs(directory, exist_ok=True)
+        return list(reversed(missing))
+
+    @staticmethod
+    def _backup(path: str) -> Optional[str]:
+        """Keep the current version of path reachable under a backup name (None if it does not exist)."""
+        if not os.path.exists(path):
+            return None
+        backup = f"{os.path.join(os.path.dirname(path), '.' + os.path.basename(path))}.{os.getpid()}.bak"
+        if os.path.exists(backup):
+            os.remove(backup)
+        try:
+            os.link(path, backup)
+        except OSError:
+            shutil.copy2(path, backup)
+        return backup
+
+    @staticmethod
+    def _restore(backups: Dict[str, Optional[str]]):
+        for path, backup in backups.items():
+            try:
+                if backup is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    os.replace(backup, path)
+            except OSError as e:
+                logging.error(f"Could not restore {path} during rollback: {e}")
+
+    @staticmethod
+    def _fsync_dir(directory: str):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)